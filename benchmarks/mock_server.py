@@ -0,0 +1,210 @@
+"""
+Local mock of the Have Your Say `allFeedback` and `document` endpoints.
+
+Items are generated on the fly from their index, so a mock publication with a
+million feedback items costs no memory. Latency, payload sizes, the legacy
+`_embedded` response shape and injected errors are configurable.
+
+Run standalone to point the CLI at it:
+
+    python -m benchmarks.mock_server --items 100000 --port 8000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+USER_TYPES = ["NGO", "COMPANY", "BUSINESS_ASSOCIATION", "EU_CITIZEN", "TRADE_UNION", "ACADEMIC_RESEARCH_INSTITUTION"]
+COUNTRIES = ["BEL", "DEU", "FRA", "ITA", "NLD", "ESP", "POL", "SWE", "AUT", "IRL"]
+COMPANY_SIZES = ["MICRO", "SMALL", "MEDIUM", "LARGE"]
+LANGUAGES = ["EN", "DE", "FR", "IT", "NL", "ES", "PL"]
+_WORDS = (
+    "the commission should ensure that the proposal protects consumers and small businesses while "
+    "keeping the internal market open we support the objective but the impact assessment underestimates "
+    "compliance costs for member states and stakeholders across the union "
+).split()
+_TEXT = " ".join(_WORDS[(i * 7) % len(_WORDS)] for i in range(4000))
+
+
+@dataclass
+class MockConfig:
+    n_items: int = 1000
+    # seconds added to every response
+    latency: float = 0.0
+    # one feedback in `attachment_every` has an attachment
+    attachment_every: int = 3
+    # characters of comment text per feedback item
+    comment_size: int = 300
+    # bytes per served document
+    document_size: int = 32 * 1024
+    # answer with the legacy HAL shape (`_embedded.feedback` + `page` block)
+    legacy: bool = False
+    # fraction of requests answered with `error_status` instead
+    error_rate: float = 0.0
+    error_status: int = 503
+    retry_after: Optional[str] = "0"
+    seed: int = 0
+
+
+def make_item(i: int, config: MockConfig) -> Dict[str, Any]:
+    """The raw API item at submission index `i` (ids are `i + 1`)."""
+    start = (i * 31) % max(1, len(_TEXT) - config.comment_size)
+    return {
+        "id": i + 1,
+        "publicationId": 1,
+        "userType": USER_TYPES[i % len(USER_TYPES)],
+        "country": COUNTRIES[(i * 7) % len(COUNTRIES)],
+        "author": f"Organisation {i % 997}",
+        "organization": f"Organisation {i % 997}",
+        "firstName": "Alex",
+        "surname": f"Member {i % 101}",
+        "companySize": COMPANY_SIZES[i % len(COMPANY_SIZES)],
+        "trNumber": f"{i % 9973:05d}-{i % 97:02d}" if i % 2 else None,
+        "language": LANGUAGES[i % len(LANGUAGES)],
+        "status": "PUBLISHED",
+        "createdDate": f"2024/{1 + i % 12:02d}/{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00",
+        "feedback": _TEXT[start:start + config.comment_size],
+        "attachments": (
+            [{
+                "id": 10 * (i + 1),
+                "documentId": f"d{i + 1}",
+                "fileName": f"attachment_{i + 1}.pdf",
+                "size": config.document_size,
+                "pages": 1 + i % 40,
+            }]
+            if config.attachment_every and i % config.attachment_every == 0
+            else []
+        ),
+    }
+
+
+def document_body(document_id: str, size: int) -> bytes:
+    head = f"%PDF-1.4\n% {document_id}\n".encode()
+    return (head + b"0" * max(0, size - len(head)))[:size]
+
+
+class MockServer:
+    """
+    Threaded HTTP server serving `/api/allFeedback` and `/api/document/<id>`.
+    Use as a context manager; `url` is the base to substitute for the EC API.
+    `stats` counts requests, injected errors and body bytes sent.
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, port: int = 0) -> None:
+        self.config = config or MockConfig()
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0}
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                status, headers, body = server.respond(self.path)
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "MockServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def respond(self, path: str) -> tuple:
+        cfg = self.config
+        if cfg.latency:
+            time.sleep(cfg.latency)
+        with self._lock:
+            self.stats["requests"] += 1
+            fail = cfg.error_rate > 0 and self._rng.random() < cfg.error_rate
+            if fail:
+                self.stats["errors"] += 1
+        if fail:
+            headers = {"Retry-After": cfg.retry_after} if cfg.retry_after is not None else {}
+            return cfg.error_status, headers, b"injected error"
+
+        parsed = urlparse(path)
+        if parsed.path == "/api/allFeedback":
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            status, headers, body = 200, {"Content-Type": "application/json"}, self._page(query)
+        elif parsed.path.startswith("/api/document/"):
+            doc_id = parsed.path.rsplit("/", 1)[-1]
+            status, headers, body = 200, {"Content-Type": "application/pdf"}, document_body(doc_id, cfg.document_size)
+        else:
+            status, headers, body = 404, {}, b"not found"
+        with self._lock:
+            self.stats["bytes"] += len(body)
+        return status, headers, body
+
+    def _page(self, query: Dict[str, str]) -> bytes:
+        cfg = self.config
+        page = int(query.get("page", 0))
+        size = max(1, int(query.get("size", 100)))
+        total_pages = -(-cfg.n_items // size)
+        start, stop = page * size, min(cfg.n_items, (page + 1) * size)
+        if query.get("sort"):
+            # newest first
+            indices = range(cfg.n_items - 1 - start, cfg.n_items - 1 - stop, -1)
+        else:
+            indices = range(start, stop)
+        items = [make_item(i, cfg) for i in indices]
+        if cfg.legacy:
+            data = {"_embedded": {"feedback": items}, "page": {"size": size, "totalPages": total_pages, "number": page}}
+        else:
+            data = {"content": items, "totalPages": total_pages, "totalElements": cfg.n_items, "number": page}
+        return json.dumps(data).encode("utf-8")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--items", type=int, default=MockConfig.n_items)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--comment-size", type=int, default=MockConfig.comment_size)
+    parser.add_argument("--document-size", type=int, default=MockConfig.document_size)
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args(argv)
+    config = MockConfig(
+        n_items=args.items,
+        latency=args.latency,
+        comment_size=args.comment_size,
+        document_size=args.document_size,
+        legacy=args.legacy,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    with MockServer(config, port=args.port) as server:
+        print(f"Serving {config.n_items} items at {server.url}/api/allFeedback ({asdict(config)})")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
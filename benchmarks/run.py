@@ -0,0 +1,367 @@
+"""
+Reproducible benchmarks for haveyoursay-analysis against a local mock server.
+
+    python -m benchmarks.run --sizes 1k,100k --out bench.json
+    python -m benchmarks.run --sizes 1k,100k --baseline bench-0.3.json
+
+Each benchmark builds its inputs (untimed), then times `--repeat` runs. Results
+are written as JSON; with `--baseline`, medians are compared to an earlier
+results file and the exit status is 1 if any benchmark got slower than
+`--tolerance` allows.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from haveyoursay_analysis import api, client, files, normalize
+from haveyoursay_analysis.compare import compare_attachments, compare_phases
+from haveyoursay_analysis.snapshot import RAW_FILENAME, iter_raw_rows
+from haveyoursay_analysis.storage import ATTACHMENT_COLUMNS, FEEDBACK_COLUMNS, apply_dtypes
+
+from .mock_server import COUNTRIES, MockConfig, MockServer, make_item
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class Options:
+    page_size: int = 100
+    concurrency: int = 4
+    workers: int = 8
+    latency: float = 0.0
+    legacy: bool = False
+    error_rate: float = 0.0
+    comment_size: int = MockConfig.comment_size
+    document_size: int = 4 * 1024
+    # downloads and organize touch one file per row; larger sizes are capped
+    max_files: int = 20_000
+
+    def mock_config(self, n_items: int) -> MockConfig:
+        return MockConfig(
+            n_items=n_items,
+            latency=self.latency,
+            comment_size=self.comment_size,
+            document_size=self.document_size,
+            legacy=self.legacy,
+            error_rate=self.error_rate,
+        )
+
+
+@dataclass
+class Benchmark:
+    """`setup(rows, work, opts)` builds a state (untimed); `run(state)` is timed and returns extra metrics."""
+
+    name: str
+    setup: Callable[[int, Path, Options], Dict[str, Any]]
+    run: Callable[[Dict[str, Any]], Dict[str, Any]]
+    reset: Optional[Callable[[Dict[str, Any]], None]] = None
+    file_based: bool = False
+
+
+@contextlib.contextmanager
+def mock_api(config: MockConfig, opts: Options) -> Iterator[MockServer]:
+    """Serve `config` locally and point `api`/`files` at it for the duration."""
+    saved = api.FEEDBACK_ENDPOINT, files.DOCUMENT_URL_TEMPLATE
+    with MockServer(config) as server:
+        api.FEEDBACK_ENDPOINT = f"{server.url}/api/allFeedback"
+        files.DOCUMENT_URL_TEMPLATE = f"{server.url}/api/document/{{document_id}}"
+        client.configure_session(pool_maxsize=max(opts.concurrency, opts.workers))
+        # a fresh adaptive limit per run, so one run's throttling does not carry over
+        client.configure_retry(None)
+        try:
+            yield server
+        finally:
+            api.FEEDBACK_ENDPOINT, files.DOCUMENT_URL_TEMPLATE = saved
+            client.close_session()
+
+
+def _tables(n: int, opts: Options) -> Dict[str, pd.DataFrame]:
+    out = api.extract_feedback_and_attachments(make_item(i, opts.mock_config(n)) for i in range(n))
+    return {"feedback": pd.DataFrame(out["feedback"]), "attachments": pd.DataFrame(out["attachments"])}
+
+
+# fetch_feedback
+
+def _setup_fetch(n: int, work: Path, opts: Options) -> Dict[str, Any]:
+    return {"n": n, "opts": opts, "config": opts.mock_config(n)}
+
+
+def _run_fetch(state: Dict[str, Any]) -> Dict[str, Any]:
+    opts: Options = state["opts"]
+    with mock_api(state["config"], opts) as server:
+        items = api.fetch_feedback(1, page_size=opts.page_size, concurrency=opts.concurrency)
+    assert len(items) == state["n"], f"fetched {len(items)} of {state['n']} items"
+    return {"requests": server.stats["requests"], "errors": server.stats["errors"], "bytes": server.stats["bytes"]}
+
+
+# extract_feedback_and_attachments
+
+def _setup_extract(n: int, work: Path, opts: Options) -> Dict[str, Any]:
+    config = opts.mock_config(n)
+    return {"rows": [make_item(i, config) for i in range(n)]}
+
+
+def _run_extract(state: Dict[str, Any]) -> Dict[str, Any]:
+    out = api.extract_feedback_and_attachments(state["rows"])
+    return {"attachments": len(out["attachments"])}
+
+
+# normalize a raw dump: the row-dict path (`api.extract_feedback_and_attachments`)
+# against the columnar `normalize.normalize_raw_dump` with every field
+
+def _setup_raw_dump(n: int, work: Path, opts: Options) -> Dict[str, Any]:
+    config = opts.mock_config(n)
+    path = work / RAW_FILENAME
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps(make_item(i, config)) + "\n")
+    return {"path": path}
+
+
+def _run_renormalize_rows(state: Dict[str, Any]) -> Dict[str, Any]:
+    out = api.extract_feedback_and_attachments(iter_raw_rows(state["path"]))
+    apply_dtypes(pd.DataFrame(out["feedback"], columns=FEEDBACK_COLUMNS))
+    at = apply_dtypes(pd.DataFrame(out["attachments"], columns=ATTACHMENT_COLUMNS))
+    return {"attachments": len(at)}
+
+
+def _run_normalize_raw_dump(state: Dict[str, Any]) -> Dict[str, Any]:
+    out = normalize.normalize_raw_dump(state["path"])
+    return {"attachments": len(out["attachments"]), "columns": out["feedback"].shape[1]}
+
+
+# download_attachments_from_csv
+
+def _setup_download(n: int, work: Path, opts: Options) -> Dict[str, Any]:
+    config = opts.mock_config(n)
+    config.attachment_every = 1
+    rows = api.extract_feedback_and_attachments(make_item(i, config) for i in range(n))["attachments"]
+    csv_path = work / "attachments.csv"
+    pd.DataFrame(rows).to_csv(csv_path, index=False)
+    return {"n": n, "opts": opts, "config": config, "csv": csv_path, "out": work / "downloads"}
+
+
+def _reset_download(state: Dict[str, Any]) -> None:
+    shutil.rmtree(state["out"], ignore_errors=True)
+
+
+def _run_download(state: Dict[str, Any]) -> Dict[str, Any]:
+    opts: Options = state["opts"]
+    with mock_api(state["config"], opts) as server:
+        downloaded, failed = files.download_attachments_from_csv(state["csv"], state["out"], workers=opts.workers)
+    assert downloaded + failed == state["n"]
+    return {"downloaded": downloaded, "failed": failed, "requests": server.stats["requests"]}
+
+
+# organize_by_user_type
+
+def _setup_organize(n: int, work: Path, opts: Options) -> Dict[str, Any]:
+    config = opts.mock_config(n)
+    config.attachment_every = 1
+    out = api.extract_feedback_and_attachments(make_item(i, config) for i in range(n))
+    src = work / "files"
+    src.mkdir()
+    for row in out["attachments"]:
+        (src / row["file_name"]).write_bytes(b"%PDF")
+    pd.DataFrame(out["attachments"]).to_csv(work / "attachments.csv", index=False)
+    pd.DataFrame(out["feedback"]).to_csv(work / "feedback.csv", index=False)
+    return {"work": work, "src": src, "out": work / "organized"}
+
+
+def _reset_organize(state: Dict[str, Any]) -> None:
+    shutil.rmtree(state["out"], ignore_errors=True)
+
+
+def _run_organize(state: Dict[str, Any]) -> Dict[str, Any]:
+    work = state["work"]
+    placed = files.organize_by_user_type(state["src"], work / "attachments.csv", work / "feedback.csv", state["out"])
+    return {"placed": placed}
+
+
+# compare_phases / compare_attachments
+
+def _setup_compare(n: int, work: Path, opts: Options) -> Dict[str, Any]:
+    """Phase 2 drops 5% of phase 1, adds 5% new feedback and changes `country` on 2%."""
+    before = _tables(n, opts)
+    drop, add = n // 20, n // 20
+    after = _tables(n + add, opts)
+    fb = after["feedback"].iloc[drop:].copy()
+    changed = fb.index[: n // 50]
+    fb.loc[changed, "country"] = [COUNTRIES[(i + 1) % len(COUNTRIES)] for i in range(len(changed))]
+    at = after["attachments"]
+    at = at[at["feedback_id"] > drop]
+    paths = {}
+    for phase, (f, a) in {"1": (before["feedback"], before["attachments"]), "2": (fb, at)}.items():
+        paths[f"feedback_{phase}"] = work / f"feedback_{phase}.csv"
+        paths[f"attachments_{phase}"] = work / f"attachments_{phase}.csv"
+        f.to_csv(paths[f"feedback_{phase}"], index=False)
+        a.to_csv(paths[f"attachments_{phase}"], index=False)
+    return paths
+
+
+def _run_compare_phases(state: Dict[str, Any]) -> Dict[str, Any]:
+    result = compare_phases(state["feedback_1"], state["feedback_2"])
+    return {"field_changes": len(result["field_changes"])}
+
+
+def _run_compare_attachments(state: Dict[str, Any]) -> Dict[str, Any]:
+    result = compare_attachments(state["attachments_1"], state["attachments_2"])
+    return {"changed": len(result["attachment_changes"]["details"])}
+
+
+BENCHMARKS = {
+    b.name: b
+    for b in [
+        Benchmark("fetch_feedback", _setup_fetch, _run_fetch),
+        Benchmark("extract_feedback_and_attachments", _setup_extract, _run_extract),
+        Benchmark("renormalize_raw_dump_rows", _setup_raw_dump, _run_renormalize_rows),
+        Benchmark("normalize_raw_dump", _setup_raw_dump, _run_normalize_raw_dump),
+        Benchmark("download_attachments_from_csv", _setup_download, _run_download, _reset_download, file_based=True),
+        Benchmark("organize_by_user_type", _setup_organize, _run_organize, _reset_organize, file_based=True),
+        Benchmark("compare_phases", _setup_compare, _run_compare_phases),
+        Benchmark("compare_attachments", _setup_compare, _run_compare_attachments),
+    ]
+}
+
+
+def run_benchmark(bench: Benchmark, size: str, opts: Options, repeat: int = 3) -> Dict[str, Any]:
+    """Set up `bench` at `size` rows in a scratch directory and time `repeat` runs."""
+    rows = SIZES[size] if size in SIZES else int(size)
+    if bench.file_based:
+        rows = min(rows, opts.max_files)
+    with tempfile.TemporaryDirectory(prefix=f"hys-bench-{bench.name}-") as tmp:
+        state = bench.setup(rows, Path(tmp), opts)
+        walls, cpus, extra = [], [], {}
+        for _ in range(repeat):
+            if bench.reset is not None:
+                bench.reset(state)
+            wall, cpu = time.perf_counter(), time.process_time()
+            # keep progress bars out of the report
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+                extra = bench.run(state)
+            walls.append(time.perf_counter() - wall)
+            cpus.append(time.process_time() - cpu)
+    median = statistics.median(walls)
+    return {
+        "benchmark": bench.name,
+        "size": size,
+        "rows": rows,
+        "repeat": repeat,
+        "min_s": min(walls),
+        "median_s": median,
+        "mean_s": statistics.fmean(walls),
+        "cpu_s": statistics.median(cpus),
+        "rows_per_s": rows / median if median else None,
+        "extra": extra,
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+
+        package_version = version("haveyoursay-analysis")
+    except Exception:
+        package_version = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "package_version": package_version,
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Messages for every benchmark whose median is more than `tolerance` slower than in `baseline`."""
+    before = {(r["benchmark"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = before.get((r["benchmark"], r["size"]))
+        if old is None or not old["median_s"]:
+            continue
+        ratio = r["median_s"] / old["median_s"]
+        line = f"{r['benchmark']}[{r['size']}]: {old['median_s']:.3f}s -> {r['median_s']:.3f}s ({ratio:.2f}x)"
+        print(line)
+        if ratio > 1 + tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark haveyoursay-analysis against a local mock API")
+    parser.add_argument("--sizes", default="1k,100k", help=f"Comma-separated row counts or {', '.join(SIZES)}")
+    parser.add_argument("--only", default=None, help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. baseline (0.25 = 25%%)")
+    defaults = Options()
+    for field_name, value in asdict(defaults).items():
+        flag = "--" + field_name.replace("_", "-")
+        if isinstance(value, bool):
+            parser.add_argument(flag, action="store_true")
+        else:
+            parser.add_argument(flag, type=type(value), default=value)
+    args = parser.parse_args(argv)
+
+    opts = Options(**{k: getattr(args, k) for k in asdict(defaults)})
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = []
+    for size in args.sizes.split(","):
+        for name in names:
+            r = run_benchmark(BENCHMARKS[name], size, opts, repeat=args.repeat)
+            rate = r["rows_per_s"] or 0
+            print(f"{name:35s} {size:>5s} {r['rows']:>9d} rows  median {r['median_s']:8.3f}s  {rate:12.0f} rows/s")
+            results.append(r)
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "options": asdict(opts),
+        "results": results,
+    }
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.out}")
+
+    if args.baseline is not None:
+        regressions = compare_to_baseline(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
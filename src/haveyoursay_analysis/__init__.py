@@ -1 +1 @@
-__all__ = ["api", "files", "cli"]
+__all__ = ["api", "client", "files", "cli"]
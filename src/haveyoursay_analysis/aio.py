@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncGenerator, Deque, Dict, Iterable, List, Optional
+
+try:
+    import httpx
+except ImportError as e:  # pragma: no cover - depends on environment
+    raise ImportError("The async API requires httpx: pip install 'haveyoursay-analysis[async]'") from e
+
+from . import api, metrics
+from .blobstore import BlobStore
+from .client import DEFAULT_POOL_MAXSIZE, USER_AGENT, get_retry_policy
+from .files import (
+    CHUNK_SIZE,
+    DownloadResult,
+    _DownloadJob,
+    _part_path,
+    _plan_downloads,
+    _record_failure,
+    _record_interrupted,
+    _record_success,
+    ensure_dir,
+)
+from .manifest import DownloadManifest
+
+
+def async_client(pool_size: int = DEFAULT_POOL_MAXSIZE, timeout: float = 30, **kwargs: Any) -> httpx.AsyncClient:
+    """
+    An `httpx.AsyncClient` with keep-alive pooling (`pool_size` connections) and the
+    package's User-Agent. Use it as `async with async_client() as client: ...` and
+    pass it to many calls to share one pool, e.g. for many publications on one loop.
+    """
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    headers = {"User-Agent": USER_AGENT, **kwargs.pop("headers", {})}
+    return httpx.AsyncClient(limits=limits, timeout=timeout, headers=headers, **kwargs)
+
+
+async def _aget_once(client: httpx.AsyncClient, url: str, params: Optional[Dict[str, Any]]) -> Any:
+    with metrics.track_request("api") as req:
+        resp = await client.get(url, params=params)
+        req["status"] = resp.status_code
+        req["bytes"] = len(resp.content)
+        resp.raise_for_status()
+    return resp
+
+
+async def _aget(client: httpx.AsyncClient, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    return await get_retry_policy().acall(_aget_once, client, url, params)
+
+
+async def _afetch_page(
+    client: httpx.AsyncClient, publication_id: int, page: int, page_size: int, language: str, sort: Optional[str] = None
+) -> Any:
+    params: Dict[str, Any] = {
+        "publicationId": publication_id,
+        "size": page_size,
+        "page": page,
+        "language": language,
+    }
+    if sort:
+        params["sort"] = sort
+    r = await _aget(client, api.FEEDBACK_ENDPOINT, params=params)
+    return r.json()
+
+
+async def aiter_feedback_pages(
+    publication_id: int,
+    page_size: int = 100,
+    language: str = "EN",
+    max_pages: Optional[int] = None,
+    concurrency: int = 1,
+    sort: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> AsyncGenerator[List[Dict[str, Any]], None]:
+    """
+    Async version of `api.iter_feedback_pages`: yields one list of items per page,
+    in page order. With `concurrency > 1`, pages after the first are fetched as up
+    to `2 * concurrency` concurrent tasks. Cancelling the consuming task, or
+    closing the iterator (`contextlib.aclosing`) after leaving the loop early,
+    cancels the requests still in flight.
+    """
+    own = client is None
+    client = client or async_client(pool_size=max(concurrency, 1))
+    pending: Deque[asyncio.Task] = deque()
+    try:
+        data = await _afetch_page(client, publication_id, 0, page_size, language, sort)
+        items = api._page_items(data)
+        if not items:
+            return
+        yield items
+
+        total_pages = api._total_pages(data, page_size)
+        if concurrency > 1 and total_pages is not None:
+            last = total_pages if max_pages is None else min(total_pages, max_pages)
+            todo = iter(range(1, last))
+
+            def submit_next() -> None:
+                page = next(todo, None)
+                if page is not None:
+                    pending.append(
+                        asyncio.ensure_future(_afetch_page(client, publication_id, page, page_size, language, sort))
+                    )
+
+            for _ in range(2 * concurrency):
+                submit_next()
+            while pending:
+                items = api._page_items(await pending.popleft())
+                if not items:
+                    return
+                submit_next()
+                yield items
+            return
+
+        stop = total_pages
+        if max_pages is not None:
+            stop = max_pages if stop is None else min(stop, max_pages)
+        page = 1
+        while stop is None or page < stop:
+            items = api._page_items(await _afetch_page(client, publication_id, page, page_size, language, sort))
+            if not items:
+                return
+            yield items
+            page += 1
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if own:
+            await client.aclose()
+
+
+async def aiter_feedback(
+    publication_id: int,
+    page_size: int = 100,
+    language: str = "EN",
+    max_pages: Optional[int] = None,
+    concurrency: int = 1,
+    client: Optional[httpx.AsyncClient] = None,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Feedback items one at a time; see `aiter_feedback_pages`."""
+    pages = aiter_feedback_pages(publication_id, page_size, language, max_pages, concurrency, client=client)
+    try:
+        async for items in pages:
+            for item in items:
+                yield item
+    finally:
+        await pages.aclose()
+
+
+async def afetch_feedback(
+    publication_id: int,
+    page_size: int = 100,
+    language: str = "EN",
+    max_pages: Optional[int] = None,
+    concurrency: int = 1,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict[str, Any]]:
+    """Async version of `api.fetch_feedback`."""
+    return [item async for item in aiter_feedback(publication_id, page_size, language, max_pages, concurrency, client)]
+
+
+async def _adownload(client: httpx.AsyncClient, url: str, out_path: Path, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async version of `files._download`: streamed to a `.part` file, resumable, atomically
+    renamed. File I/O and hashing run in worker threads so they never stall the loop.
+    """
+    return await get_retry_policy().acall(_adownload_once, client, url, out_path, meta)
+
+
+async def _adownload_once(client: httpx.AsyncClient, url: str, out_path: Path, meta: Dict[str, Any]) -> Dict[str, Any]:
+    part = _part_path(out_path)
+    offset = part.stat().st_size if part.exists() else 0
+    validator = meta.get("etag") or meta.get("last_modified")
+    headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset and validator else {}
+
+    with metrics.track_request("document") as req:
+        async with client.stream("GET", url, headers=headers) as r:
+            req["status"] = r.status_code
+            if r.status_code == 416:
+                # stale partial file; start over on the next attempt
+                part.unlink()
+            r.raise_for_status()
+            meta["etag"] = r.headers.get("ETag")
+            meta["last_modified"] = r.headers.get("Last-Modified")
+
+            h = hashlib.sha256()
+            if r.status_code == 206:
+                await asyncio.to_thread(_hash_into, h, part)
+                mode = "ab"
+            else:
+                offset, mode = 0, "wb"
+
+            size = offset
+            f = await asyncio.to_thread(open, part, mode)
+            try:
+                async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                    await asyncio.to_thread(_write_chunk, f, h, chunk)
+                    size += len(chunk)
+                    req["bytes"] += len(chunk)
+            finally:
+                # closed in place: on cancel the partial body must be flushed before it is recorded
+                f.close()
+            await asyncio.to_thread(os.replace, part, out_path)
+
+    meta.update(size=size, sha256=h.hexdigest())
+    return meta
+
+
+def _hash_into(h: Any, path: Path) -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+
+
+def _write_chunk(f: Any, h: Any, chunk: bytes) -> None:
+    f.write(chunk)
+    h.update(chunk)
+
+
+async def adownload_attachments(
+    rows: Iterable[Dict[str, Any]],
+    out_dir: Path,
+    language: str = "EN",
+    skip_existing: bool = True,
+    workers: int = 8,
+    manifest: Optional[DownloadManifest] = None,
+    verify: bool = False,
+    client: Optional[httpx.AsyncClient] = None,
+    blobs: Optional[BlobStore] = None,
+) -> DownloadResult:
+    """
+    Async version of `files.download_attachments`, with the same file naming,
+    manifest bookkeeping and result. At most `workers` downloads run at once.
+
+    Cancelling the call cancels every download; interrupted bodies stay as
+    `.part` files and are recorded as partial in the manifest (with the validators
+    the server sent), so the next run resumes them with a Range request.
+    """
+    ensure_dir(out_dir)
+    result = DownloadResult()
+    # planning may hash existing files (verify), so it runs off the loop
+    jobs = await asyncio.to_thread(_plan_downloads, rows, out_dir, language, skip_existing, manifest, verify, result)
+    own = client is None
+    client = client or async_client(pool_size=max(workers, 1), timeout=60)
+    limit = asyncio.Semaphore(max(1, workers))
+
+    async def run(job: _DownloadJob) -> None:
+        async with limit:
+            try:
+                info = await _adownload(client, job.url, job.out_path, job.meta)
+                if blobs is not None:
+                    await asyncio.to_thread(blobs.add, job.out_path, info["sha256"])
+            except asyncio.CancelledError:
+                _record_interrupted(job, manifest)
+                raise
+            except Exception as e:
+                _record_failure(job, e, result, manifest)
+                return
+            _record_success(job, info, result, manifest, None)
+
+    tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own:
+            await client.aclose()
+    return result
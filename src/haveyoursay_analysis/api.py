@@ -1,75 +1,114 @@
 from __future__ import annotations
 
-import backoff
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 
+from . import metrics
+from .client import get_retry_policy, http_get
+
 BASE_URL = "https://ec.europa.eu/info/law/better-regulation"
 FEEDBACK_ENDPOINT = f"{BASE_URL}/api/allFeedback"
+# `sort` value listing the most recent feedback first (as used by the Have Your Say site)
+NEWEST_FIRST = "dateFeedback,DESC"
 
 
 class ApiError(Exception):
     pass
 
 
-@backoff.on_exception(backoff.expo, (requests.RequestException,), max_tries=5)
-def _get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 30) -> requests.Response:
-    resp = requests.get(url, params=params, timeout=timeout)
-    resp.raise_for_status()
+def _get_once(url: str, params: Optional[Dict[str, Any]], timeout: int) -> requests.Response:
+    with metrics.track_request("api") as req:
+        resp = http_get(url, params=params, timeout=timeout)
+        req["status"] = resp.status_code
+        req["bytes"] = len(resp.content)
+        resp.raise_for_status()
     return resp
 
 
-def fetch_feedback(
+def _get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 30) -> requests.Response:
+    """GET with the shared retry policy (`client.configure_retry`)."""
+    return get_retry_policy().call(_get_once, url, params, timeout)
+
+
+def _page_items(data: Any) -> List[Dict[str, Any]]:
+    """Return the feedback items of one API page (`content` or legacy `_embedded.feedback`)."""
+    if isinstance(data, dict):
+        if "content" in data and isinstance(data["content"], list):
+            return data["content"]
+        if "_embedded" in data and isinstance(data["_embedded"], dict):
+            embedded = data["_embedded"]
+            if "feedback" in embedded and isinstance(embedded["feedback"], list):
+                return embedded["feedback"]
+    return []
+
+
+def _total_pages(data: Any, page_size: int) -> Optional[int]:
+    """
+    Return the total page count advertised by an API page, if any.
+    Looks at `totalPages`, then `totalElements`, then the legacy HAL `page` block.
+    """
+    if not isinstance(data, dict):
+        return None
+    page = data.get("page")
+    meta = page if isinstance(page, dict) else data
+    try:
+        if "totalPages" in meta:
+            return int(meta["totalPages"])
+        if "totalElements" in meta and page_size > 0:
+            return -(-int(meta["totalElements"]) // page_size)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def _fetch_page(publication_id: int, page: int, page_size: int, language: str, sort: Optional[str] = None) -> Any:
+    params: Dict[str, Any] = {
+        "publicationId": publication_id,
+        "size": page_size,
+        "page": page,
+        "language": language,
+    }
+    if sort:
+        params["sort"] = sort
+    r = _get(FEEDBACK_ENDPOINT, params=params)
+    with metrics.stage("api.parse_json"):
+        return r.json()
+
+
+def iter_feedback_pages(
     publication_id: int,
     page_size: int = 100,
     language: str = "EN",
     max_pages: Optional[int] = None,
-) -> List[Dict[str, Any]]:
+    concurrency: int = 1,
+    sort: Optional[str] = None,
+) -> Iterator[List[Dict[str, Any]]]:
     """
-    Fetch feedback items for a given publicationId.
+    Yield feedback items for a given publicationId one page at a time, in page order.
     Handles current API (`content`) and legacy (`_embedded.feedback`) structures.
+
+    With `concurrency > 1`, the first page is fetched alone to learn the total
+    page count and the remaining pages are then fetched in parallel by a pool of
+    `concurrency` threads, keeping at most `2 * concurrency` pages in flight. If
+    the API does not advertise a page count, pages are walked sequentially.
+
+    `sort` is passed through to the API, e.g. `NEWEST_FIRST` for incremental fetches.
     """
-    feedback: List[Dict[str, Any]] = []
     page = 0
 
     while True:
-        params = {
-            "publicationId": publication_id,
-            "size": page_size,
-            "page": page,
-            "language": language,
-        }
-        r = _get(FEEDBACK_ENDPOINT, params=params)
-        data = r.json()
-
-        items: List[Dict[str, Any]] = []
-        if isinstance(data, dict):
-            if "content" in data and isinstance(data["content"], list):
-                items = data["content"]
-            elif "_embedded" in data and isinstance(data["_embedded"], dict):
-                embedded = data["_embedded"]
-                if "feedback" in embedded and isinstance(embedded["feedback"], list):
-                    items = embedded["feedback"]
+        data = _fetch_page(publication_id, page, page_size, language, sort)
+        items = _page_items(data)
 
         if not items:
             break
 
-        feedback.extend(items)
+        yield items
 
         # pagination control
-        total_pages: Optional[int] = None
-        if "totalPages" in data:
-            # some APIs return `totalPages`
-            try:
-                total_pages = int(data["totalPages"])  # type: ignore
-            except Exception:
-                total_pages = None
-        elif "pageable" in data and isinstance(data["pageable"], dict):
-            # current API often returns `pageable` and `totalElements`
-            # we continue until `items` is empty
-            total_pages = None
+        total_pages = _total_pages(data, page_size)
 
         page += 1
         if max_pages is not None and page >= max_pages:
@@ -77,48 +116,118 @@ def fetch_feedback(
         if total_pages is not None and page >= total_pages:
             break
 
-    return feedback
+        if concurrency > 1 and total_pages is not None:
+            last = total_pages if max_pages is None else min(total_pages, max_pages)
+            yield from _iter_pages_parallel(publication_id, range(page, last), page_size, language, concurrency, sort)
+            break
 
 
-def extract_feedback_and_attachments(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+def fetch_feedback(
+    publication_id: int,
+    page_size: int = 100,
+    language: str = "EN",
+    max_pages: Optional[int] = None,
+    concurrency: int = 1,
+) -> List[Dict[str, Any]]:
     """
-    Normalize feedback and attachment metadata from raw items.
-    Returns dict with keys: `feedback`, `attachments`.
+    Fetch all feedback items for a given publicationId into one list.
+    See `iter_feedback_pages` for pagination and `concurrency`.
     """
-    feedback_norm: List[Dict[str, Any]] = []
-    attachments_norm: List[Dict[str, Any]] = []
+    return [
+        item
+        for items in iter_feedback_pages(publication_id, page_size, language, max_pages, concurrency)
+        for item in items
+    ]
 
-    for row in rows:
-        # feedback-level fields
-        fid = row.get("id") or row.get("feedbackId")
-        user_type = row.get("userType")
-        author = row.get("author")
-        country = row.get("country")
-        created = row.get("createdDate") or row.get("created")
 
-        feedback_norm.append({
+def _iter_pages_parallel(
+    publication_id: int,
+    pages: Iterable[int],
+    page_size: int,
+    language: str,
+    concurrency: int,
+    sort: Optional[str] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Fetch `pages` on a thread pool; stop at the first empty page like the sequential walk."""
+    from collections import deque
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    todo = iter(pages)
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def submit_next() -> None:
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(pool.submit(_fetch_page, publication_id, nxt, page_size, language, sort))
+
+        try:
+            for _ in range(2 * concurrency):
+                submit_next()
+            # futures are consumed in submission order, i.e. page order
+            while pending:
+                items = _page_items(pending.popleft().result())
+                if not items:
+                    break
+                submit_next()
+                yield items
+        finally:
+            for f in pending:
+                f.cancel()
+
+
+def normalize_row(row: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Normalize one raw feedback item.
+    Returns `(feedback_record, attachment_records)`.
+    """
+    # feedback-level fields
+    fid = row.get("id") or row.get("feedbackId")
+    user_type = row.get("userType")
+    author = row.get("author")
+    country = row.get("country")
+    created = row.get("createdDate") or row.get("created")
+
+    feedback = {
+        "feedback_id": fid,
+        "userType": user_type,
+        "author": author,
+        "country": country,
+        "created": created,
+    }
+
+    # attachments (varied structures: `attachments`, `documents`)
+    docs = []
+    if isinstance(row.get("attachments"), list):
+        docs = row["attachments"]
+    elif isinstance(row.get("documents"), list):
+        docs = row["documents"]
+
+    attachments = []
+    for d in docs:
+        document_id = d.get("documentId") or d.get("id")
+        file_name = d.get("fileName") or d.get("name")
+        attachments.append({
             "feedback_id": fid,
+            "document_id": document_id,
+            "file_name": file_name,
             "userType": user_type,
-            "author": author,
-            "country": country,
-            "created": created,
         })
 
-        # attachments (varied structures: `attachments`, `documents`)
-        docs = []
-        if isinstance(row.get("attachments"), list):
-            docs = row["attachments"]
-        elif isinstance(row.get("documents"), list):
-            docs = row["documents"]
-
-        for d in docs:
-            document_id = d.get("documentId") or d.get("id")
-            file_name = d.get("fileName") or d.get("name")
-            attachments_norm.append({
-                "feedback_id": fid,
-                "document_id": document_id,
-                "file_name": file_name,
-                "userType": user_type,
-            })
+    return feedback, attachments
+
+
+def extract_feedback_and_attachments(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Normalize feedback and attachment metadata from raw items.
+    Returns dict with keys: `feedback`, `attachments`.
+    """
+    feedback_norm: List[Dict[str, Any]] = []
+    attachments_norm: List[Dict[str, Any]] = []
+
+    with metrics.stage("api.normalize"):
+        for row in rows:
+            feedback, attachments = normalize_row(row)
+            feedback_norm.append(feedback)
+            attachments_norm.extend(attachments)
 
     return {"feedback": feedback_norm, "attachments": attachments_norm}
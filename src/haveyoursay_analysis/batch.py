@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from tqdm import tqdm
+
+from .api import iter_feedback_pages
+from .snapshot import fetch_incremental, write_snapshot
+
+SUMMARY_FILENAME = "batch_summary.csv"
+
+
+def read_publication_ids(path: Path) -> List[int]:
+    """Read publication ids from a text file: one per line (or comma separated); `#` starts a comment."""
+    ids: List[int] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            ids.extend(int(tok) for tok in line.replace(",", " ").split())
+    return ids
+
+
+def _tick(bar: tqdm, lock: threading.Lock) -> None:
+    with lock:
+        bar.update(1)
+
+
+def _counted(pages: Iterable[List[Dict[str, Any]]], bar: tqdm, lock: threading.Lock) -> Iterator[List[Dict[str, Any]]]:
+    for items in pages:
+        _tick(bar, lock)
+        yield items
+
+
+def fetch_batch(
+    publication_ids: Iterable[int],
+    out_dir: Path,
+    page_size: int = 100,
+    language: str = "EN",
+    concurrency: int = 2,
+    parallel: int = 4,
+    incremental: bool = False,
+    fmt: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch many publications into `out_dir/<publication_id>/`, `parallel` at a time,
+    each with up to `concurrency` page requests in flight.
+
+    All requests share the HTTP session and the global rate limit set with
+    `client.configure_rate_limit`, so total throughput stays under one budget. A
+    single progress bar counts pages across publications. A failing publication
+    does not stop the others; per-publication outcomes are returned and written to
+    `batch_summary.csv` in `out_dir`. Tables are written in format `fmt` (default CSV;
+    with `incremental`, each existing snapshot keeps its format).
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    import pandas as pd
+
+    ids = list(dict.fromkeys(publication_ids))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    lock = threading.Lock()
+    results: List[Dict[str, Any]] = []
+
+    with tqdm(desc="Fetching publications", unit="page") as bar:
+        done = 0
+        bar.set_postfix(publications=f"0/{len(ids)}")
+
+        def run(pid: int) -> Dict[str, Any]:
+            target = out_dir / str(pid)
+            if incremental:
+                # incremental paging is sequential: it stops at the first known page
+                new, writer = fetch_incremental(
+                    pid, target, page_size=page_size, language=language, fmt=fmt, on_page=lambda _: _tick(bar, lock)
+                )
+            else:
+                pages = iter_feedback_pages(pid, page_size=page_size, language=language, concurrency=concurrency)
+                writer = write_snapshot(_counted(pages, bar, lock), target, fmt=fmt or "csv")
+                new = writer.raw_count
+            return {"feedback": writer.feedback_count, "attachments": writer.attachment_count, "new": new}
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            futures = {pool.submit(run, pid): pid for pid in ids}
+            for fut in as_completed(futures):
+                pid = futures[fut]
+                try:
+                    results.append({"publication_id": pid, "status": "ok", **fut.result(), "error": None})
+                except Exception as e:
+                    results.append({"publication_id": pid, "status": "failed", "error": f"{type(e).__name__}: {e}"})
+                done += 1
+                with lock:
+                    bar.set_postfix(publications=f"{done}/{len(ids)}")
+
+    results.sort(key=lambda r: ids.index(r["publication_id"]))
+    pd.DataFrame(results, columns=["publication_id", "status", "feedback", "attachments", "new", "error"]).to_csv(
+        out_dir / SUMMARY_FILENAME, index=False
+    )
+    return results
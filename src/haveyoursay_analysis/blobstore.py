@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from .manifest import sha256_file
+
+# How organized views refer to stored bytes
+LINK_MODES = ("hardlink", "symlink", "copy")
+
+
+def link_file(src: Path, dst: Path, mode: str = "hardlink") -> str:
+    """
+    Make `dst` refer to the bytes of `src` and return the mode actually used.
+
+    A hardlink that the filesystem refuses (another device, no link support) falls
+    back to a copy. An existing `dst` is replaced.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode {mode!r}; expected one of {LINK_MODES}")
+    if mode == "hardlink":
+        # fast path for a fresh target: a single syscall
+        try:
+            os.link(src, dst)
+            return mode
+        except FileExistsError:
+            pass
+        except OSError:
+            mode = "copy"
+    tmp = dst.with_name(f".{dst.name}.link")
+    if tmp.exists() or tmp.is_symlink():
+        tmp.unlink()
+    if mode == "hardlink":
+        try:
+            os.link(src, tmp)
+        except OSError:
+            mode = "copy"
+    if mode == "symlink":
+        os.symlink(src.resolve(), tmp)
+    elif mode == "copy":
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return mode
+
+
+class BlobStore:
+    """
+    Content-addressed store of downloaded documents: every distinct file is kept
+    once under `sha256/<2 hex>/<sha256>` in `root`, however many feedback,
+    publications or download folders refer to it. Folders that use the store
+    hold hardlinks to the blobs, so they cost no extra disk.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        (root / "sha256").mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / "sha256" / sha256[:2] / sha256
+
+    def __contains__(self, sha256: str) -> bool:
+        return self.path_for(sha256).exists()
+
+    def add(self, path: Path, sha256: Optional[str] = None, link: str = "hardlink") -> tuple[str, bool]:
+        """
+        Move `path` into the store and leave a link to the blob in its place.
+
+        If the bytes are already stored, `path` is simply replaced by a link to
+        the existing blob. Returns `(sha256, was_new)`.
+        """
+        sha256 = sha256 or sha256_file(path)
+        blob = self.path_for(sha256)
+        new = not blob.exists()
+        if new:
+            blob.parent.mkdir(exist_ok=True)
+            try:
+                os.replace(path, blob)
+            except OSError:
+                # store on another filesystem: copy in, then keep the original bytes as a copy
+                tmp = blob.with_name(f".{blob.name}.tmp")
+                shutil.copy2(path, tmp)
+                os.replace(tmp, blob)
+        elif path.samefile(blob):
+            return sha256, False
+        link_file(blob, path, link)
+        return sha256, new
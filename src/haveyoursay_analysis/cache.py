@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+INDEX_FILENAME = "index.sqlite"
+CHUNK_SIZE = 1 << 16
+
+_COLUMNS = ["key", "url", "blob", "size", "etag", "last_modified", "content_type", "stored_at", "accessed_at"]
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a request is not in the cache."""
+
+
+class _BlobReader:
+    """
+    Body of a streamed cache hit. The blob is closed at EOF, or when the response is
+    closed (`requests` calls `release_conn` then), so no file descriptor is left open.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._file = open(path, "rb")
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def read(self, size: int = -1) -> bytes:
+        if self._file.closed:
+            return b""
+        data = self._file.read(size)
+        if not data or size is None or size < 0:
+            self._file.close()
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+    release_conn = close
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Stable key for a GET request: SHA-256 of the URL with sorted query params."""
+    canonical = url
+    if params:
+        canonical += ("&" if "?" in url else "?") + urlencode(sorted((k, str(v)) for k, v in params.items()))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for GET responses (API pages and documents).
+
+    Bodies are stored once per SHA-256 under `blobs/`; a SQLite index maps request
+    keys (URL + params) to blobs with their ETag/Last-Modified. Entries younger than
+    `ttl` seconds are served without touching the network; older ones are revalidated
+    with `If-None-Match`/`If-Modified-Since`. With `max_bytes`, least recently used
+    entries are evicted and bodies larger than `max_bytes` are served but not kept.
+    In `offline` mode the network is never used.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        offline: bool = False,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        (cache_dir / "blobs").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # held while a blob is moved into place, indexed and opened, and while one is deleted
+        self._blob_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(cache_dir / INDEX_FILENAME), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                blob TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                stored_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / digest
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(_COLUMNS, row))
+        return entry if self._blob_path(entry["blob"]).exists() else None
+
+    def _touch(self, key: str, revalidated: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._conn.execute("UPDATE entries SET accessed_at = ?, stored_at = ? WHERE key = ?", (now, now, key))
+            else:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+    def _store(self, key: str, url: str, resp: requests.Response, stream: bool) -> requests.Response:
+        """
+        Stream `resp` into a blob, index it and return the cached response; memory use
+        is one chunk. The blob is opened before any eviction, which could delete it.
+        """
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    h.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        digest = h.hexdigest()
+        now = time.time()
+        entry = {
+            "key": key,
+            "url": url,
+            "blob": digest,
+            "size": size,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "content_type": resp.headers.get("Content-Type"),
+            "stored_at": now,
+            "accessed_at": now,
+        }
+        oversized = self.max_bytes is not None and size > self.max_bytes
+        with self._blob_lock:
+            blob = self._blob_path(digest)
+            try:
+                blob.parent.mkdir(exist_ok=True)
+                os.replace(tmp, blob)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            if not oversized:
+                with self._lock:
+                    self._conn.execute(
+                        f"INSERT OR REPLACE INTO entries ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                        [entry[c] for c in _COLUMNS],
+                    )
+                    self._conn.commit()
+            cached = self._response(entry, url, stream)
+        if oversized:
+            # served from the open blob, but never kept: it alone would exceed the budget
+            self._discard(digest)
+        elif self.max_bytes is not None:
+            self.evict(self.max_bytes, keep=key)
+        return cached
+
+    def _cached(self, entry: Dict[str, Any], url: str, stream: bool) -> Optional[requests.Response]:
+        """The response for an indexed entry, or None if its blob was evicted meanwhile."""
+        with self._blob_lock:
+            try:
+                return self._response(entry, url, stream)
+            except FileNotFoundError:
+                return None
+
+    def _response(self, entry: Dict[str, Any], url: str, stream: bool) -> requests.Response:
+        """A 200 response served from the cached blob (streamed from disk if `stream`)."""
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp.reason = "OK (cached)"
+        resp.headers = CaseInsensitiveDict({
+            k: v for k, v in (
+                ("ETag", entry["etag"]),
+                ("Last-Modified", entry["last_modified"]),
+                ("Content-Type", entry["content_type"]),
+                ("Content-Length", str(entry["size"])),
+                ("X-Cache", "HIT"),
+            ) if v
+        })
+        if stream:
+            resp.raw = _BlobReader(self._blob_path(entry["blob"]))
+        else:
+            resp._content = self._blob_path(entry["blob"]).read_bytes()
+        return resp
+
+    def get(
+        self,
+        session: requests.Session,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """GET `url` through the cache; only complete 200 responses are stored."""
+        if kwargs.get("headers", {}).get("Range"):
+            # partial content is never cached; a fresh full body is preferable to a resume
+            kwargs["headers"] = {k: v for k, v in kwargs["headers"].items() if k not in ("Range", "If-Range")}
+
+        stream = bool(kwargs.pop("stream", False))
+        key = cache_key(url, params)
+        entry = self.lookup(key)
+        fresh = entry is not None and self.ttl is not None and time.time() - entry["stored_at"] < self.ttl
+        if entry is not None and (self.offline or fresh):
+            cached = self._cached(entry, url, stream)
+            if cached is not None:
+                self._touch(key)
+                return cached
+            entry = None
+        if self.offline:
+            raise OfflineCacheMiss(f"Not in cache (offline mode): {url}")
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        conditional = dict(headers)
+        if entry is not None:
+            if entry["etag"]:
+                conditional["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                conditional["If-Modified-Since"] = entry["last_modified"]
+        resp = session.get(url, params=params, timeout=timeout, headers=conditional, stream=True, **kwargs)
+
+        if resp.status_code == 304 and entry is not None:
+            resp.close()
+            cached = self._cached(entry, url, stream)
+            if cached is not None:
+                self._touch(key, revalidated=True)
+                return cached
+            # evicted since the lookup: fetch the full body again
+            resp = session.get(url, params=params, timeout=timeout, headers=headers, stream=True, **kwargs)
+        if resp.status_code != 200:
+            return resp
+        with resp:
+            return self._store(key, url, resp, stream)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)"
+            ).fetchone()
+        return int(row[0])
+
+    def _discard(self, blob: str) -> None:
+        """Delete a blob unless an entry still refers to it."""
+        with self._blob_lock:
+            with self._lock:
+                shared = self._conn.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob,)).fetchone()
+            if not shared:
+                self._blob_path(blob).unlink(missing_ok=True)
+
+    def evict(self, max_bytes: int, keep: Optional[str] = None) -> int:
+        """
+        Drop least recently used entries until the cache holds at most `max_bytes`,
+        never the entry `keep`. Returns entries removed.
+        """
+        removed = 0
+        total = self.total_bytes()
+        while total > max_bytes:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT key, blob FROM entries WHERE key IS NOT ? ORDER BY accessed_at LIMIT 1", (keep,)
+                ).fetchone()
+                if row is None:
+                    break
+                key, blob = row
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+            self._discard(blob)
+            removed += 1
+            total = self.total_bytes()
+        return removed
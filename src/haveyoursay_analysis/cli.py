@@ -1,81 +1,242 @@
 from __future__ import annotations
 
+import contextlib
 from pathlib import Path
-from typing import Optional, List
+from typing import List, Optional
 
 import typer
-from tqdm import tqdm
 
-from .api import fetch_feedback, extract_feedback_and_attachments
-from .files import download_attachments_from_csv, organize_by_user_type
-from .compare import compare_phases, compare_attachments, generate_report
+# Only light modules are imported here. Command modules, and pandas/requests with
+# them, are imported inside each command so `--help` and small commands start fast.
+from . import metrics
+from .defaults import (
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_THRESHOLD,
+    DEFAULT_TIMEOUT,
+    INDEX_FILENAME,
+    SIGNATURES_FILENAME,
+    TEXT_STORE_FILENAME,
+)
 
 app = typer.Typer(help="Tools for EU 'Have Your Say' feedback & attachments")
 
 
+@app.callback()
+def main(
+    ctx: typer.Context,
+    metrics_out: Optional[Path] = typer.Option(
+        None, help="Write run metrics here after the command: Prometheus textfile if it ends in .prom, else JSON"
+    ),
+    profile: Optional[Path] = typer.Option(None, help="Profile the command and write the result to this file"),
+    profiler: str = typer.Option("cprofile", help="cprofile (pstats file) or pyinstrument (HTML report)"),
+):
+    """Options given before the command apply to any command."""
+    if profiler not in metrics.PROFILERS:
+        raise typer.BadParameter(f"--profiler must be one of {metrics.PROFILERS}")
+    stack = contextlib.ExitStack()
+    if metrics_out is not None:
+        recorder = metrics.reset_metrics()
+        # callbacks run last-in first-out: the command stage closes before the file is written
+        stack.callback(recorder.write, metrics_out)
+        stack.enter_context(recorder.stage(f"command.{ctx.invoked_subcommand}", cpu="process"))
+    if profile is not None:
+        stack.enter_context(metrics.profiling(profile, profiler))
+    ctx.call_on_close(stack.close)
+
+
+def _setup_http(
+    pool_size: int,
+    cache_dir: Optional[Path] = None,
+    offline: bool = False,
+    cache_ttl: Optional[float] = None,
+    cache_max_mb: Optional[int] = None,
+) -> None:
+    """Configure the shared HTTP session and optional response cache for a command."""
+    from .cache import ResponseCache
+    from .client import configure_cache, configure_session
+
+    configure_session(pool_maxsize=pool_size)
+    if offline and cache_dir is None:
+        raise typer.BadParameter("--offline requires --cache-dir")
+    if cache_dir is not None:
+        max_bytes = cache_max_mb * 1024 * 1024 if cache_max_mb is not None else None
+        configure_cache(ResponseCache(cache_dir, ttl=cache_ttl, max_bytes=max_bytes, offline=offline))
+
+
 @app.command()
 def fetch(
     publication_id: int = typer.Option(..., help="EC publicationId, e.g., 14488"),
     out: Path = typer.Option(Path("data"), help="Output folder for JSON and CSVs"),
     page_size: int = typer.Option(100, help="API page size"),
     language: str = typer.Option("EN", help="Language parameter for API"),
+    concurrency: int = typer.Option(4, help="Pages fetched in parallel once the page count is known"),
+    pool_size: int = typer.Option(DEFAULT_POOL_MAXSIZE, help="Max kept-alive HTTP connections per host"),
+    incremental: bool = typer.Option(False, help="Only fetch feedback newer than the snapshot in --out and merge it"),
+    cache_dir: Optional[Path] = typer.Option(None, help="Cache HTTP responses in this directory"),
+    offline: bool = typer.Option(False, help="Serve everything from --cache-dir; never use the network"),
+    cache_ttl: Optional[float] = typer.Option(None, help="Seconds a cached response is used without revalidation"),
+    cache_max_mb: Optional[int] = typer.Option(None, help="Evict least recently used cache entries above this size"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="Table format: csv, parquet or arrow (default: csv; --incremental keeps the snapshot's)"
+    ),
+    db: Optional[Path] = typer.Option(None, help="Also upsert the snapshot into this SQLite database (see query)"),
 ):
-    """Fetch feedback JSON and export normalized CSVs."""
+    """Fetch feedback JSON and export normalized feedback and attachments tables."""
+    from tqdm import tqdm
+
+    from .api import iter_feedback_pages
+    from .snapshot import fetch_incremental, write_snapshot
+    from .storage import table_path
+
     out.mkdir(parents=True, exist_ok=True)
+    _setup_http(pool_size, cache_dir, offline, cache_ttl, cache_max_mb)
 
+    if incremental:
+        typer.echo(f"Fetching new feedback for publicationId={publication_id}")
+        new, writer = fetch_incremental(publication_id, out, page_size=page_size, language=language, fmt=fmt)
+        typer.echo(f"Fetched {new} new feedback items ({writer.feedback_count} total)")
+        typer.echo(f"Wrote: {table_path(out, 'feedback', writer.fmt)} and {table_path(out, 'attachments', writer.fmt)}")
+        _load_db(db, [(publication_id, out)])
+        return
+
+    fmt = fmt or "csv"
     typer.echo(f"Fetching feedback for publicationId={publication_id}")
-    rows = fetch_feedback(publication_id, page_size=page_size, language=language)
-    typer.echo(f"Fetched {len(rows)} feedback items")
+    pages = iter_feedback_pages(publication_id, page_size=page_size, language=language, concurrency=concurrency)
+    # Raw NDJSON (for audit) and normalized tables are written page by page
+    writer = write_snapshot(tqdm(pages, desc="Fetching pages", unit="page"), out, fmt=fmt)
+    typer.echo(f"Fetched {writer.raw_count} feedback items")
+
+    typer.echo(f"Wrote: {table_path(out, 'feedback', fmt)} and {table_path(out, 'attachments', fmt)}")
+    _load_db(db, [(publication_id, out)])
 
-    # Save raw JSON for audit
-    raw_path = out / "feedback_raw.json"
-    import json
 
-    with open(raw_path, "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
+def _load_db(db: Optional[Path], snapshots: List[tuple]) -> None:
+    """Upsert `(publication_id, snapshot_dir)` pairs into the database at `db`, if one is given."""
+    if db is None or not snapshots:
+        return
+    from .database import FeedbackDatabase
 
-    # Normalize and save CSVs
-    data = extract_feedback_and_attachments(rows)
-    import pandas as pd
+    with FeedbackDatabase(db) as database:
+        for pid, snapshot_dir in snapshots:
+            loaded = database.load_snapshot(snapshot_dir, pid)
+            typer.echo(
+                f"Loaded {pid} into {db}: {loaded['feedback']} feedback ({loaded['new']} new), "
+                f"{loaded['attachments']} attachments"
+            )
 
-    fb_df = pd.DataFrame(data["feedback"]).drop_duplicates()
-    at_df = pd.DataFrame(data["attachments"]).drop_duplicates()
 
-    fb_df.to_csv(out / "feedback.csv", index=False)
-    at_df.to_csv(out / "attachments.csv", index=False)
+@app.command()
+def batch(
+    publication_id: Optional[List[int]] = typer.Option(None, help="Publication id; repeat for several"),
+    ids_file: Optional[Path] = typer.Option(None, help="Text file with publication ids, one per line"),
+    out: Path = typer.Option(Path("data"), help="Base folder; each publication goes to <out>/<publication_id>"),
+    page_size: int = typer.Option(100, help="API page size"),
+    language: str = typer.Option("EN", help="Language parameter for API"),
+    concurrency: int = typer.Option(2, help="Pages fetched in parallel per publication"),
+    parallel: int = typer.Option(4, help="Publications fetched at the same time"),
+    rate: float = typer.Option(5.0, help="Global limit on API requests per second (0 = unlimited)"),
+    burst: Optional[int] = typer.Option(None, help="Requests allowed back to back before the rate applies"),
+    pool_size: int = typer.Option(DEFAULT_POOL_MAXSIZE, help="Max kept-alive HTTP connections per host"),
+    incremental: bool = typer.Option(False, help="Only fetch feedback newer than each existing snapshot"),
+    cache_dir: Optional[Path] = typer.Option(None, help="Cache HTTP responses in this directory"),
+    offline: bool = typer.Option(False, help="Serve everything from --cache-dir; never use the network"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="Table format: csv, parquet or arrow (default: csv; --incremental keeps each snapshot's)"
+    ),
+    db: Optional[Path] = typer.Option(None, help="Also upsert every fetched publication into this SQLite database"),
+):
+    """Fetch many publications through one rate-limited scheduler."""
+    from .batch import SUMMARY_FILENAME, fetch_batch, read_publication_ids
+    from .client import configure_rate_limit
+
+    ids = list(publication_id or [])
+    if ids_file is not None:
+        ids.extend(read_publication_ids(ids_file))
+    if not ids:
+        raise typer.BadParameter("Give at least one --publication-id or an --ids-file")
 
-    typer.echo(f"Wrote: {out / 'feedback.csv'} and {out / 'attachments.csv'}")
+    _setup_http(pool_size, cache_dir, offline)
+    configure_rate_limit(rate or None, burst)
+
+    results = fetch_batch(
+        ids,
+        out,
+        page_size=page_size,
+        language=language,
+        concurrency=concurrency,
+        parallel=parallel,
+        incremental=incremental,
+        fmt=fmt,
+    )
+    failed = [r for r in results if r["status"] != "ok"]
+    typer.echo(f"Fetched {len(results) - len(failed)} of {len(results)} publications into {out}")
+    _load_db(db, [(r["publication_id"], out / str(r["publication_id"])) for r in results if r["status"] == "ok"])
+    for r in failed:
+        typer.echo(f"  {r['publication_id']}: {r['error']}")
+    typer.echo(f"Summary: {out / SUMMARY_FILENAME}")
+    if failed:
+        raise typer.Exit(code=1)
 
 
 @app.command()
 def download(
-    attachments_csv: Path = typer.Option(..., help="Path to attachments.csv"),
+    attachments_csv: Path = typer.Option(..., help="Path to attachments.csv (or .parquet/.arrow)"),
     out: Path = typer.Option(..., help="Output directory for files"),
     language: str = typer.Option("EN", help="Language for document endpoint"),
     only: Optional[List[str]] = typer.Option(None, help="Filter by userType, e.g., NGO TRADE_UNION"),
     skip_existing: bool = typer.Option(True, help="Skip files that already exist"),
+    pool_size: int = typer.Option(DEFAULT_POOL_MAXSIZE, help="Max kept-alive HTTP connections per host"),
+    workers: int = typer.Option(8, help="Parallel downloads"),
+    manifest: bool = typer.Option(True, help="Track downloads in a resumable manifest in the output directory"),
+    verify: bool = typer.Option(False, help="Re-check SHA-256 of files the manifest lists as done"),
+    cache_dir: Optional[Path] = typer.Option(None, help="Cache HTTP responses in this directory"),
+    offline: bool = typer.Option(False, help="Serve everything from --cache-dir; never use the network"),
+    cache_ttl: Optional[float] = typer.Option(None, help="Seconds a cached response is used without revalidation"),
+    cache_max_mb: Optional[int] = typer.Option(None, help="Evict least recently used cache entries above this size"),
+    blob_store: Optional[Path] = typer.Option(
+        None, help="Keep each distinct file once in this content-addressed store and hardlink it into --out"
+    ),
 ):
     """Download attachments from attachments.csv using EC document endpoint."""
+    from .files import FAILURES_FILENAME, download_attachments_from_csv
+
+    _setup_http(pool_size, cache_dir, offline, cache_ttl, cache_max_mb)
     downloaded, failed = download_attachments_from_csv(
         attachments_csv=attachments_csv,
         out_dir=out,
         language=language,
         only_user_types=only,
         skip_existing=skip_existing,
+        workers=workers,
+        use_manifest=manifest,
+        verify=verify,
+        blob_store=blob_store,
     )
     typer.echo(f"Downloaded: {downloaded}, Failed: {failed}")
+    if failed:
+        typer.echo(f"Failure details: {out / FAILURES_FILENAME}")
 
 
 @app.command()
 def organize(
     attachments_dir: Path = typer.Option(..., help="Directory with downloaded attachments"),
-    attachments_csv: Path = typer.Option(..., help="Path to attachments.csv"),
-    feedback_csv: Path = typer.Option(..., help="Path to feedback.csv"),
-    out: Path = typer.Option(..., help="Output base directory for userType folders"),
-    only: Optional[List[str]] = typer.Option(None, help="Filter by userType; repeat flag for multiple values, e.g., --only NGO --only TRADE_UNION"),
-    move: bool = typer.Option(False, help="Move files instead of copy"),
+    attachments_csv: Path = typer.Option(..., help="Path to attachments.csv (or .parquet/.arrow)"),
+    feedback_csv: Path = typer.Option(..., help="Path to feedback.csv (or .parquet/.arrow)"),
+    out: Path = typer.Option(..., help="Output base directory with one folder per value of --by"),
+    only: Optional[List[str]] = typer.Option(
+        None, help="Keep only these values of the --by column; repeat flag for multiple values, e.g., --only NGO"
+    ),
+    move: bool = typer.Option(False, help="Move files instead of linking them"),
+    link: str = typer.Option("hardlink", help="How files are placed: hardlink, symlink or copy"),
+    by: str = typer.Option("userType", help="Feedback column to group by, e.g. userType or country"),
+    workers: int = typer.Option(8, help="Parallel link/copy workers"),
 ):
-    """Organize downloaded attachments into subfolders by userType using attachments.csv and feedback.csv."""
+    """Organize downloaded attachments into subfolders by a feedback column (userType by default)."""
+    from .blobstore import LINK_MODES
+    from .files import organize_by_user_type
+
+    if link not in LINK_MODES:
+        raise typer.BadParameter(f"--link must be one of {', '.join(LINK_MODES)}")
     n = organize_by_user_type(
         attachments_dir=attachments_dir,
         attachments_csv=attachments_csv,
@@ -83,26 +244,306 @@ def organize(
         out_dir=out,
         only_user_types=only,
         move=move,
+        link=link,
+        by=by,
+        workers=workers,
     )
     typer.echo(f"Organized {n} files into {out}")
 
 
+@app.command()
+def dedupe(
+    attachments_dir: Path = typer.Option(..., help="Directory with downloaded attachments"),
+    blob_store: Path = typer.Option(..., help="Content-addressed store, shared across publications"),
+):
+    """Store downloaded files once per content and replace them with hardlinks."""
+    from .files import dedupe_directory
+
+    n, saved = dedupe_directory(attachments_dir, blob_store)
+    typer.echo(f"Stored {n} files in {blob_store}; {saved / 1e6:.1f} MB of duplicates freed")
+
+
+@app.command()
+def extract(
+    files_dir: Path = typer.Option(..., help="Directory with downloaded (or organized) attachments"),
+    attachments_csv: Optional[Path] = typer.Option(
+        None, help="attachments table mapping file_name -> document_id (default: the download manifest)"
+    ),
+    store: Optional[Path] = typer.Option(None, help=f"Text store (default: <files-dir>/{TEXT_STORE_FILENAME})"),
+    workers: Optional[int] = typer.Option(None, help="Extraction processes (default: CPU count)"),
+    timeout: float = typer.Option(DEFAULT_TIMEOUT, help="Seconds allowed per document (0 disables)"),
+    retry_failed: bool = typer.Option(False, help="Retry documents that failed on a previous run"),
+):
+    """Extract text from downloaded PDF/DOCX attachments into a text store keyed by document_id."""
+    from .extract import TextStore, extract_attachments, find_documents
+
+    documents = find_documents(files_dir, attachments_csv)
+    with TextStore(store or files_dir / TEXT_STORE_FILENAME) as text_store:
+        result = extract_attachments(
+            documents, text_store, workers=workers, timeout=timeout or None, retry_failed=retry_failed
+        )
+        typer.echo(f"Extracted: {result.extracted}, Unchanged: {result.skipped}, Failed: {result.failed}")
+        for failure in result.failures:
+            typer.echo(f"  {failure['document_id']}: {failure['error']}")
+        typer.echo(f"Text store: {text_store.path}")
+
+
+@app.command()
+def index(
+    snapshot: List[Path] = typer.Option(..., help="Snapshot folder to add to the index; repeat for several"),
+    index_path: Path = typer.Option(INDEX_FILENAME, "--index", help="Search index database"),
+    text_store: Optional[Path] = typer.Option(None, help="Text store from `extract` to index attachment text"),
+):
+    """Build or update the full-text search index from snapshots (and extracted attachment text)."""
+    from .search import SearchIndex, index_snapshot
+
+    with SearchIndex(index_path) as idx:
+        for snap in snapshot:
+            stats = index_snapshot(idx, snap, text_store=text_store)
+            typer.echo(f"{snap}: added {stats.added}, updated {stats.updated}, unchanged {stats.unchanged}")
+        typer.echo(f"Index {index_path}: {len(idx)} documents")
+
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help='FTS5 query, e.g. \'"public health" AND (tax OR levy) NOT tobacco\''),
+    index_path: Path = typer.Option(INDEX_FILENAME, "--index", help="Search index database"),
+    user_type: Optional[List[str]] = typer.Option(None, help="Only these userTypes; repeat for several"),
+    country: Optional[List[str]] = typer.Option(None, help="Only these countries; repeat for several"),
+    kind: Optional[List[str]] = typer.Option(None, help="Only `feedback` or `attachment` documents"),
+    limit: int = typer.Option(20, help="Maximum number of results"),
+    facets: bool = typer.Option(False, help="Also print match counts per userType, country and kind"),
+    out: Optional[Path] = typer.Option(None, help="Write all matches (no limit) to this CSV"),
+):
+    """Search feedback comments and attachment text, with userType/country filters."""
+    from .search import SearchIndex
+
+    if not index_path.exists():
+        raise typer.BadParameter(f"No index at {index_path}; run `index` first")
+    with SearchIndex(index_path) as idx:
+        try:
+            results = idx.search(query, user_types=user_type, countries=country, kinds=kind, limit=limit)
+            counts = idx.facets(query, user_types=user_type, countries=country, kinds=kind) if facets else {}
+            if out is not None:
+                idx.search(query, user_types=user_type, countries=country, kinds=kind, limit=None).to_csv(
+                    out, index=False
+                )
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+
+    if results.empty:
+        typer.echo("No matches")
+    else:
+        typer.echo(results.drop(columns="score").to_string(index=False))
+    for name, series in counts.items():
+        typer.echo("")
+        typer.echo(f"{name}: " + ", ".join(f"{k}={v}" for k, v in series.items()))
+    if out is not None:
+        typer.echo(f"Wrote matches to {out}")
+
+
+@app.command()
+def duplicates(
+    snapshot: Optional[List[Path]] = typer.Option(None, help="Snapshot folder to add first; repeat for several"),
+    store: Path = typer.Option(SIGNATURES_FILENAME, help="Signature database (kept between runs)"),
+    text_store: Optional[Path] = typer.Option(None, help="Text store from `extract` to include attachments"),
+    threshold: float = typer.Option(DEFAULT_THRESHOLD, help="Minimum estimated Jaccard similarity of shingles"),
+    min_size: int = typer.Option(2, help="Smallest cluster to report"),
+    top: int = typer.Option(20, help="Number of largest clusters to print"),
+    out: Optional[Path] = typer.Option(None, help="CSV with feedback_id, userType, cluster_id, cluster_size"),
+):
+    """Find near-duplicate and identical submissions (campaigns) across snapshots."""
+    from .dedup import SignatureStore, add_snapshot, detect_duplicates, group_sizes
+
+    if not 0 < threshold <= 1:
+        raise typer.BadParameter("--threshold must be in (0, 1]")
+    with SignatureStore(store) as sig_store:
+        for snap in snapshot or []:
+            stats = add_snapshot(sig_store, snap, text_store=text_store)
+            typer.echo(f"{snap}: added {stats.added}, updated {stats.updated}, unchanged {stats.unchanged}")
+        clusters = detect_duplicates(sig_store, threshold=threshold)
+
+    groups = group_sizes(clusters, min_size=min_size)
+    in_groups = int(groups["size"].sum()) if not groups.empty else 0
+    typer.echo(f"{len(groups)} clusters of >= {min_size} covering {in_groups} of {len(clusters)} feedback")
+    if not groups.empty:
+        typer.echo(groups.head(top).to_string())
+    if out is not None:
+        clusters.to_csv(out, index=False)
+        typer.echo(f"Wrote cluster ids to {out}")
+
+
 @app.command()
 def compare(
-    feedback_1: Path = typer.Option(..., help="Path to first feedback.csv (e.g., Phase 2)"),
-    feedback_2: Path = typer.Option(..., help="Path to second feedback.csv (e.g., Phase 3)"),
-    attachments_1: Path = typer.Option(..., help="Path to first attachments.csv"),
-    attachments_2: Path = typer.Option(..., help="Path to second attachments.csv"),
+    feedback_1: Path = typer.Option(..., help="Path to first feedback.csv/.parquet/.arrow (e.g., Phase 2)"),
+    feedback_2: Path = typer.Option(..., help="Path to second feedback.csv/.parquet/.arrow (e.g., Phase 3)"),
+    attachments_1: Path = typer.Option(..., help="Path to first attachments table"),
+    attachments_2: Path = typer.Option(..., help="Path to second attachments table"),
     label_1: str = typer.Option("Phase 1", help="Label for first dataset"),
     label_2: str = typer.Option("Phase 2", help="Label for second dataset"),
     report_out: Optional[Path] = typer.Option(None, help="Output file for detailed comparison CSV"),
+    changes_out: Optional[Path] = typer.Option(None, help="Output CSV with every changed field of common feedback"),
 ):
     """Compare two phases by feedback_id; show differences in entries and attachments."""
+    from .compare import compare_attachments, compare_phases, generate_report
+
     f_comp = compare_phases(feedback_1, feedback_2, label_1=label_1, label_2=label_2)
     a_comp = compare_attachments(attachments_1, attachments_2, label_1=label_1, label_2=label_2)
 
     report = generate_report(f_comp, a_comp, output_csv=report_out)
     typer.echo(report)
+    if changes_out is not None:
+        f_comp["field_changes"].to_csv(changes_out, index=False)
+        typer.echo(f"Field changes saved to: {changes_out}")
+
+
+@app.command()
+def timeline(
+    snapshot: List[Path] = typer.Option(..., help="Snapshot folder (or feedback table), oldest first; repeat"),
+    label: Optional[List[str]] = typer.Option(None, help="Label per snapshot (default: folder name); repeat"),
+    out: Optional[Path] = typer.Option(None, help="Folder for matrices and metrics CSVs"),
+):
+    """Compare N snapshots at once: presence/attachment matrices, churn, arrivals and userType drift."""
+    from .longitudinal import (
+        arrivals_per_day,
+        attachment_matrix,
+        churn,
+        load_snapshots,
+        presence_matrix,
+        user_type_drift,
+    )
+
+    snaps = load_snapshots(snapshot, labels=label)
+    churn_df = churn(snaps)
+    drift = user_type_drift(snaps)
+
+    typer.echo("CHURN")
+    typer.echo(churn_df.to_string())
+    typer.echo("")
+    typer.echo("USER TYPE DRIFT")
+    typer.echo(drift.to_string())
+
+    if out is not None:
+        out.mkdir(parents=True, exist_ok=True)
+        presence_matrix(snaps).astype("int8").to_csv(out / "presence_matrix.csv")
+        attachment_matrix(snaps).to_csv(out / "attachment_matrix.csv")
+        churn_df.to_csv(out / "churn.csv")
+        arrivals_per_day(snaps).to_csv(out / "arrivals_per_day.csv")
+        drift.to_csv(out / "user_type_drift.csv")
+        typer.echo(f"Wrote matrices and metrics to {out}")
+
+
+@app.command()
+def convert(
+    snapshot: Path = typer.Option(..., help="Snapshot folder with feedback and attachments tables"),
+    fmt: str = typer.Option("parquet", "--format", help="Target format: csv, parquet or arrow"),
+):
+    """Convert a snapshot's feedback and attachments tables to another storage format, replacing them."""
+    from .storage import find_table, read_table, remove_other_formats, table_path, write_table
+
+    for name in ("feedback", "attachments"):
+        src = find_table(snapshot, name)
+        if src is None:
+            raise typer.BadParameter(f"No {name} table in {snapshot}")
+        dst = table_path(snapshot, name, fmt)
+        if src != dst:
+            write_table(read_table(src), dst)
+            remove_other_formats(dst)
+            typer.echo(f"Wrote: {dst}")
+
+
+@app.command()
+def normalize(
+    snapshot: Path = typer.Option(..., help="Snapshot folder with a raw dump (feedback_raw.ndjson)"),
+    out: Optional[Path] = typer.Option(None, help="Output folder (default: the snapshot folder)"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="Table format: csv, parquet or arrow (default: the snapshot's current format)"
+    ),
+    fields: Optional[str] = typer.Option(None, help="Comma-separated feedback fields to keep (default: all)"),
+):
+    """Re-normalize a snapshot's raw dump into feedback_full and attachments_full tables with every API field."""
+    from .normalize import FULL_TABLE_NAMES, normalize_raw_dump
+    from .snapshot import find_raw_dump
+    from .storage import find_table, remove_other_formats, table_format, table_path, write_table
+
+    raw = find_raw_dump(snapshot)
+    if raw is None:
+        raise typer.BadParameter(f"No raw dump in {snapshot}")
+    if fmt is None:
+        existing = find_table(snapshot, "feedback")
+        fmt = table_format(existing) if existing is not None else "csv"
+    try:
+        tables = normalize_raw_dump(raw, fields=fields.split(",") if fields else None)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    out = out or snapshot
+    out.mkdir(parents=True, exist_ok=True)
+    for name, df in tables.items():
+        # fetch rewrites feedback/attachments with its own columns, so these get their own names
+        path = table_path(out, FULL_TABLE_NAMES[name], fmt)
+        write_table(df, path)
+        remove_other_formats(path)
+        typer.echo(f"Wrote: {path} ({len(df)} rows, {len(df.columns)} columns)")
+
+
+@app.command()
+def ingest(
+    db: Path = typer.Option(..., help="SQLite database to create or update"),
+    snapshot: List[Path] = typer.Option(..., help="Snapshot folder written by fetch; repeat for several"),
+    publication_id: Optional[int] = typer.Option(
+        None, help="Publication of a single --snapshot (default: the folder name, as batch writes them)"
+    ),
+):
+    """Upsert existing snapshot folders into the analytical database."""
+    if publication_id is not None and len(snapshot) > 1:
+        raise typer.BadParameter("--publication-id applies to a single --snapshot")
+    pairs = []
+    for folder in snapshot:
+        pid = publication_id
+        if pid is None:
+            if not folder.name.isdigit():
+                raise typer.BadParameter(f"Cannot tell the publication of {folder}; give --publication-id")
+            pid = int(folder.name)
+        pairs.append((pid, folder))
+    try:
+        _load_db(db, pairs)
+    except FileNotFoundError as e:
+        raise typer.BadParameter(str(e)) from e
+
+
+@app.command()
+def query(
+    db: Path = typer.Option(..., help="Database written by fetch --db, batch --db or ingest"),
+    by: Optional[List[str]] = typer.Option(
+        None, help="Count feedback by publication_id, userType, country, day, month or year; repeat for several"
+    ),
+    publication_id: Optional[List[int]] = typer.Option(None, help="Only these publications; repeat for several"),
+    since: Optional[str] = typer.Option(None, help="First day counted: YYYY-MM-DD or a prefix such as 2024-03"),
+    until: Optional[str] = typer.Option(None, help="Last day counted (inclusive): YYYY-MM-DD or a prefix"),
+    limit: Optional[int] = typer.Option(None, help="Show only the largest groups"),
+    sql: Optional[str] = typer.Option(None, help="Run this read-only SQL statement instead"),
+    out: Optional[Path] = typer.Option(None, help="Also write the result to this CSV file"),
+):
+    """Count feedback across all publications in the database, or run SQL on it."""
+    from .database import FeedbackDatabase
+
+    if not db.exists():
+        raise typer.BadParameter(f"No database at {db}")
+    with FeedbackDatabase(db) as database:
+        try:
+            if sql:
+                result = database.query(sql)
+            elif by:
+                result = database.counts(by, publication_id, since=since, until=until, limit=limit)
+            else:
+                result = database.publications()
+        except ValueError as e:
+            raise typer.BadParameter(str(e)) from e
+
+    typer.echo(result.to_string(index=False) if len(result) else "No rows")
+    if out is not None:
+        result.to_csv(out, index=False)
+        typer.echo(f"Wrote: {out}")
 
 
 if __name__ == "__main__":
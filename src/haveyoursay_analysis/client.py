@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import ResponseCache
+from .defaults import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from .ratelimit import AIMDLimiter, TokenBucket
+from .retry import RetryPolicy
+
+USER_AGENT = "haveyoursay-analysis"
+
+_session: Optional[requests.Session] = None
+_cache: Optional[ResponseCache] = None
+_limiter: Optional[TokenBucket] = None
+_retry = RetryPolicy(limiter=AIMDLimiter())
+_lock = threading.Lock()
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """Adapter that takes a token from the global rate limiter before each request on the wire."""
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        limiter = _limiter
+        if limiter is not None:
+            limiter.acquire()
+        return super().send(request, *args, **kwargs)
+
+
+def _build_session(pool_connections: int, pool_maxsize: int, gzip: bool) -> requests.Session:
+    session = requests.Session()
+    # `pool_block` caps open connections per host at `pool_maxsize` instead of
+    # opening (and then discarding) extra sockets when workers outnumber the pool.
+    adapter = _RateLimitedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "gzip, deflate" if gzip else "identity",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+def configure_session(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    gzip: bool = True,
+) -> requests.Session:
+    """
+    (Re)create the shared HTTP session used by `api` and `files`.
+
+    `pool_connections` is the number of hosts to keep pools for, `pool_maxsize`
+    the maximum number of kept-alive connections per host. With `gzip` False the
+    server is asked for uncompressed bodies.
+    """
+    global _session
+    with _lock:
+        old, _session = _session, _build_session(pool_connections, pool_maxsize, gzip)
+    if old is not None:
+        old.close()
+    return _session
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, creating it with default settings on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, True)
+    return _session
+
+
+def close_session() -> None:
+    """Close the shared session and release its pooled connections."""
+    global _session
+    with _lock:
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def configure_cache(cache: Optional[ResponseCache]) -> None:
+    """Serve all GETs through `cache` (see `cache.ResponseCache`); `None` disables caching."""
+    global _cache
+    with _lock:
+        old, _cache = _cache, cache
+    if old is not None and old is not cache:
+        old.close()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    return _cache
+
+
+def configure_rate_limit(rate: Optional[float], burst: Optional[int] = None) -> Optional[TokenBucket]:
+    """
+    Limit all outgoing requests (across threads) to `rate` per second with bursts of
+    `burst`. Cache hits do not count. `None` removes the limit.
+    """
+    global _limiter
+    _limiter = TokenBucket(rate, burst) if rate else None
+    return _limiter
+
+
+def configure_retry(policy: Optional[RetryPolicy]) -> RetryPolicy:
+    """
+    Use `policy` for all requests made through `api` and `files`; `None` restores
+    the default (5 attempts, jittered backoff, adaptive concurrency limit).
+    """
+    global _retry
+    _retry = policy if policy is not None else RetryPolicy(limiter=AIMDLimiter())
+    return _retry
+
+
+def get_retry_policy() -> RetryPolicy:
+    return _retry
+
+
+def http_get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 30, **kwargs: Any) -> requests.Response:
+    """GET through the shared, pooled session (and the response cache, if configured)."""
+    if _cache is not None:
+        return _cache.get(get_session(), url, params=params, timeout=timeout, **kwargs)
+    return get_session().get(url, params=params, timeout=timeout, **kwargs)
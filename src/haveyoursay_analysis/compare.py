@@ -1,105 +1,201 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from . import metrics
+from .storage import read_table
+
+# Feedback fields checked for changes between phases
+DIFF_FIELDS = ["userType", "author", "country", "created"]
+
 
 def load_feedback_csv(csv_path: Path) -> pd.DataFrame:
-    """Load a feedback CSV with feedback_id as index."""
-    df = pd.read_csv(csv_path)
+    """Load a feedback table (CSV, Parquet or Arrow) with feedback_id as index."""
+    df = read_table(csv_path)
     if "feedback_id" not in df.columns:
-        raise ValueError(f"CSV {csv_path} missing 'feedback_id' column")
-    df["feedback_id"] = df["feedback_id"].astype(str)
-    return df.set_index("feedback_id")
+        raise ValueError(f"Table {csv_path} missing 'feedback_id' column")
+    indexed: pd.DataFrame = df.set_index("feedback_id")
+    return indexed
 
 
-def compare_phases(
-    feedback_csv_1: Path,
-    feedback_csv_2: Path,
+def load_attachments_csv(csv_path: Path) -> pd.DataFrame:
+    """Load an attachments table (CSV, Parquet or Arrow)."""
+    df = read_table(csv_path)
+    if "feedback_id" not in df.columns:
+        raise ValueError(f"Table {csv_path} missing 'feedback_id' column")
+    return df
+
+
+def _canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast fields to dtypes whose hashes agree whatever the source format. Categorical,
+    string and object columns already hash by value; datetimes need a common unit.
+    """
+    out: Dict[str, pd.Series] = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            out[col] = s.astype("datetime64[ns]")
+        elif isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(s):
+            out[col] = s
+        else:
+            out[col] = s.astype("string")
+    canonical: pd.DataFrame = pd.DataFrame(out, index=df.index)
+    return canonical
+
+
+def diff_fields(
+    df1: pd.DataFrame,
+    df2: pd.DataFrame,
+    fields: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Field-level diff of feedback present in both DataFrames (indexed by feedback_id).
+
+    Common rows are aligned on the index and hashed; only rows whose hashes differ
+    are compared column by column. Returns a long table with one row per changed
+    cell: `feedback_id`, `field`, `before`, `after`.
+    """
+    fields = [f for f in (fields or DIFF_FIELDS) if f in df1.columns and f in df2.columns]
+    empty: pd.DataFrame = pd.DataFrame(columns=["feedback_id", "field", "before", "after"])
+    if not fields:
+        return empty
+
+    a = df1[~df1.index.duplicated(keep="last")]
+    b = df2[~df2.index.duplicated(keep="last")]
+    common = a.index.intersection(b.index)
+    a = _canonical(a.loc[common, fields])
+    b = _canonical(b.loc[common, fields])
+
+    # cheap pass: skip rows whose full-row hash is unchanged
+    hash_a = pd.util.hash_pandas_object(a, index=False).to_numpy()
+    hash_b = pd.util.hash_pandas_object(b, index=False).to_numpy()
+    differs = hash_a != hash_b
+    # the differing rows are few; plain objects compare across categorical category sets
+    a, b = a[differs].astype(object), b[differs].astype(object)
+
+    parts = []
+    for f in fields:
+        changed = ((a[f] != b[f]) & ~(a[f].isna() & b[f].isna())).to_numpy(dtype=bool)
+        if changed.any():
+            parts.append(pd.DataFrame({
+                "feedback_id": a.index[changed],
+                "field": f,
+                "before": a[f][changed].to_numpy(),
+                "after": b[f][changed].to_numpy(),
+            }))
+    if not parts:
+        return empty
+    changes: pd.DataFrame = pd.concat(parts, ignore_index=True).sort_values(
+        ["feedback_id", "field"], ignore_index=True
+    )
+    return changes
+
+
+def compare_feedback_frames(
+    df1: pd.DataFrame,
+    df2: pd.DataFrame,
     label_1: str = "Phase 1",
     label_2: str = "Phase 2",
 ) -> Dict[str, Any]:
     """
-    Compare two feedback datasets by feedback_id.
-    Returns summary of: new, removed, common, and changed entries.
+    Compare two feedback DataFrames indexed by feedback_id (see `compare_phases`).
+    Membership is computed with vectorized index lookups, not Python sets.
     """
-    df1 = load_feedback_csv(feedback_csv_1)
-    df2 = load_feedback_csv(feedback_csv_2)
-
-    ids_1 = set(df1.index)
-    ids_2 = set(df2.index)
-
-    only_in_1 = ids_1 - ids_2
-    only_in_2 = ids_2 - ids_1
-    common = ids_1 & ids_2
-
-    result = {
+    in_2 = df1.index.isin(df2.index)
+    in_1 = df2.index.isin(df1.index)
+    only_1 = df1[~in_2]
+    only_2 = df2[~in_1]
+    only_1_ids = only_1.index.unique().sort_values()
+    only_2_ids = only_2.index.unique().sort_values()
+
+    result: Dict[str, Any] = {
         "label_1": label_1,
         "label_2": label_2,
         "total_1": len(df1),
         "total_2": len(df2),
         "only_in_1": {
-            "count": len(only_in_1),
-            "ids": sorted(list(only_in_1)),
-            "data": df1.loc[list(only_in_1)] if only_in_1 else pd.DataFrame(),
+            "count": len(only_1_ids),
+            "ids": only_1_ids,
+            "data": only_1,
         },
         "only_in_2": {
-            "count": len(only_in_2),
-            "ids": sorted(list(only_in_2)),
-            "data": df2.loc[list(only_in_2)] if only_in_2 else pd.DataFrame(),
+            "count": len(only_2_ids),
+            "ids": only_2_ids,
+            "data": only_2,
         },
         "common": {
-            "count": len(common),
+            "count": df1.index[in_2].nunique(),
         },
     }
 
+    # Field-level changes among common entries
+    changes = diff_fields(df1, df2)
+    result["common"]["changed"] = changes["feedback_id"].nunique()
+    result["field_changes"] = changes
+
     # Analyze user type distribution
-    result["user_types_1"] = df1["userType"].value_counts().to_dict() if "userType" in df1.columns else {}
-    result["user_types_2"] = df2["userType"].value_counts().to_dict() if "userType" in df2.columns else {}
+    result["user_types_1"] = _value_counts(df1, "userType")
+    result["user_types_2"] = _value_counts(df2, "userType")
 
     return result
 
 
-def compare_attachments(
-    attachments_csv_1: Path,
-    attachments_csv_2: Path,
+def _value_counts(df: pd.DataFrame, column: str) -> Dict[str, int]:
+    if column not in df.columns:
+        return {}
+    counts = df[column].value_counts()
+    return {str(k): int(v) for k, v in counts[counts > 0].items()}
+
+
+def compare_phases(
+    feedback_csv_1: Path,
+    feedback_csv_2: Path,
     label_1: str = "Phase 1",
     label_2: str = "Phase 2",
 ) -> Dict[str, Any]:
     """
-    Compare two attachment datasets by feedback_id.
-    Returns summary of attachment counts per feedback.
-    """
-    df1 = pd.read_csv(attachments_csv_1)
-    df2 = pd.read_csv(attachments_csv_2)
+    Compare two feedback datasets by feedback_id.
+    Returns summary of: new, removed, common, and changed entries.
 
-    if "feedback_id" not in df1.columns or "feedback_id" not in df2.columns:
-        raise ValueError("CSVs missing 'feedback_id' column")
+    `field_changes` lists every changed `DIFF_FIELDS` value of common entries in
+    long format (see `diff_fields`). `only_in_*["ids"]` are sorted `pd.Index` objects and `only_in_*["data"]` the
+    matching rows as DataFrames.
+    """
+    with metrics.stage("compare.load"):
+        df1 = load_feedback_csv(feedback_csv_1)
+        df2 = load_feedback_csv(feedback_csv_2)
+    with metrics.stage("compare.feedback"):
+        return compare_feedback_frames(df1, df2, label_1=label_1, label_2=label_2)
 
-    df1["feedback_id"] = df1["feedback_id"].astype(str)
-    df2["feedback_id"] = df2["feedback_id"].astype(str)
 
+def compare_attachment_frames(
+    df1: pd.DataFrame,
+    df2: pd.DataFrame,
+    label_1: str = "Phase 1",
+    label_2: str = "Phase 2",
+) -> Dict[str, Any]:
+    """
+    Compare two attachment DataFrames (see `compare_attachments`).
+    Per-feedback counts are aligned on an outer index join and diffed as columns.
+    """
     # Count attachments per feedback
-    counts_1 = df1.groupby("feedback_id").size()
-    counts_2 = df2.groupby("feedback_id").size()
-
-    ids_1 = set(counts_1.index)
-    ids_2 = set(counts_2.index)
+    counts_1 = df1.groupby("feedback_id", observed=True).size()
+    counts_2 = df2.groupby("feedback_id", observed=True).size()
+    c1, c2 = counts_1.align(counts_2, join="outer")
 
-    only_in_1 = ids_1 - ids_2
-    only_in_2 = ids_2 - ids_1
-    common = ids_1 & ids_2
+    only_1 = counts_1[~counts_1.index.isin(counts_2.index)].sort_index()
+    only_2 = counts_2[~counts_2.index.isin(counts_1.index)].sort_index()
 
     # Analyze changes in common feedback
-    changes = {}
-    for fid in common:
-        c1, c2 = counts_1[fid], counts_2[fid]
-        if c1 != c2:
-            changes[fid] = {"before": c1, "after": c2}
+    changed = c1.notna() & c2.notna() & (c1 != c2)
+    changes = pd.DataFrame({"before": c1[changed], "after": c2[changed]}).astype("int64").sort_index()
+    changes.index.name = "feedback_id"
 
-    result = {
+    result: Dict[str, Any] = {
         "label_1": label_1,
         "label_2": label_2,
         "total_attachments_1": len(df1),
@@ -107,14 +203,14 @@ def compare_attachments(
         "feedback_with_attachments_1": len(counts_1),
         "feedback_with_attachments_2": len(counts_2),
         "only_in_1": {
-            "count": len(only_in_1),
-            "ids": sorted(list(only_in_1)),
-            "attachment_count": sum(counts_1[fid] for fid in only_in_1),
+            "count": len(only_1),
+            "ids": only_1.index,
+            "attachment_count": int(only_1.sum()),
         },
         "only_in_2": {
-            "count": len(only_in_2),
-            "ids": sorted(list(only_in_2)),
-            "attachment_count": sum(counts_2[fid] for fid in only_in_2),
+            "count": len(only_2),
+            "ids": only_2.index,
+            "attachment_count": int(only_2.sum()),
         },
         "attachment_changes": {
             "count": len(changes),
@@ -125,6 +221,26 @@ def compare_attachments(
     return result
 
 
+def compare_attachments(
+    attachments_csv_1: Path,
+    attachments_csv_2: Path,
+    label_1: str = "Phase 1",
+    label_2: str = "Phase 2",
+) -> Dict[str, Any]:
+    """
+    Compare two attachment datasets by feedback_id.
+    Returns summary of attachment counts per feedback.
+
+    `attachment_changes["details"]` is a DataFrame indexed by feedback_id with
+    `before`/`after` attachment counts.
+    """
+    with metrics.stage("compare.load"):
+        df1 = load_attachments_csv(attachments_csv_1)
+        df2 = load_attachments_csv(attachments_csv_2)
+    with metrics.stage("compare.attachments"):
+        return compare_attachment_frames(df1, df2, label_1=label_1, label_2=label_2)
+
+
 def generate_report(
     feedback_comparison: Dict[str, Any],
     attachments_comparison: Dict[str, Any],
@@ -151,8 +267,21 @@ def generate_report(
     lines.append(f"Common feedback_ids: {f_comp['common']['count']}")
     lines.append(f"Only in {f_comp['label_1']}: {f_comp['only_in_1']['count']}")
     lines.append(f"Only in {f_comp['label_2']}: {f_comp['only_in_2']['count']}")
+    lines.append(f"Common entries with changed fields: {f_comp['common'].get('changed', 0)}")
     lines.append("")
 
+    field_changes = f_comp.get("field_changes")
+    if field_changes is not None and len(field_changes):
+        lines.append("FIELD CHANGES")
+        lines.append("-" * 80)
+        for fname, count in field_changes["field"].value_counts().sort_index().items():
+            lines.append(f"  {fname}: {count}")
+        for fid, fname, before, after in field_changes.head(20).itertuples(index=False):
+            lines.append(f"  {fid} {fname}: {before} → {after}")
+        if len(field_changes) > 20:
+            lines.append(f"  ... and {len(field_changes) - 20} more")
+        lines.append("")
+
     # User type breakdown
     if f_comp["user_types_1"] or f_comp["user_types_2"]:
         lines.append("USER TYPE DISTRIBUTION")
@@ -179,34 +308,33 @@ def generate_report(
     lines.append(f"Attachment count changes: {a_comp['attachment_changes']['count']} feedback")
     lines.append("")
 
-    if a_comp["attachment_changes"]["details"]:
+    details = a_comp["attachment_changes"]["details"]
+    if len(details):
         lines.append("CHANGED FEEDBACK (attachment count):")
-        for fid, change in sorted(a_comp["attachment_changes"]["details"].items())[:20]:
-            lines.append(f"  {fid}: {change['before']} → {change['after']}")
-        if len(a_comp["attachment_changes"]["details"]) > 20:
-            lines.append(f"  ... and {len(a_comp['attachment_changes']['details']) - 20} more")
+        for fid, before, after in details.head(20).itertuples():
+            lines.append(f"  {fid}: {before} → {after}")
+        if len(details) > 20:
+            lines.append(f"  ... and {len(details) - 20} more")
     lines.append("")
 
     if output_csv:
         # Save detailed comparison
-        details_list = []
-        for fid in f_comp["only_in_1"]["ids"][:50]:
-            details_list.append({
-                "feedback_id": fid,
+        details_df = pd.concat([
+            pd.DataFrame({
+                "feedback_id": f_comp["only_in_1"]["ids"][:50],
                 "status": f"Only in {f_comp['label_1']}",
                 "phase_1_present": True,
                 "phase_2_present": False,
-            })
-        for fid in f_comp["only_in_2"]["ids"][:50]:
-            details_list.append({
-                "feedback_id": fid,
+            }),
+            pd.DataFrame({
+                "feedback_id": f_comp["only_in_2"]["ids"][:50],
                 "status": f"Only in {f_comp['label_2']}",
                 "phase_1_present": False,
                 "phase_2_present": True,
-            })
+            }),
+        ], ignore_index=True)
 
-        if details_list:
-            details_df = pd.DataFrame(details_list)
+        if len(details_df):
             details_df.to_csv(output_csv, index=False)
             lines.append(f"Detailed comparison saved to: {output_csv}")
 
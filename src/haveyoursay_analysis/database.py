@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from . import metrics
+from .normalize import ATTACHMENT_FIELDS, FEEDBACK_FIELDS, Field, normalize_raw_dump
+from .snapshot import find_raw_dump
+from .storage import find_table, read_table
+
+# Dimensions `counts` groups by; `month` and `year` are derived from `day`
+DIMENSIONS = ("publication_id", "userType", "country", "day", "month", "year")
+_DIMENSION_SQL = {"month": "substr(day, 1, 7)", "year": "substr(day, 1, 4)"}
+# Dimensions the `feedback_daily` rollup is keyed by
+_ROLLUP_KEYS = ("publication_id", "day", "userType", "country")
+
+
+def _sql_type(f: Field) -> str:
+    return "INTEGER" if f.kind in ("id", "int") else "TEXT"
+
+
+def _columns_ddl(fields: Sequence[Field], skip: Sequence[str]) -> str:
+    return "".join(f"{f.name} {_sql_type(f)},\n" for f in fields if f.name not in skip)
+
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS publications (
+    publication_id INTEGER PRIMARY KEY,
+    latest_snapshot INTEGER,
+    feedback_count INTEGER,
+    attachment_count INTEGER,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    publication_id INTEGER NOT NULL,
+    path TEXT,
+    loaded_at REAL NOT NULL,
+    feedback_count INTEGER,
+    attachment_count INTEGER,
+    new_feedback INTEGER
+);
+CREATE INDEX IF NOT EXISTS snapshots_publication ON snapshots (publication_id);
+CREATE TABLE IF NOT EXISTS feedback (
+    publication_id INTEGER NOT NULL,
+    feedback_id INTEGER NOT NULL,
+    {_columns_ddl(FEEDBACK_FIELDS, ("feedback_id", "publication_id"))}day TEXT,
+    first_snapshot INTEGER,
+    last_snapshot INTEGER,
+    PRIMARY KEY (publication_id, feedback_id)
+);
+CREATE INDEX IF NOT EXISTS feedback_user_type ON feedback (userType, publication_id);
+CREATE INDEX IF NOT EXISTS feedback_country ON feedback (country, publication_id);
+CREATE INDEX IF NOT EXISTS feedback_day ON feedback (day, publication_id);
+CREATE TABLE IF NOT EXISTS attachments (
+    publication_id INTEGER NOT NULL,
+    feedback_id INTEGER NOT NULL,
+    document_id TEXT NOT NULL,
+    {_columns_ddl(ATTACHMENT_FIELDS, ("feedback_id", "document_id"))}first_snapshot INTEGER,
+    last_snapshot INTEGER,
+    PRIMARY KEY (publication_id, feedback_id, document_id)
+);
+CREATE INDEX IF NOT EXISTS attachments_document ON attachments (document_id);
+CREATE TABLE IF NOT EXISTS feedback_daily (
+    publication_id INTEGER NOT NULL,
+    day TEXT,
+    userType TEXT,
+    country TEXT,
+    n INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS feedback_daily_publication ON feedback_daily (publication_id);
+"""
+
+
+def _values(df: pd.DataFrame, column: str) -> List[Any]:
+    """Column values as plain Python objects, missing values as None."""
+    s = df[column]
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return [None if pd.isna(v) else v for v in s.dt.strftime("%Y-%m-%d %H:%M:%S")]
+    values: List[Any] = s.astype(object).where(s.notna(), None).tolist()
+    return values
+
+
+class FeedbackDatabase:
+    """
+    Local analytical database (SQLite) of every loaded publication and snapshot.
+
+    `feedback` and `attachments` hold one row per item per publication with every
+    normalized field (see `normalize`), upserted on each load: a changed item is
+    updated in place, and `first_snapshot`/`last_snapshot` record when it was first
+    and last seen. `feedback_daily` is a rollup of feedback counts per publication,
+    day, `userType` and `country`, refreshed for each loaded publication, so
+    `counts` aggregates a few thousand rows however many items there are.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self) -> "FeedbackDatabase":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _upsert(self, table: str, df: pd.DataFrame, key: Sequence[str], snapshot_id: int) -> None:
+        """Insert or update rows of `df`; columns `df` lacks keep their stored values."""
+        known = {r[1] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+        cols = [c for c in df.columns if c in known]
+        data = [_values(df, c) for c in cols]
+        n = len(df)
+        cols += ["first_snapshot", "last_snapshot"]
+        data += [[snapshot_id] * n, [snapshot_id] * n]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c not in key and c != "first_snapshot")
+        self._conn.executemany(
+            f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+            f"ON CONFLICT({', '.join(key)}) DO UPDATE SET {updates}",
+            zip(*data),
+        )
+
+    def load_tables(
+        self,
+        publication_id: int,
+        feedback: pd.DataFrame,
+        attachments: pd.DataFrame,
+        path: Optional[Path] = None,
+    ) -> Dict[str, int]:
+        """
+        Upsert one snapshot of a publication (normalized feedback and attachments
+        tables) in a single transaction and refresh its rollup. Returns the new
+        `snapshot_id` and the `feedback`, `attachments` and `new` feedback counts.
+        """
+        feedback = feedback.dropna(subset=["feedback_id"]).assign(publication_id=publication_id)
+        attachments = attachments.dropna(subset=["feedback_id", "document_id"]).assign(publication_id=publication_id)
+        if "created" in feedback.columns:
+            created = pd.to_datetime(feedback["created"], errors="coerce")
+            feedback["day"] = created.dt.strftime("%Y-%m-%d").where(created.notna(), None)
+            feedback["created"] = created
+
+        with metrics.stage("db.load"), self._lock, self._conn:
+            before = self._count("feedback", publication_id)
+            cur = self._conn.execute(
+                "INSERT INTO snapshots (publication_id, path, loaded_at, feedback_count, attachment_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (publication_id, str(path) if path else None, time.time(), len(feedback), len(attachments)),
+            )
+            snapshot_id = int(cur.lastrowid or 0)
+            self._upsert("feedback", feedback, ("publication_id", "feedback_id"), snapshot_id)
+            self._upsert("attachments", attachments, ("publication_id", "feedback_id", "document_id"), snapshot_id)
+            new = self._count("feedback", publication_id) - before
+            self._conn.execute("UPDATE snapshots SET new_feedback = ? WHERE snapshot_id = ?", (new, snapshot_id))
+            self._refresh_rollup(publication_id)
+            self._conn.execute(
+                "INSERT INTO publications (publication_id, latest_snapshot, feedback_count, attachment_count, "
+                "updated_at) VALUES (?, ?, ?, ?, ?) ON CONFLICT(publication_id) DO UPDATE SET "
+                "latest_snapshot = excluded.latest_snapshot, feedback_count = excluded.feedback_count, "
+                "attachment_count = excluded.attachment_count, updated_at = excluded.updated_at",
+                (
+                    publication_id,
+                    snapshot_id,
+                    self._count("feedback", publication_id),
+                    self._count("attachments", publication_id),
+                    time.time(),
+                ),
+            )
+        return {"snapshot_id": snapshot_id, "feedback": len(feedback), "attachments": len(attachments), "new": new}
+
+    def load_snapshot(self, snapshot_dir: Path, publication_id: int) -> Dict[str, int]:
+        """
+        Load a snapshot folder written by `fetch`: every field from its raw dump when
+        it has one, else its feedback and attachments tables. See `load_tables`.
+        """
+        raw = find_raw_dump(snapshot_dir)
+        if raw is not None:
+            tables = normalize_raw_dump(raw)
+            feedback, attachments = tables["feedback"], tables["attachments"]
+        else:
+            fb_path = find_table(snapshot_dir, "feedback")
+            if fb_path is None:
+                raise FileNotFoundError(f"No raw dump or feedback table in {snapshot_dir}")
+            at_path = find_table(snapshot_dir, "attachments")
+            feedback = read_table(fb_path)
+            if at_path is not None:
+                attachments = read_table(at_path)
+            else:
+                attachments = pd.DataFrame(columns=["feedback_id", "document_id"])
+        return self.load_tables(publication_id, feedback, attachments, path=snapshot_dir)
+
+    def _count(self, table: str, publication_id: int) -> int:
+        sql = f"SELECT count(*) FROM {table} WHERE publication_id = ?"
+        return int(self._conn.execute(sql, (publication_id,)).fetchone()[0])
+
+    def _refresh_rollup(self, publication_id: int) -> None:
+        keys = ", ".join(_ROLLUP_KEYS)
+        self._conn.execute("DELETE FROM feedback_daily WHERE publication_id = ?", (publication_id,))
+        self._conn.execute(
+            f"INSERT INTO feedback_daily ({keys}, n) SELECT {keys}, count(*) FROM feedback "
+            f"WHERE publication_id = ? GROUP BY {keys}",
+            (publication_id,),
+        )
+
+    def counts(
+        self,
+        by: Sequence[str],
+        publication_ids: Optional[Sequence[int]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Feedback counts grouped by `by` (any of `DIMENSIONS`), largest first, from
+        the rollup. `since`/`until` bound the day (inclusive, `YYYY-MM-DD` or a
+        prefix such as `2024-03`); `publication_ids` restricts the publications.
+        """
+        unknown = [d for d in by if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s) {unknown}; expected some of {list(DIMENSIONS)}")
+        clauses: List[str] = []
+        params: List[Any] = []
+        if publication_ids:
+            clauses.append(f"publication_id IN ({', '.join('?' * len(publication_ids))})")
+            params.extend(publication_ids)
+        if since:
+            clauses.append("day >= ?")
+            params.append(since)
+        if until:
+            # a prefix such as "2024-03" includes the whole month
+            clauses.append("substr(day, 1, ?) <= ?")
+            params.extend([len(until), until])
+        select = [f"{_DIMENSION_SQL.get(d, d)} AS {d}" for d in by]
+        sql = f"SELECT {', '.join([*select, 'sum(n) AS count'])} FROM feedback_daily"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if by:
+            sql += f" GROUP BY {', '.join(by)} ORDER BY count DESC, {', '.join(by)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, params)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        """Run one read-only SQL statement and return its rows; writes raise ValueError."""
+        with self._lock:
+            self._conn.execute("PRAGMA query_only = ON")
+            try:
+                cur = self._conn.execute(sql, list(params))
+                columns = [d[0] for d in cur.description or ()]
+                rows: List[Tuple[Any, ...]] = cur.fetchall()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                raise ValueError(f"Query failed: {e}") from e
+            finally:
+                self._conn.execute("PRAGMA query_only = OFF")
+        result: pd.DataFrame = pd.DataFrame(rows, columns=columns)
+        return result
+
+    def publications(self) -> pd.DataFrame:
+        """One row per loaded publication with its latest snapshot and item counts."""
+        return self.query(
+            "SELECT p.publication_id, p.feedback_count, p.attachment_count, count(s.snapshot_id) AS snapshots, "
+            "datetime(p.updated_at, 'unixepoch') AS updated FROM publications p "
+            "LEFT JOIN snapshots s USING (publication_id) GROUP BY p.publication_id ORDER BY p.publication_id"
+        )
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .defaults import DEFAULT_THRESHOLD, SIGNATURES_FILENAME  # noqa: F401 - re-exported
+from .search import IndexStats, iter_attachment_documents, iter_feedback_documents
+
+NUM_PERM = 128
+SHINGLE_SIZE = 3  # words per shingle
+# LSH bands are chosen so a pair at the threshold becomes a candidate with this probability
+LSH_RECALL = 0.99
+
+_SEED = 20240101
+_TOKEN = re.compile(r"\w+")
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    64-bit hashes of the lower-cased `k`-word shingles of `text`, in order and with
+    repeats (empty if shorter than `k` words). Each word is hashed once with CRC32
+    and the `k` word hashes of a shingle are mixed arithmetically.
+    """
+    tokens = _TOKEN.findall(text.lower())
+    n = len(tokens) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+    words = np.array([zlib.crc32(t.encode("utf-8")) for t in tokens], dtype=np.uint64)
+    mix = _shingle_mix(k)
+    hashed: np.ndarray = words[:n] * mix[0]
+    for j in range(1, k):
+        hashed += words[j:j + n] * mix[j]  # wraps mod 2**64
+    return hashed
+
+
+_MIX: Dict[int, np.ndarray] = {}
+
+
+def _shingle_mix(k: int) -> np.ndarray:
+    if k not in _MIX:
+        _MIX[k] = np.random.default_rng(_SEED + k).integers(1, 1 << 63, size=k, dtype=np.uint64) | np.uint64(1)
+    return _MIX[k]
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, using multiply-shift hashing
+    (`(a * x + b) >> 32` in wrapping 64-bit arithmetic) as the permutations. The
+    coefficients are seeded with a constant so signatures from different runs
+    are comparable.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, chunk: int = 1 << 15) -> None:
+        rng = np.random.default_rng(_SEED)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.chunk = chunk
+        self._a = rng.integers(1, 1 << 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """`num_perm` uint32 minimums, or None if `text` has no shingles."""
+        return self.signatures([text])[0]
+
+    def signatures(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Signatures of many texts. Shingles of short texts are hashed together in
+        blocks of about `chunk` columns and reduced per text with `minimum.reduceat`,
+        so the per-text numpy overhead is paid once per block.
+        """
+        parts = [shingles(t, self.shingle_size) for t in texts]
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+        group: List[int] = []
+        total = 0
+        for i, x in enumerate(parts):
+            if not x.size:
+                continue
+            if group and total + x.size > self.chunk:
+                self._sign_group(group, parts, out)
+                group, total = [], 0
+            group.append(i)
+            total += x.size
+        if group:
+            self._sign_group(group, parts, out)
+        return out
+
+    def _hash(self, x: np.ndarray) -> np.ndarray:
+        hashed: np.ndarray = (self._a * x + self._b) >> np.uint64(32)
+        return hashed
+
+    def _sign_group(self, group: List[int], parts: List[np.ndarray], out: List[Optional[np.ndarray]]) -> None:
+        if len(group) == 1:
+            # a single (possibly long) text: hash it in chunks to bound memory
+            x = parts[group[0]]
+            sig = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+            for start in range(0, x.size, self.chunk):
+                np.minimum(sig, self._hash(x[start:start + self.chunk]).min(axis=1), out=sig)
+            out[group[0]] = sig.astype(np.uint32)
+            return
+        sizes = np.array([parts[i].size for i in group])
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        hashed = self._hash(np.concatenate([parts[i] for i in group]))
+        mins = np.minimum.reduceat(hashed, starts, axis=1).astype(np.uint32)
+        for j, i in enumerate(group):
+            out[i] = mins[:, j].copy()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class SignatureStore:
+    """
+    MinHash signatures of feedback and attachment text, plus attachment SHA-256,
+    in a SQLite database. Signatures are only recomputed for new or changed text,
+    so adding a snapshot costs time proportional to what it adds.
+    """
+
+    def __init__(self, path: Path, hasher: Optional[MinHasher] = None) -> None:
+        self.path = path
+        self.hasher = hasher or MinHasher()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                feedback_id INTEGER NOT NULL,
+                userType TEXT,
+                digest TEXT,
+                sha256 TEXT,
+                signature BLOB
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "SignatureStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, records: Iterable[Dict[str, Any]], batch_size: int = 1000) -> IndexStats:
+        """
+        Add or update records shaped like the search index input (`kind`,
+        `feedback_id`, `document_id`, `userType`, `text`, optional `sha256`).
+        New and changed texts are signed `batch_size` at a time.
+        """
+        stats = IndexStats()
+        with self._lock:
+            existing = {
+                key: (digest, sha, user_type)
+                for key, digest, sha, user_type in self._conn.execute(
+                    "SELECT key, digest, sha256, userType FROM signatures"
+                )
+            }
+            with self._conn:
+                batch: List[tuple] = []
+                for rec in records:
+                    if rec.get("feedback_id") is None:
+                        continue
+                    kind = rec["kind"]
+                    key = f"{kind}:{rec['document_id'] if kind == 'attachment' else rec['feedback_id']}"
+                    text = rec.get("text") or ""
+                    digest = _digest(text) if text.strip() else None
+                    sha = rec.get("sha256")
+                    if digest is None and sha is None:
+                        continue
+                    old = existing.get(key)
+                    if old == (digest, sha, rec.get("userType")):
+                        stats.unchanged += 1
+                        continue
+                    if old is not None and old[0] == digest:
+                        # text unchanged: keep the stored signature
+                        self._conn.execute(
+                            "UPDATE signatures SET feedback_id = ?, userType = ?, sha256 = ? WHERE key = ?",
+                            (rec["feedback_id"], rec.get("userType"), sha, key),
+                        )
+                    else:
+                        batch.append((key, kind, rec["feedback_id"], rec.get("userType"), digest, sha, text))
+                        if len(batch) >= batch_size:
+                            self._write(batch)
+                            batch = []
+                    existing[key] = (digest, sha, rec.get("userType"))
+                    if old is None:
+                        stats.added += 1
+                    else:
+                        stats.updated += 1
+                self._write(batch)
+        return stats
+
+    def _write(self, batch: List[tuple]) -> None:
+        sigs = self.hasher.signatures([row[-1] if row[4] else "" for row in batch])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO signatures (key, kind, feedback_id, userType, digest, sha256, signature) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*row[:-1], None if sig is None else sig.tobytes()) for row, sig in zip(batch, sigs)],
+        )
+
+    def load(self) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        All records as a frame (`kind`, `feedback_id`, `userType`, `sha256`,
+        `has_signature`) and the matrix of signatures for rows with one.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, feedback_id, userType, sha256, signature FROM signatures ORDER BY key"
+            ).fetchall()
+        frame = pd.DataFrame([r[:4] for r in rows], columns=["kind", "feedback_id", "userType", "sha256"])
+        blobs = [r[4] for r in rows]
+        frame["has_signature"] = [b is not None for b in blobs]
+        present = [b for b in blobs if b is not None]
+        sigs = (
+            np.frombuffer(b"".join(present), dtype=np.uint32).reshape(len(present), -1)
+            if present
+            else np.empty((0, self.hasher.num_perm), dtype=np.uint32)
+        )
+        return frame, sigs
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM, recall: float = LSH_RECALL) -> Tuple[int, int]:
+    """
+    `(bands, rows)` for LSH: the most rows per band (fewest false candidates) such
+    that a pair with Jaccard similarity `threshold` is still a candidate with
+    probability `recall`.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold**rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+def near_duplicate_pairs(sigs: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> np.ndarray:
+    """
+    Index pairs `(i, j)` of signatures with estimated Jaccard similarity >= `threshold`.
+
+    Each band's rows are bucketed and every member is checked against its bucket's
+    first member only, so a campaign of n identical texts costs O(n) rather than
+    O(n²). Similar texts that land with different representatives are still
+    connected through other bands once the pairs are clustered.
+    """
+    n, num_perm = sigs.shape
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    bands, rows = lsh_params(threshold, num_perm)
+    mix = np.random.default_rng(_SEED).integers(1, 1 << 63, size=rows, dtype=np.uint64)
+    found = []
+    for band in range(bands):
+        block = sigs[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (block * mix).sum(axis=1)  # wraps mod 2**64; collisions are filtered below
+        codes, _ = pd.factorize(keys)
+        _, first = np.unique(codes, return_index=True)
+        rep = first[codes]
+        idx = np.flatnonzero(rep != np.arange(n))
+        if idx.size:
+            found.append(np.column_stack([rep[idx], idx]))
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.unique(np.concatenate(found), axis=0)
+    similarity = (sigs[pairs[:, 0]] == sigs[pairs[:, 1]]).mean(axis=1)
+    similar: np.ndarray = pairs[similarity >= threshold]
+    return similar
+
+
+def _components(ids: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Smallest id of the connected component of every id, given `pairs` of ids."""
+    parent = {int(i): int(i) for i in ids}
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        ra, rb = find(int(a)), find(int(b))
+        if ra != rb:
+            # the smaller id becomes the root, so it names the cluster
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(int(i)) for i in ids], dtype=np.int64)
+
+
+def detect_duplicates(store: SignatureStore, threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """
+    Cluster feedback that shares near-identical text (feedback comment or
+    attachment) or an identical attachment file (SHA-256).
+
+    Returns one row per `feedback_id` with `userType`, `cluster_id` (the smallest
+    `feedback_id` in the cluster, so ids are stable as snapshots are added) and
+    `cluster_size`.
+    """
+    frame, sigs = store.load()
+    if frame.empty:
+        empty: pd.DataFrame = pd.DataFrame(
+            {
+                "feedback_id": pd.Series(dtype="Int64"),
+                "userType": pd.Series(dtype="string"),
+                "cluster_id": pd.Series(dtype="Int64"),
+                "cluster_size": pd.Series(dtype="int64"),
+            }
+        )
+        return empty
+    fids = frame["feedback_id"].to_numpy(dtype=np.int64)
+
+    links = [np.empty((0, 2), dtype=np.int64)]
+    signed = fids[frame["has_signature"].to_numpy()]
+    near = near_duplicate_pairs(sigs, threshold)
+    links.append(signed[near])
+
+    files = frame.dropna(subset=["sha256"])
+    if not files.empty:
+        first = files.groupby("sha256")["feedback_id"].transform("first").to_numpy(dtype=np.int64)
+        links.append(np.column_stack([first, files["feedback_id"].to_numpy(dtype=np.int64)]))
+
+    pairs = np.concatenate(links)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+
+    per_feedback = (
+        frame.sort_values("kind", key=lambda s: s != "feedback")  # prefer the comment's userType
+        .groupby("feedback_id", sort=True)["userType"]
+        .first()
+    )
+    ids = per_feedback.index.to_numpy(dtype=np.int64)
+    out: pd.DataFrame = pd.DataFrame({"feedback_id": pd.array(ids, dtype="Int64"), "userType": per_feedback.to_numpy()})
+    out["cluster_id"] = pd.array(_components(ids, pairs), dtype="Int64")
+    out["cluster_size"] = out.groupby("cluster_id")["feedback_id"].transform("size").astype("int64")
+    return out
+
+
+def group_sizes(clusters: pd.DataFrame, min_size: int = 2) -> pd.DataFrame:
+    """Members per `userType` of every cluster with at least `min_size` feedback, largest first."""
+    big = clusters[clusters["cluster_size"] >= min_size]
+    table = pd.crosstab(big["cluster_id"], big["userType"].fillna("UNKNOWN"))
+    table.columns.name = None
+    table.insert(0, "size", table.sum(axis=1))
+    ranked: pd.DataFrame = table.sort_values(["size"], ascending=False, kind="stable")
+    return ranked
+
+
+def add_snapshot(store: SignatureStore, snapshot_dir: Path, text_store: Optional[Path] = None) -> IndexStats:
+    """Add a snapshot's feedback comments and, with `text_store`, its attachments to `store`."""
+    stats = store.upsert(iter_feedback_documents(snapshot_dir))
+    if text_store is not None:
+        more = store.upsert(iter_attachment_documents(snapshot_dir, text_store))
+        stats = IndexStats(stats.added + more.added, stats.updated + more.updated, stats.unchanged + more.unchanged)
+    return stats
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+# Defaults the CLI shows in its options. They live in this dependency-free module so
+# building the command line does not import pandas, requests or the command modules;
+# each module re-exports the names it uses.
+
+# HTTP connection pool (`client`); sized for the parallel fetch/download workers
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 10
+
+# Attachment text store (`extract`)
+TEXT_STORE_FILENAME = "attachment_text.sqlite"
+DEFAULT_TIMEOUT = 120.0
+
+# Full-text search index (`search`)
+INDEX_FILENAME = "search_index.sqlite"
+
+# Near-duplicate detection (`dedup`)
+SIGNATURES_FILENAME = "dedup_signatures.sqlite"
+DEFAULT_THRESHOLD = 0.8
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import os
+import signal
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from .defaults import DEFAULT_TIMEOUT, TEXT_STORE_FILENAME  # noqa: F401 - re-exported
+from .manifest import DONE, FAILED, MANIFEST_FILENAME, DownloadManifest, sha256_file
+
+EXTRACT_SUFFIXES = (".pdf", ".docx")
+# A document is retried once in a fresh pool when its worker process dies
+MAX_ATTEMPTS = 2
+
+_COLUMNS = ["document_id", "file_name", "size", "mtime_ns", "sha256", "status", "error", "chars", "updated_at"]
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+class TextStore:
+    """
+    Extracted attachment text keyed by `document_id`, in a SQLite database.
+
+    Each entry keeps the size, mtime and SHA-256 of the source file so unchanged
+    files can be skipped on the next run. Every update is committed immediately.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS texts (
+                document_id TEXT PRIMARY KEY,
+                file_name TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                sha256 TEXT,
+                status TEXT NOT NULL,
+                error TEXT,
+                chars INTEGER,
+                updated_at REAL,
+                text TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "TextStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM texts WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def get_text(self, document_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM texts WHERE document_id = ?", (document_id,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, document_id: str, status: str, **fields: Any) -> None:
+        """Insert or update the entry for `document_id`; unspecified fields keep their value."""
+        values = {k: v for k, v in fields.items() if k in _COLUMNS or k == "text"}
+        values.update(document_id=document_id, status=status, updated_at=time.time())
+        if status == DONE:
+            values.setdefault("error", None)
+        cols = list(values)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != "document_id")
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO texts ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                f"ON CONFLICT(document_id) DO UPDATE SET {updates}",
+                [values[c] for c in cols],
+            )
+            self._conn.commit()
+
+    def entries(self, status: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Entry metadata (without the text)."""
+        query = f"SELECT {', '.join(_COLUMNS)} FROM texts"
+        params: tuple = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            yield dict(zip(_COLUMNS, row))
+
+    def texts(self) -> Iterator[Tuple[str, str]]:
+        """Yield `(document_id, text)` for every successfully extracted document."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document_id, text FROM texts WHERE status = ? ORDER BY document_id", (DONE,)
+            ).fetchall()
+        yield from rows
+
+    def records(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Every entry with its `text` (None unless extracted), ordered by `document_id`.
+        Read in batches so only `batch_size` texts are held in memory at a time.
+        """
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)}, text FROM texts WHERE document_id > ? "
+                    "ORDER BY document_id LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            for row in rows:
+                yield dict(zip(_COLUMNS + ["text"], row))
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+
+def extract_text(path: Path) -> str:
+    """Plain text of a PDF (pdfplumber) or DOCX (python-docx) file."""
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        import pdfplumber
+
+        parts = []
+        with pdfplumber.open(str(path)) as pdf:
+            for page in pdf.pages:
+                parts.append(page.extract_text() or "")
+                page.close()  # drop the page's parsed objects
+        return "\n\n".join(parts)
+    if suffix == ".docx":
+        import docx
+
+        document = docx.Document(str(path))
+        parts = [p.text for p in document.paragraphs]
+        for table in document.tables:
+            for row in table.rows:
+                parts.append("\t".join(cell.text for cell in row.cells))
+        return "\n".join(parts)
+    raise ValueError(f"Unsupported document type: {path.suffix}")
+
+
+def _on_alarm(signum: int, frame: Any) -> None:
+    raise ExtractionTimeout("extraction timed out")
+
+
+def _extract_job(path: str, previous_sha256: Optional[str], timeout: Optional[float]) -> Dict[str, Any]:
+    """
+    Worker-process entry point: hash the file and, if it changed, extract its text.
+
+    Errors are returned rather than raised so one malformed document never takes
+    the pool down. The timeout uses SIGALRM and is not enforced where that is
+    unavailable (Windows).
+    """
+    p = Path(path)
+    out: Dict[str, Any] = {"sha256": None, "text": None, "error": None, "unchanged": False}
+    seconds = float(timeout) if timeout is not None else 0.0
+    use_alarm = seconds > 0 and hasattr(signal, "setitimer")
+    previous_handler = None
+    try:
+        if use_alarm:
+            previous_handler = signal.signal(signal.SIGALRM, _on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            out["sha256"] = sha256_file(p)
+            if out["sha256"] == previous_sha256:
+                out["unchanged"] = True
+            else:
+                out["text"] = extract_text(p)
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except Exception as e:
+        # also catches an alarm that fires after the work but before it is cancelled
+        out.update(text=None, unchanged=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return out
+
+
+def find_documents(files_dir: Path, attachments_table: Optional[Path] = None) -> List[Tuple[str, Path]]:
+    """
+    `(document_id, path)` for every PDF/DOCX below `files_dir` (recursively, so an
+    organized tree works too).
+
+    File names are mapped to `document_id` through `attachments_table` if given,
+    otherwise through the download manifest in `files_dir`; failing both, the file
+    stem is used. Files that cannot be mapped are skipped, and a document found
+    in several folders is taken once.
+    """
+    name_to_id: Optional[Dict[str, str]] = None
+    if attachments_table is not None:
+        from .storage import read_table
+
+        at = read_table(attachments_table, columns=["document_id", "file_name"]).dropna(subset=["document_id"])
+        names = at["file_name"].fillna(at["document_id"])
+        name_to_id = dict(zip(names.astype(str), at["document_id"].astype(str)))
+    elif (files_dir / MANIFEST_FILENAME).exists():
+        with DownloadManifest(files_dir / MANIFEST_FILENAME) as manifest:
+            name_to_id = {e["file_name"]: e["document_id"] for e in manifest.entries(DONE) if e["file_name"]}
+
+    docs: Dict[str, Path] = {}
+    for p in sorted(files_dir.rglob("*")):
+        if p.suffix.lower() not in EXTRACT_SUFFIXES or p.name.startswith(".") or not p.is_file():
+            continue
+        doc_id = name_to_id.get(p.name) if name_to_id is not None else p.stem
+        if doc_id and doc_id not in docs:
+            docs[doc_id] = p
+    return list(docs.items())
+
+
+@dataclass
+class ExtractResult:
+    extracted: int = 0
+    skipped: int = 0
+    chars: int = 0
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+
+def extract_attachments(
+    documents: Iterable[Tuple[str, Path]],
+    store: TextStore,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    retry_failed: bool = False,
+) -> ExtractResult:
+    """
+    Extract text of `(document_id, path)` pairs into `store` on a pool of `workers`
+    processes (default: CPU count), writing each result as it completes.
+
+    Files whose size and mtime match the store are skipped without being read; the
+    rest are hashed in the workers and only re-extracted if the SHA-256 changed.
+    Documents that failed before are skipped unless `retry_failed` is set or the
+    file changed. Each file gets `timeout` seconds; a worker that dies is replaced
+    and its in-flight documents are retried once.
+    """
+    result = ExtractResult()
+
+    pending: deque = deque()
+    for doc_id, path in documents:
+        st = path.stat()
+        entry = store.get(doc_id)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            if entry["status"] == DONE or not retry_failed:
+                result.skipped += 1
+                continue
+        previous = entry["sha256"] if entry and entry["status"] == DONE else None
+        pending.append((doc_id, path, st, previous, 1))
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    window = 2 * workers
+    bar = tqdm(total=len(pending), desc="Extracting text")
+    pool = ProcessPoolExecutor(max_workers=workers)
+    inflight: Dict[Future, tuple] = {}
+    try:
+        while pending or inflight:
+            while pending and len(inflight) < window:
+                job = pending.popleft()
+                inflight[pool.submit(_extract_job, str(job[1]), job[3], timeout)] = job
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            crashed = False
+            for fut in done:
+                job = inflight.pop(fut)
+                try:
+                    out = fut.result()
+                except BrokenProcessPool:
+                    crashed = True
+                    _requeue(job, pending, store, result, bar)
+                    continue
+                except Exception as e:
+                    # e.g. a result that could not be sent back; only this document fails
+                    out = {"sha256": None, "text": None, "error": f"{type(e).__name__}: {e}", "unchanged": False}
+                _record(job, out, store, result)
+                bar.update(1)
+            if crashed:
+                # every other in-flight job died with the pool
+                for job in inflight.values():
+                    _requeue(job, pending, store, result, bar)
+                inflight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        bar.close()
+    return result
+
+
+def _requeue(job: tuple, pending: deque, store: TextStore, result: ExtractResult, bar: tqdm) -> None:
+    doc_id, path, st, previous, attempt = job
+    if attempt < MAX_ATTEMPTS:
+        pending.append((doc_id, path, st, previous, attempt + 1))
+        return
+    _record(job, {"sha256": None, "text": None, "error": "worker process crashed", "unchanged": False}, store, result)
+    bar.update(1)
+
+
+def _record(job: tuple, out: Dict[str, Any], store: TextStore, result: ExtractResult) -> None:
+    doc_id, path, st, _previous, _attempt = job
+    stat = {"file_name": path.name, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": out["sha256"]}
+    if out["unchanged"]:
+        # same content under a new mtime: keep the text, refresh the stat
+        store.record(doc_id, DONE, **stat)
+        result.skipped += 1
+    elif out["error"]:
+        store.record(doc_id, FAILED, error=out["error"], chars=None, text=None, **stat)
+        result.failures.append({"document_id": doc_id, "path": str(path), "error": out["error"]})
+    else:
+        store.record(doc_id, DONE, chars=len(out["text"]), text=out["text"], **stat)
+        result.extracted += 1
+        result.chars += len(out["text"])
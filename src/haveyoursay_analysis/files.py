@@ -1,23 +1,88 @@
 from __future__ import annotations
 
+import hashlib
+import math
 import os
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
-import backoff
-import requests
 from tqdm import tqdm
 
+from . import metrics
+from .blobstore import BlobStore, link_file
+from .client import get_retry_policy, http_get
+from .defaults import INDEX_FILENAME, SIGNATURES_FILENAME, TEXT_STORE_FILENAME
+from .manifest import DONE, FAILED, MANIFEST_FILENAME, PARTIAL, DownloadManifest, sha256_file
+
 # Default document download endpoint. Adjust if the EC API changes.
 BASE_URL = "https://ec.europa.eu/info/law/better-regulation"
 DOCUMENT_URL_TEMPLATE = f"{BASE_URL}/api/document/{{document_id}}"
+CHUNK_SIZE = 1 << 16
+FAILURES_FILENAME = "download_failures.csv"
+# Files written next to downloads that are not attachments; SQLite ones may have -wal/-shm/-journal sidecars
+_OWN_FILES = (MANIFEST_FILENAME, TEXT_STORE_FILENAME, INDEX_FILENAME, SIGNATURES_FILENAME)
+
+
+def _download(url: str, out_path: Path, timeout: int = 60, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Stream `url` into `out_path` in chunks.
+
+    The body goes to `.<name>.part` next to `out_path` and is renamed into place only
+    once complete, so an interrupted download never leaves a truncated file. If a
+    partial file exists and `meta` carries the `etag`/`last_modified` it was started
+    with, the transfer resumes with a Range request (`If-Range` guards against the
+    document having changed). `meta` is updated with the response validators as soon
+    as they are known, so a failed attempt can be resumed later.
+
+    Failed attempts are retried under the shared retry policy
+    (`client.configure_retry`). Returns `meta` with `size` and `sha256` of the
+    completed file.
+    """
+    meta = meta if meta is not None else {}
+    return get_retry_policy().call(_download_once, url, out_path, timeout, meta)
+
+
+def _download_once(url: str, out_path: Path, timeout: int, meta: Dict[str, Any]) -> Dict[str, Any]:
+    part = _part_path(out_path)
+    offset = part.stat().st_size if part.exists() else 0
+    validator = meta.get("etag") or meta.get("last_modified")
+    headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset and validator else {}
+
+    with metrics.track_request("document") as req, http_get(url, timeout=timeout, stream=True, headers=headers) as r:
+        req["status"] = r.status_code
+        if r.status_code == 416:
+            # stale partial file; start over on the next attempt
+            part.unlink()
+        r.raise_for_status()
+        meta["etag"] = r.headers.get("ETag")
+        meta["last_modified"] = r.headers.get("Last-Modified")
+
+        h = hashlib.sha256()
+        if r.status_code == 206:
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+            mode = "ab"
+        else:
+            offset, mode = 0, "wb"
+
+        size = offset
+        with open(part, mode) as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+                req["bytes"] += len(chunk)
+        os.replace(part, out_path)
+
+    meta.update(size=size, sha256=h.hexdigest())
+    return meta
 
 
-@backoff.on_exception(backoff.expo, (requests.RequestException,), max_tries=5)
-def _download(url: str, timeout: int = 60) -> bytes:
-    r = requests.get(url, timeout=timeout)
-    r.raise_for_status()
-    return r.content
+def _part_path(out_path: Path) -> Path:
+    return out_path.with_name(f".{out_path.name}.part")
 
 
 def ensure_dir(path: Path) -> None:
@@ -28,51 +93,284 @@ def build_document_url(document_id: str | int, language: str = "EN") -> str:
     return f"{DOCUMENT_URL_TEMPLATE.format(document_id=document_id)}?language={language}"
 
 
+@dataclass
+class DownloadResult:
+    """Outcome of a download run; each failure keeps the row and its cause."""
+
+    downloaded: int = 0
+    skipped: int = 0
+    bytes: int = 0
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+
+def _clean(value: Any) -> Optional[str]:
+    """CSV cell to str, treating NaN/None/empty as missing."""
+    if value is None or (isinstance(value, float) and math.isnan(value)) or str(value) == "":
+        return None
+    return str(value)
+
+
+def unique_file_name(file_name: str, document_id: str) -> str:
+    """`file_name` disambiguated with `document_id`, e.g. `report_090166e5.pdf`."""
+    stem, dot, suffix = file_name.rpartition(".")
+    return f"{stem}_{document_id}.{suffix}" if dot and stem else f"{file_name}_{document_id}"
+
+
+def download_attachments(
+    rows: Iterable[Dict[str, Any]],
+    out_dir: Path,
+    language: str = "EN",
+    skip_existing: bool = True,
+    workers: int = 8,
+    manifest: Optional[DownloadManifest] = None,
+    verify: bool = False,
+    blobs: Optional[BlobStore] = None,
+) -> DownloadResult:
+    """
+    Download attachment rows (dicts with `document_id`, `file_name`) into `out_dir`
+    using a pool of `workers` threads. Bodies are streamed to disk, so memory stays
+    bounded regardless of document size.
+
+    With a `manifest`, only files recorded as done (with matching size, and SHA-256
+    when `verify` is set) count as existing; partial files are resumed and every
+    outcome is recorded. Without one, `skip_existing` trusts any existing file.
+
+    A file name already used by another document (in this run or in the manifest)
+    gets the `document_id` appended, so different documents never overwrite each
+    other; the name actually used is recorded in the manifest. With `blobs`, each
+    completed file is moved into the content-addressed store and hardlinked back,
+    so identical documents are stored once.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    ensure_dir(out_dir)
+    result = DownloadResult()
+    jobs = _plan_downloads(rows, out_dir, language, skip_existing, manifest, verify, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_download, job.url, job.out_path, meta=job.meta): job for job in jobs}
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Downloading attachments"):
+            job = futures[fut]
+            try:
+                info = fut.result()
+            except Exception as e:
+                _record_failure(job, e, result, manifest)
+                continue
+            _record_success(job, info, result, manifest, blobs)
+
+    return result
+
+
+@dataclass
+class _DownloadJob:
+    row: Dict[str, Any]
+    document_id: str
+    file_name: str
+    url: str
+    out_path: Path
+    meta: Dict[str, Any]
+
+
+def _plan_downloads(
+    rows: Iterable[Dict[str, Any]],
+    out_dir: Path,
+    language: str,
+    skip_existing: bool,
+    manifest: Optional[DownloadManifest],
+    verify: bool,
+    result: DownloadResult,
+) -> List[_DownloadJob]:
+    """Resolve file names and skip finished documents; rows that cannot be downloaded go to `result`."""
+    # file name -> document_id it belongs to
+    taken: Dict[str, str] = {}
+    known: Dict[str, str] = {}
+    if manifest is not None:
+        for entry in manifest.entries():
+            if entry["file_name"]:
+                taken.setdefault(entry["file_name"], entry["document_id"])
+                known[entry["document_id"]] = entry["file_name"]
+
+    jobs = []
+    queued = set()
+    for row in rows:
+        doc_id = _clean(row.get("document_id"))
+        fname = known.get(doc_id or "") or _clean(row.get("file_name")) or doc_id
+        if not doc_id or not fname:
+            result.failures.append({**row, "error": "missing document_id"})
+            continue
+        if doc_id in queued:
+            continue
+        queued.add(doc_id)
+        if taken.setdefault(fname, doc_id) != doc_id:
+            fname = unique_file_name(fname, doc_id)
+            taken[fname] = doc_id
+
+        # derive output path
+        out_path = out_dir / fname
+        meta: Dict[str, Any] = {}
+        if manifest is not None:
+            recorded: Optional[Dict[str, Any]] = manifest.get(doc_id)
+            if skip_existing and manifest.is_complete(doc_id, out_path, verify=verify):
+                result.skipped += 1
+                continue
+            if recorded is not None and recorded["status"] == PARTIAL:
+                meta = {"etag": recorded["etag"], "last_modified": recorded["last_modified"]}
+        elif skip_existing and out_path.exists():
+            result.skipped += 1
+            continue
+        jobs.append(_DownloadJob(row, doc_id, fname, build_document_url(doc_id, language=language), out_path, meta))
+    return jobs
+
+
+def _resumable(job: _DownloadJob) -> bool:
+    """True if a partial body exists and the server told us how to validate it."""
+    meta = job.meta
+    return _part_path(job.out_path).exists() and bool(meta.get("etag") or meta.get("last_modified"))
+
+
+def _record_failure(
+    job: _DownloadJob, exc: BaseException, result: DownloadResult, manifest: Optional[DownloadManifest]
+) -> None:
+    error = f"{type(exc).__name__}: {exc}"
+    result.failures.append({**job.row, "error": error})
+    if manifest is not None:
+        # keep resumable state if the server told us how to validate the partial body
+        manifest.record(
+            job.document_id,
+            PARTIAL if _resumable(job) else FAILED,
+            file_name=job.file_name,
+            etag=job.meta.get("etag"),
+            last_modified=job.meta.get("last_modified"),
+            error=error,
+        )
+
+
+def _record_interrupted(job: _DownloadJob, manifest: Optional[DownloadManifest]) -> None:
+    """Record a download stopped midway (e.g. cancelled) as partial, if it can be resumed."""
+    if manifest is not None and _resumable(job):
+        manifest.record(
+            job.document_id,
+            PARTIAL,
+            file_name=job.file_name,
+            etag=job.meta.get("etag"),
+            last_modified=job.meta.get("last_modified"),
+            error="interrupted",
+        )
+
+
+def _record_success(
+    job: _DownloadJob,
+    info: Dict[str, Any],
+    result: DownloadResult,
+    manifest: Optional[DownloadManifest],
+    blobs: Optional[BlobStore],
+) -> None:
+    if blobs is not None:
+        blobs.add(job.out_path, info["sha256"])
+    result.bytes += info["size"]
+    result.downloaded += 1
+    if manifest is not None:
+        manifest.record(job.document_id, DONE, file_name=job.file_name, **info)
+
+
 def download_attachments_from_csv(
     attachments_csv: Path,
     out_dir: Path,
     language: str = "EN",
     only_user_types: Optional[Iterable[str]] = None,
     skip_existing: bool = True,
+    workers: int = 8,
+    use_manifest: bool = True,
+    verify: bool = False,
+    blob_store: Optional[Path] = None,
 ) -> tuple[int, int]:
     """
-    Read `attachments.csv` with columns: feedback_id, document_id, file_name, userType
-    and download files into `out_dir`.
+    Read `attachments.csv` (or `.parquet`/`.arrow`) with columns: feedback_id,
+    document_id, file_name, userType and download files into `out_dir` with `workers` parallel downloads.
+
+    With `use_manifest`, progress is tracked in `download_manifest.sqlite` in `out_dir`
+    so a restarted run skips verified files, resumes partial ones and retries failures.
+    Failures are written with their cause to `download_failures.csv` in `out_dir`.
+    With `blob_store`, files are kept once per content in that directory (which can be
+    shared between publications) and `out_dir` holds hardlinks to them.
 
     Returns (downloaded_count, failed_count).
     """
     import pandas as pd
 
-    ensure_dir(out_dir)
+    from .storage import read_table
 
-    df = pd.read_csv(attachments_csv)
+    df = read_table(attachments_csv)
     if only_user_types:
         df = df[df["userType"].isin(list(only_user_types))]
+    rows = df.astype(object).where(df.notna(), None).to_dict("records")
 
-    downloaded = 0
-    failed = 0
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Downloading attachments"):
-        doc_id = row.get("document_id")
-        fname = row.get("file_name") or f"{doc_id}"
-        if not doc_id:
-            failed += 1
-            continue
+    ensure_dir(out_dir)
+    manifest = DownloadManifest(out_dir / MANIFEST_FILENAME) if use_manifest else None
+    try:
+        result = download_attachments(
+            rows,
+            out_dir,
+            language=language,
+            skip_existing=skip_existing,
+            workers=workers,
+            manifest=manifest,
+            verify=verify,
+            blobs=BlobStore(blob_store) if blob_store is not None else None,
+        )
+    finally:
+        if manifest is not None:
+            manifest.close()
 
-        # derive output path
-        out_path = out_dir / str(fname)
-        if skip_existing and out_path.exists():
-            continue
+    failures_path = out_dir / FAILURES_FILENAME
+    if result.failures:
+        pd.DataFrame(result.failures).to_csv(failures_path, index=False)
+    elif failures_path.exists():
+        failures_path.unlink()
 
-        url = build_document_url(doc_id, language=language)
-        try:
-            content = _download(url)
-            with open(out_path, "wb") as f:
-                f.write(content)
-            downloaded += 1
-        except Exception:
-            failed += 1
+    return result.downloaded, result.failed
 
-    return downloaded, failed
+
+def organize_targets(
+    attachments_dir: Path,
+    attachments_csv: Path,
+    feedback_csv: Path,
+    only_user_types: Optional[Iterable[str]] = None,
+    by: str = "userType",
+):
+    """
+    The `file_name` -> `by` mapping to organize, as a DataFrame with one row per file.
+
+    Built from the tables alone (plus the download manifest in `attachments_dir` for
+    the names the downloader actually used), and filtered to the `by` values in
+    `only_user_types` before any file is touched, so the cost follows the targeted rows rather than
+    the size of the folder.
+    """
+    import pandas as pd
+
+    from .storage import read_table
+
+    fb = read_table(feedback_csv, columns=["feedback_id", by]).dropna()
+    groups = fb.drop_duplicates("feedback_id").set_index("feedback_id")[by].astype(str)
+    if only_user_types:
+        groups = groups[groups.isin(list(only_user_types))]
+
+    at = read_table(attachments_csv, columns=["feedback_id", "document_id", "file_name"])
+    at = at[at["feedback_id"].isin(groups.index)]
+    # the downloader names files without a file_name after their document_id
+    names = at["file_name"].astype(object).fillna(at["document_id"].astype(object))
+    manifest_path = attachments_dir / MANIFEST_FILENAME
+    if manifest_path.exists() and not at.empty:
+        with DownloadManifest(manifest_path) as manifest:
+            used = {e["document_id"]: e["file_name"] for e in manifest.entries(DONE) if e["file_name"]}
+        names = at["document_id"].astype(object).map(used).fillna(names)
+
+    targets = pd.DataFrame({"file_name": names, by: at["feedback_id"].map(groups)}).dropna()
+    return targets.drop_duplicates("file_name").reset_index(drop=True)
 
 
 def organize_by_user_type(
@@ -82,51 +380,93 @@ def organize_by_user_type(
     out_dir: Path,
     only_user_types: Optional[Iterable[str]] = None,
     move: bool = False,
+    link: str = "hardlink",
+    by: str = "userType",
+    workers: int = 8,
 ) -> int:
     """
-    Organize files into subfolders by `userType` using mappings from
-    `attachments.csv` (file_name -> feedback_id) and `feedback.csv` (feedback_id -> userType).
+    Organize files into subfolders by `userType` (or another feedback column given
+    as `by`, e.g. `country`) using mappings from `attachments.csv`
+    (file_name -> feedback_id) and `feedback.csv` (feedback_id -> `by` value).
+    Either table may also be Parquet or Arrow. File names the downloader
+    disambiguated are resolved through the download manifest in `attachments_dir`.
 
-    If `move` is False, files are copied; otherwise moved.
+    `only_user_types` keeps its name for compatibility but holds values of the `by`
+    column, e.g. country codes with `by="country"`. Only the rows it selects are
+    visited; the folder itself is never scanned. Files are placed as hardlinks
+    by default, which is instant and uses no extra disk; `link` may also be
+    `symlink` or `copy`. With `move`, files are moved. Placement runs on `workers`
+    threads and files missing from `attachments_dir` are skipped.
 
     Returns number of files organized.
     """
     import shutil
-    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor
 
     ensure_dir(out_dir)
+    with metrics.stage("organize.plan"):
+        targets = organize_targets(attachments_dir, attachments_csv, feedback_csv, only_user_types, by)
+    for group in targets[by].unique():
+        ensure_dir(out_dir / group)
 
-    fb = pd.read_csv(feedback_csv)
-    fb = fb[["feedback_id", "userType"]].dropna()
-    fid_to_user = dict(zip(fb["feedback_id"].astype(str), fb["userType"].astype(str)))
+    def place(name: str, group: str) -> Optional[str]:
+        src = attachments_dir / name
+        target = out_dir / group / name
+        try:
+            if move:
+                shutil.move(str(src), str(target))
+                return "move"
+            if link == "symlink" and not src.exists():
+                return None  # would leave a dangling link
+            return link_file(src, target, link)
+        except FileNotFoundError:
+            return None
 
-    at = pd.read_csv(attachments_csv)
-    at = at[["file_name", "feedback_id"]].dropna()
-    fname_to_fid = dict(zip(at["file_name"].astype(str), at["feedback_id"].astype(str)))
+    with metrics.stage("organize.place"), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        modes = Counter(pool.map(place, targets["file_name"], targets[by]))
+    missing = modes.pop(None, 0)
+    for mode, n in modes.items():
+        metrics.count("files_placed", n, mode=mode)
+    if missing:
+        metrics.count("files_missing", missing)
+    return sum(modes.values())
 
-    count = 0
-    only_set = set(only_user_types) if only_user_types else None
 
-    for p in attachments_dir.iterdir():
-        if not p.is_file():
-            continue
-        fname = p.name
-        fid = fname_to_fid.get(fname)
-        if not fid:
-            continue
-        user_type = fid_to_user.get(fid)
-        if not user_type:
-            continue
-        if only_set and user_type not in only_set:
-            continue
+def dedupe_directory(attachments_dir: Path, blob_store: Path) -> tuple[int, int]:
+    """
+    Move the downloaded files of `attachments_dir` into the content-addressed
+    `blob_store` and replace each with a hardlink to its blob, so identical bytes
+    across feedback and publications are stored once.
 
-        target_dir = out_dir / user_type
-        ensure_dir(target_dir)
-        target = target_dir / p.name
-        if move:
-            shutil.move(str(p), str(target))
-        else:
-            shutil.copy2(str(p), str(target))
-        count += 1
+    With a download manifest only the files it records as done are touched.
+    Without one, every file except the manifest, text store, index and signature
+    databases (with their SQLite sidecars) and the failure report.
 
-    return count
+    Returns `(files, bytes_saved)`.
+    """
+    manifest_path = attachments_dir / MANIFEST_FILENAME
+    if manifest_path.exists():
+        with DownloadManifest(manifest_path) as manifest:
+            names = {e["file_name"] for e in manifest.entries(DONE) if e["file_name"]}
+        candidates = [attachments_dir / name for name in sorted(names)]
+    else:
+        candidates = [
+            p for p in sorted(attachments_dir.iterdir())
+            if p.name != FAILURES_FILENAME and not p.name.startswith(_OWN_FILES)
+        ]
+
+    blobs = BlobStore(blob_store)
+    files = saved = 0
+    for p in candidates:
+        if p.name.startswith(".") or p.is_symlink() or not p.is_file():
+            continue
+        size = p.stat().st_size
+        sha = sha256_file(p)
+        files += 1
+        blob = blobs.path_for(sha)
+        if blob.exists() and p.samefile(blob):
+            continue  # already deduplicated
+        _, new = blobs.add(p, sha)
+        if not new:
+            saved += size
+    return files, saved
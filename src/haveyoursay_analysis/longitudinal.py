@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .storage import find_table, read_table, table_columns
+
+
+@dataclass
+class Snapshots:
+    """
+    N snapshots of one consultation, loaded once.
+
+    `feedback` holds every snapshot's feedback rows (`feedback_id`, `userType`,
+    `created`) with an ordered categorical `snapshot` column; `attachments` holds
+    per-snapshot attachment counts (`snapshot`, `feedback_id`, `attachments`).
+    """
+
+    labels: List[str]
+    feedback: pd.DataFrame
+    attachments: pd.DataFrame
+
+
+def _resolve(path: Path, name: str) -> Optional[Path]:
+    """A snapshot directory's `name` table, or `path` itself for the feedback table."""
+    if path.is_dir():
+        return find_table(path, name)
+    if name == "feedback":
+        return path
+    return find_table(path.parent, name)
+
+
+def load_snapshots(paths: Sequence[Path], labels: Optional[Sequence[str]] = None) -> Snapshots:
+    """
+    Load N snapshots (directories written by `fetch`, or feedback tables) in the given
+    order, which should be chronological. Labels default to the directory names.
+    """
+    labels = list(labels) if labels else [p.name if p.is_dir() else p.parent.name for p in paths]
+    if len(labels) != len(paths):
+        raise ValueError("Need one label per snapshot")
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"Snapshot labels must be unique: {labels}")
+
+    order = pd.CategoricalDtype(labels, ordered=True)
+    fb_parts, at_parts = [], []
+    for path, label in zip(paths, labels):
+        fb_path = _resolve(path, "feedback")
+        if fb_path is None:
+            raise ValueError(f"No feedback table in {path}")
+        cols: List[str] = [c for c in ("feedback_id", "userType", "created") if c in table_columns(fb_path)]
+        fb = read_table(fb_path, columns=cols).drop_duplicates("feedback_id")
+        fb["snapshot"] = label
+        fb_parts.append(fb)
+
+        at_path = _resolve(path, "attachments")
+        if at_path is not None:
+            counts = read_table(at_path, columns=["feedback_id"]).groupby("feedback_id").size()
+            at_parts.append(counts.rename("attachments").reset_index().assign(snapshot=label))
+
+    feedback = pd.concat(fb_parts, ignore_index=True)
+    feedback["snapshot"] = feedback["snapshot"].astype(order)
+    if at_parts:
+        attachments = pd.concat(at_parts, ignore_index=True)
+    else:
+        attachments = pd.DataFrame({"feedback_id": pd.array([], dtype="Int64"), "attachments": [], "snapshot": []})
+    attachments["snapshot"] = attachments["snapshot"].astype(order)
+    return Snapshots(labels=labels, feedback=feedback, attachments=attachments)
+
+
+def presence_matrix(snaps: Snapshots) -> pd.DataFrame:
+    """Boolean matrix feedback_id × snapshot: is the feedback present in that snapshot."""
+    m = pd.crosstab(snaps.feedback["feedback_id"], snaps.feedback["snapshot"], dropna=False) > 0
+    present: pd.DataFrame = m.reindex(columns=snaps.labels, fill_value=False)
+    return present
+
+
+def attachment_matrix(snaps: Snapshots) -> pd.DataFrame:
+    """Attachment count matrix feedback_id × snapshot (0 where absent)."""
+    m = snaps.attachments.pivot_table(
+        index="feedback_id", columns="snapshot", values="attachments", aggfunc="sum", fill_value=0, observed=False
+    )
+    counts: pd.DataFrame = m.reindex(columns=snaps.labels, fill_value=0).astype("int64")
+    return counts
+
+
+def churn(snaps: Snapshots) -> pd.DataFrame:
+    """
+    Per snapshot: total entries and, relative to the previous snapshot, entries added,
+    removed and retained.
+    """
+    m = presence_matrix(snaps).to_numpy()
+    prev = np.zeros_like(m)
+    prev[:, 1:] = m[:, :-1]
+    table: pd.DataFrame = pd.DataFrame({
+        "total": m.sum(axis=0),
+        "added": (m & ~prev).sum(axis=0),
+        "removed": (~m & prev).sum(axis=0),
+        "retained": (m & prev).sum(axis=0),
+    }, index=pd.Index(snaps.labels, name="snapshot"))
+    return table
+
+
+def arrivals_per_day(snaps: Snapshots) -> pd.DataFrame:
+    """
+    Submissions per `created` day across all snapshots (each feedback counted once),
+    with the running total.
+    """
+    if "created" not in snaps.feedback.columns:
+        empty: pd.DataFrame = pd.DataFrame(columns=["arrivals", "cumulative"])
+        return empty
+    first = snaps.feedback.sort_values("snapshot").drop_duplicates("feedback_id")
+    per_day = first["created"].dt.floor("D").value_counts().sort_index()
+    per_day.index.name = "day"
+    arrivals: pd.DataFrame = pd.DataFrame({"arrivals": per_day, "cumulative": per_day.cumsum()})
+    return arrivals
+
+
+def user_type_drift(snaps: Snapshots, normalize: bool = False) -> pd.DataFrame:
+    """userType counts (or shares with `normalize`) per snapshot: snapshot × userType."""
+    if "userType" not in snaps.feedback.columns:
+        empty: pd.DataFrame = pd.DataFrame(index=pd.Index(snaps.labels, name="snapshot"))
+        return empty
+    table = pd.crosstab(
+        snaps.feedback["snapshot"], snaps.feedback["userType"].astype("string"), dropna=False,
+        normalize="index" if normalize else False,
+    )
+    drift: pd.DataFrame = table.reindex(snaps.labels, fill_value=0)
+    return drift
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+MANIFEST_FILENAME = "download_manifest.sqlite"
+
+# Entry statuses
+DONE = "done"
+PARTIAL = "partial"
+FAILED = "failed"
+
+_COLUMNS = ["document_id", "file_name", "size", "sha256", "etag", "last_modified", "status", "error", "updated_at"]
+
+
+class DownloadManifest:
+    """
+    Persistent record of attachment downloads, keyed by `document_id`.
+
+    Stored as a small SQLite database next to the downloaded files. Every update is
+    committed immediately so the manifest survives a killed run.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                document_id TEXT PRIMARY KEY,
+                file_name TEXT,
+                size INTEGER,
+                sha256 TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "DownloadManifest":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM downloads WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def record(self, document_id: str, status: str, **fields: Any) -> None:
+        """Insert or update the entry for `document_id`; unspecified fields keep their value."""
+        values = {k: v for k, v in fields.items() if k in _COLUMNS}
+        values.update(document_id=document_id, status=status, updated_at=time.time())
+        if status == DONE:
+            values.setdefault("error", None)
+        cols = list(values)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != "document_id")
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO downloads ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                f"ON CONFLICT(document_id) DO UPDATE SET {updates}",
+                [values[c] for c in cols],
+            )
+            self._conn.commit()
+
+    def entries(self, status: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        query = f"SELECT {', '.join(_COLUMNS)} FROM downloads"
+        params: tuple = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            yield dict(zip(_COLUMNS, row))
+
+    def is_complete(self, document_id: str, path: Path, verify: bool = False) -> bool:
+        """
+        True if `document_id` is recorded as done and `path` matches the recorded size
+        (and SHA-256 when `verify` is set).
+        """
+        entry = self.get(document_id)
+        if not entry or entry["status"] != DONE or not path.exists():
+            return False
+        if entry["size"] is not None and path.stat().st_size != entry["size"]:
+            return False
+        if verify and entry["sha256"]:
+            return bool(sha256_file(path) == entry["sha256"])
+        return True
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
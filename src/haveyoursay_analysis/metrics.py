@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+PREFIX = "haveyoursay_"
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_SUFFIXES = (".prom", ".txt")
+PROFILERS = ("cprofile", "pyinstrument")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """`(le, count)` pairs as Prometheus expects them, ending with `+Inf`."""
+        out, total = [], 0
+        for le, n in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += n
+            out.append((le, total))
+        return out
+
+
+class Metrics:
+    """
+    Thread-safe in-process metrics for one run: counters, histograms and the wall
+    and CPU time spent in named stages.
+
+    Counter and histogram names are given without prefix or `_total` suffix, e.g.
+    `count("http_requests", kind="api", status=200)`. Stage CPU is the CPU time of
+    the thread running the stage unless the stage is opened with `cpu="process"`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.stages: Dict[str, List[float]] = {}
+
+    def count(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def add_stage(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+
+    @contextmanager
+    def stage(self, name: str, cpu: str = "thread") -> Iterator[None]:
+        """Add the wall and CPU time of the block to stage `name` (one call)."""
+        clock = time.process_time if cpu == "process" else time.thread_time
+        wall, cpu_start = time.perf_counter(), clock()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - wall, clock() - cpu_start)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+                "elapsed_seconds": time.time() - self.started,
+                "stages": {
+                    name: {"calls": calls, "wall_seconds": wall, "cpu_seconds": cpu}
+                    for name, (calls, wall, cpu) in self.stages.items()
+                },
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": dict(hist.cumulative()),
+                        "sum": hist.sum,
+                        "count": hist.count,
+                    }
+                    for (name, labels), hist in sorted(self.histograms.items())
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format (for the node exporter's textfile collector)."""
+        data = self.to_dict()
+        lines: List[str] = []
+
+        def family(name: str, kind: str, samples: List[Tuple[str, Dict[str, Any], float]]) -> None:
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{PREFIX}{name}{suffix}{_format_labels(labels)} {value:.17g}")
+
+        for field in ("calls", "wall_seconds", "cpu_seconds"):
+            name = f"stage_{field}_total"
+            family(name, "counter", [("", {"stage": s}, v[field]) for s, v in sorted(data["stages"].items())])
+        by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for c in data["counters"]:
+            by_name.setdefault(c["name"], []).append(c)
+        for name, counters in by_name.items():
+            family(f"{name}_total", "counter", [("", c["labels"], c["value"]) for c in counters])
+        hists: Dict[str, List[Dict[str, Any]]] = {}
+        for h in data["histograms"]:
+            hists.setdefault(h["name"], []).append(h)
+        for name, items in hists.items():
+            samples: List[Tuple[str, Dict[str, Any], float]] = []
+            for h in items:
+                samples += [("_bucket", {**h["labels"], "le": le}, n) for le, n in h["buckets"].items()]
+                samples += [("_sum", h["labels"], h["sum"]), ("_count", h["labels"], h["count"])]
+            family(name, "histogram", samples)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """
+        Write the metrics to `path`: Prometheus text format if it ends in `.prom` or
+        `.txt`, JSON otherwise. The file is replaced atomically, as the textfile
+        collector requires.
+        """
+        if path.suffix in PROMETHEUS_SUFFIXES:
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_dict(), indent=2)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """The process-wide metrics every module records into."""
+    return _metrics
+
+
+def reset_metrics() -> Metrics:
+    """Start a fresh process-wide record (e.g. at the start of a command)."""
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def count(name: str, value: float = 1.0, **labels: Any) -> None:
+    _metrics.count(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    _metrics.observe(name, value, **labels)
+
+
+def stage(name: str, cpu: str = "thread") -> Any:
+    return _metrics.stage(name, cpu)
+
+
+@contextmanager
+def track_request(kind: str) -> Iterator[Dict[str, Any]]:
+    """
+    Record one HTTP request of `kind` (`api`, `document`): its latency, a count by
+    status and the body bytes. Set `status` and `bytes` on the yielded dict; a
+    request that raises is counted under the error's response status, or `error`.
+    """
+    info: Dict[str, Any] = {"status": None, "bytes": 0}
+    start = time.perf_counter()
+    try:
+        yield info
+    except BaseException as e:
+        info["status"] = getattr(getattr(e, "response", None), "status_code", None) or info["status"]
+        raise
+    finally:
+        m = _metrics
+        m.observe("http_request_seconds", time.perf_counter() - start, kind=kind)
+        m.count("http_requests", kind=kind, status=info["status"] or "error")
+        if info["bytes"]:
+            m.count("http_bytes", info["bytes"], kind=kind)
+
+
+@contextmanager
+def profiling(path: Path, profiler: str = "cprofile") -> Iterator[None]:
+    """
+    Profile the block and write the result to `path`: pstats data for `cprofile`
+    (view with `python -m pstats` or snakeviz), an HTML report for `pyinstrument`.
+    cProfile only sees the calling thread; pyinstrument samples the whole process
+    (`pip install pyinstrument`).
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profiler!r}; expected one of {PROFILERS}")
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("The pyinstrument profiler requires: pip install pyinstrument") from e
+        sampler = Profiler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            path.write_text(sampler.output_html(), encoding="utf-8")
+        return
+
+    import cProfile
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(str(path))
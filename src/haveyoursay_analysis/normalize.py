@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import gc
+import json
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .storage import (
+    CATEGORY_COLUMNS,
+    CREATED_FORMAT,
+    INTEGER_COLUMNS,
+    _require_pyarrow,
+    arrow_schema,
+    parse_created,
+    string_ids,
+)
+
+try:
+    import orjson
+
+    _loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:  # pragma: no cover - depends on environment
+    _loads = json.loads
+
+# Raw rows decoded and projected per batch
+BATCH_ROWS = 10_000
+
+
+@dataclass(frozen=True)
+class Field:
+    """A normalized column and the raw API keys it is read from (the first non-empty value wins)."""
+
+    name: str
+    sources: Tuple[str, ...]
+
+    @property
+    def kind(self) -> str:
+        if self.name == "feedback_id":
+            return "id"
+        if self.name == "created":
+            return "datetime"
+        if self.name in CATEGORY_COLUMNS:
+            return "category"
+        if self.name in INTEGER_COLUMNS:
+            return "int"
+        return "string"
+
+
+# Every field of a raw feedback item, in table order; `storage.FEEDBACK_COLUMNS` come first.
+FEEDBACK_FIELDS = (
+    Field("feedback_id", ("id", "feedbackId")),
+    Field("userType", ("userType",)),
+    Field("author", ("author",)),
+    Field("country", ("country",)),
+    Field("created", ("createdDate", "created")),
+    Field("publication_id", ("publicationId",)),
+    Field("organization", ("organization",)),
+    Field("firstName", ("firstName",)),
+    Field("surname", ("surname",)),
+    Field("companySize", ("companySize",)),
+    Field("trNumber", ("trNumber",)),
+    Field("language", ("language",)),
+    Field("status", ("status",)),
+    Field("governanceLevel", ("governanceLevel",)),
+    Field("feedback", ("feedback",)),
+)
+# Fields of one attachment (from `attachments`, else `documents`); `feedback_id`
+# and `userType` come from the parent item. `storage.ATTACHMENT_COLUMNS` come first.
+ATTACHMENT_FIELDS = (
+    Field("feedback_id", ()),
+    Field("document_id", ("documentId", "id")),
+    Field("file_name", ("fileName", "name")),
+    Field("userType", ()),
+    Field("size", ("size",)),
+    Field("pages", ("pages",)),
+)
+FEEDBACK_FIELD_NAMES = [f.name for f in FEEDBACK_FIELDS]
+ATTACHMENT_FIELD_NAMES = [f.name for f in ATTACHMENT_FIELDS]
+
+# Table names of the full-field tables, kept apart from the ones fetch rewrites
+FULL_TABLE_NAMES = {"feedback": "feedback_full", "attachments": "attachments_full"}
+
+
+def _select_fields(fields: Optional[Sequence[str]]) -> List[Field]:
+    if fields is None:
+        return list(FEEDBACK_FIELDS)
+    unknown = sorted(set(fields) - set(FEEDBACK_FIELD_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown feedback fields {unknown}; expected some of {FEEDBACK_FIELD_NAMES}")
+    return [f for f in FEEDBACK_FIELDS if f.name == "feedback_id" or f.name in fields]
+
+
+def _without_empty(values: Any) -> Any:
+    """Pandas array with empty strings as missing values (as a CSV round trip has them)."""
+    values[(values == "").fillna(False)] = pd.NA
+    return values
+
+
+def _categorical(values: Any) -> pd.Categorical:
+    """Categorical of text values with sorted categories, as `astype("category")` gives them."""
+    cat = pd.Categorical(pd.array(values, dtype="str"))
+    return cat.remove_categories([""]) if "" in cat.categories else cat
+
+
+# -- pure-Python path ------------------------------------------------------------
+
+
+def _project(rows: List[Dict[str, Any]], sources: Tuple[str, ...]) -> List[Any]:
+    """One raw column of a batch."""
+    first, *rest = sources
+    values = [r.get(first) for r in rows]
+    for key in rest:
+        values = [v if v is not None and v != "" else r.get(key) for v, r in zip(values, rows)]
+    return values
+
+
+def _to_int(v: Any) -> Optional[int]:
+    """`v` as an int; None if missing or a non-finite float, ValueError if non-numeric."""
+    if v is None or v == "" or isinstance(v, bool):
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError, OverflowError):
+        if isinstance(v, float):
+            return None
+        raise ValueError(v) from None
+
+
+def _int_or_none(v: Any) -> Optional[int]:
+    try:
+        return _to_int(v)
+    except ValueError:
+        return None
+
+
+class _Column:
+    """
+    Append-only typed buffer for one column: int64 values plus a null mask for ids
+    and integers, int32 dictionary codes for categories, int64 microseconds for
+    timestamps and the raw values for text.
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.values: Any = array("i") if kind == "category" else [] if kind == "string" else array("q")
+        self.mask = bytearray()
+        self.categories: Dict[Any, int] = {None: -1}
+
+    def extend(self, values: List[Any]) -> None:
+        kind = self.kind
+        if kind == "category":
+            cats = self.categories
+            self.values.extend(array("i", [cats.setdefault(v, len(cats) - 1) for v in values]))
+        elif kind == "datetime":
+            us = parse_created(pd.Series(values, dtype=object)).to_numpy(dtype="datetime64[us]")
+            self.values.frombytes(us.view(np.int64).tobytes())
+        elif isinstance(self.values, list):
+            # text, or ids that turned out not to be numeric
+            self.values.extend(values)
+        else:
+            try:
+                ints = [v if type(v) is int else _to_int(v) for v in values]
+            except ValueError:
+                if kind == "int":
+                    ints = [_int_or_none(v) for v in values]
+                else:
+                    # like `storage._coerce_ids`: non-numeric ids make the column strings
+                    self.values = [None if m else v for v, m in zip(self.values, self.mask)]
+                    self.values.extend(values)
+                    return
+            self.mask.extend(v is None for v in ints)
+            self.values.extend(0 if v is None else v for v in ints)
+
+    def to_pandas(self) -> Any:
+        if isinstance(self.values, list):
+            return _without_empty(pd.array(self.values, dtype="string"))
+        if self.kind == "category":
+            codes = np.frombuffer(self.values, dtype=np.int32)
+            raw = list(self.categories)[1:]
+            categories = [str(c) for c in raw]
+            if len(set(categories)) < len(categories):
+                # e.g. both 1 and "1"
+                mixed = pd.Categorical.from_codes(codes, categories=pd.Index(raw, dtype=object))
+                return _categorical(np.asarray(mixed))
+            cat = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype="str"))
+            if "" in categories:
+                cat = cat.remove_categories([""])
+            return cat.reorder_categories(cat.categories.sort_values())
+        values = np.frombuffer(self.values, dtype=np.int64)
+        if self.kind == "datetime":
+            return values.view("datetime64[us]")
+        return pd.arrays.IntegerArray(values.copy(), np.frombuffer(self.mask, dtype=np.bool_).copy())
+
+
+def _documents(row: Dict[str, Any]) -> List[Any]:
+    docs = row.get("attachments")
+    if not isinstance(docs, list):
+        docs = row.get("documents")
+    return [d for d in docs if isinstance(d, dict)] if isinstance(docs, list) else []
+
+
+class Normalizer:
+    """
+    Columnar normalizer for raw feedback items.
+
+    Rows are added in batches and projected field by field into typed column
+    buffers, so no per-row dicts are built. Only the feedback fields named in
+    `fields` are kept (all of `FEEDBACK_FIELDS` by default; `feedback_id` always).
+    """
+
+    def __init__(self, fields: Optional[Sequence[str]] = None) -> None:
+        self.feedback_fields = _select_fields(fields)
+        self.feedback = {f.name: _Column(f.kind) for f in self.feedback_fields}
+        self.attachments = {f.name: _Column(f.kind) for f in ATTACHMENT_FIELDS}
+        self.parent = array("q")
+        self.rows = 0
+
+    def add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Normalize one batch of raw items."""
+        raw = {f.name: _project(rows, f.sources) for f in self.feedback_fields}
+        for name, values in raw.items():
+            self.feedback[name].extend(values)
+
+        docs = [(i, d) for i, r in enumerate(rows) for d in _documents(r)]
+        if docs:
+            ids = raw["feedback_id"]
+            user_types = raw["userType"] if "userType" in raw else _project(rows, ("userType",))
+            self.attachments["feedback_id"].extend([ids[i] for i, _ in docs])
+            self.attachments["userType"].extend([user_types[i] for i, _ in docs])
+            items = [d for _, d in docs]
+            for f in ATTACHMENT_FIELDS:
+                if f.sources:
+                    self.attachments[f.name].extend(_project(items, f.sources))
+            self.parent.extend(self.rows + i for i, _ in docs)
+        self.rows += len(rows)
+
+    def columns(self) -> Tuple[Dict[str, Any], Dict[str, Any], np.ndarray]:
+        """Feedback and attachment columns as pandas arrays, and each attachment's feedback row."""
+        return (
+            {name: col.to_pandas() for name, col in self.feedback.items()},
+            {name: col.to_pandas() for name, col in self.attachments.items()},
+            np.frombuffer(self.parent, dtype=np.int64),
+        )
+
+
+def iter_raw_batches(path: Path, batch_rows: int = BATCH_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Raw rows of a dump written by `fetch`, decoded in batches with orjson when it
+    is installed (`[fast]` extra), else the standard library. A legacy
+    `feedback_raw.json` array is decoded whole.
+    """
+    with open(path, "rb") as f:
+        if path.suffix == ".json":
+            rows = _loads(f.read())
+            for start in range(0, len(rows), batch_rows):
+                yield rows[start:start + batch_rows]
+            return
+        while True:
+            lines = f.readlines(batch_rows * 1024)
+            if not lines:
+                return
+            yield [_loads(line) for line in lines if line.strip()]
+
+
+def _batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pause the cyclic garbage collector: decoding allocates many short-lived dicts
+    without reference cycles, and each collection would rescan all of them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _python_columns(batches: Iterable[List[Dict[str, Any]]], fields: List[Field]) -> Tuple[Any, Any, np.ndarray]:
+    normalizer = Normalizer([f.name for f in fields])
+    with metrics.stage("normalize.project"), _gc_paused():
+        for batch in batches:
+            normalizer.add_rows(batch)
+    return normalizer.columns()
+
+
+# -- Arrow path ------------------------------------------------------------------
+
+
+def _arrow_columns(path: Path, fields: List[Field]) -> Optional[Tuple[Any, Any, np.ndarray]]:
+    """
+    Decode and project an NDJSON dump with pyarrow's multi-threaded JSON reader.
+    None if pyarrow is not installed or the dump does not fit the expected types
+    (e.g. string ids); the caller then takes the pure-Python path.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.json as pj
+    except ImportError:
+        return None
+
+    def raw_type(f: Field) -> Any:
+        return pa.int64() if f.kind in ("id", "int") else pa.string()
+
+    def types(fs: Iterable[Field]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for f in fs:
+            out.update((key, raw_type(f)) for key in f.sources)
+        return out
+
+    doc_types = types(ATTACHMENT_FIELDS)
+    # an attachment's `id` is numeric; it only stands in for a missing `documentId`
+    doc_types["id"] = pa.int64()
+    documents = pa.list_(pa.struct(list(doc_types.items())))
+    schema = pa.schema([*types(fields).items(), ("attachments", documents), ("documents", documents)])
+    options = pj.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore")
+    try:
+        with metrics.stage("normalize.decode"):
+            table = pj.read_json(str(path), parse_options=options)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+    def column(source: Any, f: Field) -> Any:
+        values = None
+        for key in f.sources:
+            v = source(key)
+            if pa.types.is_string(v.type):
+                v = pc.if_else(pc.equal(v, ""), pa.scalar(None, v.type), v)
+            elif pa.types.is_string(raw_type(f)):
+                v = v.cast(pa.string())
+            values = v if values is None else pc.coalesce(values, v)
+        return values
+
+    def to_pandas(values: Any, kind: str) -> Any:
+        if kind in ("id", "int"):
+            return pd.array(values, dtype="Int64")
+        if kind == "category":
+            return _categorical(values)
+        if kind == "datetime":
+            created = pc.strptime(values, format=CREATED_FORMAT, unit="us", error_is_null=True)
+            if pc.sum(pc.and_(pc.is_valid(values), pc.is_null(created))).as_py():
+                return parse_created(pd.Series(values.to_pylist(), dtype=object)).to_numpy(dtype="datetime64[us]")
+            return created.to_numpy()
+        return pd.array(values, dtype="string")
+
+    with metrics.stage("normalize.project"):
+        feedback = {f.name: column(table.column, f) for f in fields}
+        user_type = feedback["userType"] if "userType" in feedback else column(table.column, FEEDBACK_FIELDS[1])
+        attachments = table.column("attachments").combine_chunks()
+        docs = pc.if_else(pc.is_valid(attachments), attachments, table.column("documents").combine_chunks())
+        parent = pc.list_parent_indices(docs)
+        items = pc.list_flatten(docs)
+        at = {
+            "feedback_id": pc.take(feedback["feedback_id"], parent),
+            "userType": pc.take(user_type, parent),
+        }
+        for f in ATTACHMENT_FIELDS:
+            if f.sources:
+                at[f.name] = column(items.field, f)
+        fb_kinds = {f.name: f.kind for f in fields}
+        at_kinds = {f.name: f.kind for f in ATTACHMENT_FIELDS}
+        return (
+            {name: to_pandas(values, fb_kinds[name]) for name, values in feedback.items()},
+            {f.name: to_pandas(at[f.name], at_kinds[f.name]) for f in ATTACHMENT_FIELDS},
+            parent.to_numpy(zero_copy_only=False).astype(np.int64),
+        )
+
+
+# -- tables ----------------------------------------------------------------------
+
+
+def _tables(columns: Tuple[Dict[str, Any], Dict[str, Any], np.ndarray], arrow: bool) -> Dict[str, Any]:
+    """
+    Feedback and attachments tables from projected columns, de-duplicated as
+    `SnapshotWriter` does: feedback by `feedback_id` (first wins, along with its
+    attachments) and attachments by `(feedback_id, document_id)`.
+    """
+    fb_columns, at_columns, parent = columns
+    with metrics.stage("normalize.build"):
+        fb = pd.DataFrame(fb_columns)
+        at = pd.DataFrame(at_columns)
+        first = ~fb["feedback_id"].duplicated().to_numpy()
+        keep = first[parent] & ~at.duplicated(["feedback_id", "document_id"]).to_numpy()
+        fb = fb[first].reset_index(drop=True)
+        at = at[keep].reset_index(drop=True)
+        if not arrow:
+            return {"feedback": fb, "attachments": at}
+        pa = _require_pyarrow()
+        return {
+            name: pa.Table.from_pandas(
+                df, schema=arrow_schema(list(df.columns), text_ids=string_ids(df)), preserve_index=False
+            )
+            for name, df in (("feedback", fb), ("attachments", at))
+        }
+
+
+def normalize_rows(
+    rows: Iterable[Dict[str, Any]],
+    fields: Optional[Sequence[str]] = None,
+    arrow: bool = False,
+    batch_rows: int = BATCH_ROWS,
+) -> Dict[str, Any]:
+    """
+    Normalize raw feedback items into `{"feedback": ..., "attachments": ...}`
+    tables holding every field of `FEEDBACK_FIELDS` and `ATTACHMENT_FIELDS` (or
+    only the feedback fields named in `fields`), with the dtypes of
+    `storage.read_table`: pandas DataFrames, or pyarrow Tables with `arrow`.
+    """
+    selected = _select_fields(fields)
+    return _tables(_python_columns(_batched(rows, batch_rows), selected), arrow)
+
+
+def normalize_raw_dump(
+    path: Path,
+    fields: Optional[Sequence[str]] = None,
+    arrow: bool = False,
+    batch_rows: int = BATCH_ROWS,
+) -> Dict[str, Any]:
+    """
+    Normalize a raw dump (`feedback_raw.ndjson`, or a legacy `.json` array) as
+    `normalize_rows` does. With pyarrow installed, NDJSON is decoded and projected
+    by its JSON reader on all cores without creating Python objects per item.
+    """
+    selected = _select_fields(fields)
+    columns = _arrow_columns(path, selected) if path.suffix != ".json" else None
+    if columns is None:
+        columns = _python_columns(iter_raw_batches(path, batch_rows), selected)
+    return _tables(columns, arrow)
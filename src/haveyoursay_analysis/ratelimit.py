@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: on average `rate` acquisitions per second, with bursts
+    of up to `burst` back-to-back acquisitions.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available and take them. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AIMDLimiter:
+    """
+    Thread-safe concurrency limit that adapts to server push-back: additive increase,
+    multiplicative decrease (AIMD).
+
+    Each request holds a slot (`with limiter.slot() as s: ...`). A throttled request
+    (`s.throttled = True`) cuts the limit to `decrease` times the number of requests
+    that were in flight, at most once per `cooldown` seconds so a burst of 429s
+    counts as one signal. While requests succeed with every slot in use, the limit
+    grows by `increase` per limit's worth of successes, back up to `max_limit`.
+    """
+
+    def __init__(
+        self,
+        max_limit: int = 64,
+        min_limit: int = 1,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= max_limit")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.throttles = 0
+        self._active = 0
+        self._last_decrease = -math.inf
+        self._cond = threading.Condition()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def acquire(self) -> float:
+        """Block until fewer than `limit` requests are in flight, then take a slot. Returns the start time."""
+        with self._cond:
+            while self._active >= int(self.limit):
+                self._cond.wait()
+            self._active += 1
+            return time.monotonic()
+
+    def release(self, throttled: bool = False, started: Optional[float] = None) -> None:
+        """
+        Free a slot and adjust the limit by the request's outcome. Successes of
+        requests `started` before the last decrease do not count towards growth.
+        """
+        with self._cond:
+            in_flight = self._active
+            self._active -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.throttles += 1
+                    self.limit = max(float(self.min_limit), min(self.limit, in_flight) * self.decrease)
+            elif in_flight >= int(self.limit) and (started is None or started > self._last_decrease):
+                # only grow while the limit is what holds requests back
+                self.limit = min(float(self.max_limit), self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator["_Slot"]:
+        s = _Slot()
+        started = self.acquire()
+        try:
+            yield s
+        finally:
+            self.release(s.throttled, started)
+
+
+class _Slot:
+    __slots__ = ("throttled",)
+
+    def __init__(self) -> None:
+        self.throttled = False
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import random
+import sys
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import requests
+
+from . import metrics
+from .ratelimit import AIMDLimiter
+
+T = TypeVar("T")
+
+# Statuses worth another attempt. 416 is included because `files._download` drops
+# its stale partial file on a 416, so the next attempt starts from scratch.
+RETRYABLE_STATUSES = frozenset({408, 416, 425, 429, 500, 502, 503, 504})
+# Statuses that mean "slow down": they shrink the adaptive concurrency limit
+THROTTLE_STATUSES = frozenset({429, 503})
+# Request errors that no amount of retrying fixes
+_FATAL_REQUEST_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.InvalidSchema,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.InvalidHeader,
+    requests.exceptions.URLRequired,
+)
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status of the response attached to a requests/httpx error, if any."""
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    True for errors a later attempt may fix: connection failures, timeouts, broken
+    transfers and the statuses in `RETRYABLE_STATUSES`. Other HTTP errors (404,
+    403, ...), bad URLs and non-network exceptions are fatal.
+    """
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    if isinstance(exc, requests.RequestException):
+        return not isinstance(exc, _FATAL_REQUEST_ERRORS)
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return not isinstance(exc, httpx.UnsupportedProtocol)
+    return False
+
+
+def is_throttle(exc: BaseException) -> bool:
+    return status_of(exc) in THROTTLE_STATUSES
+
+
+def _record_retry(exc: BaseException, wait: Optional[float]) -> None:
+    reason = status_of(exc) or type(exc).__name__
+    if wait is None:
+        metrics.count("http_gave_up", reason=reason)
+    else:
+        metrics.count("http_retries", reason=reason)
+        metrics.count("http_retry_wait_seconds", wait)
+
+
+def retry_after(exc: BaseException, now: Optional[float] = None) -> Optional[float]:
+    """Seconds requested by the response's `Retry-After` header (delta or HTTP date), if any."""
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How requests are retried.
+
+    Retryable errors (see `is_retryable`) are retried up to `max_tries` attempts in
+    total, waiting a "full jitter" backoff: a uniform random delay up to
+    `base * 2**(attempt - 1)`, capped at `cap` seconds. A `Retry-After` header
+    overrides the backoff when it asks for longer; one asking for more than
+    `max_retry_after` seconds gives up instead. Fatal errors are raised at once.
+
+    With a `limiter`, every attempt holds one of its slots, and 429/503 responses
+    shrink the number of attempts allowed in flight across all threads.
+    """
+
+    max_tries: int = 5
+    base: float = 0.5
+    cap: float = 30.0
+    max_retry_after: float = 300.0
+    limiter: Optional[AIMDLimiter] = None
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+    def delay(self, attempt: int, exc: BaseException) -> Optional[float]:
+        """Seconds to wait after failed `attempt` (1-based) before the next, or None to give up."""
+        if attempt >= self.max_tries or not is_retryable(exc):
+            return None
+        wait = self.backoff(attempt)
+        hint = retry_after(exc)
+        if hint is not None:
+            if hint > self.max_retry_after:
+                return None
+            wait = max(wait, hint)
+        return wait
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call `fn(*args, **kwargs)`, retrying per the policy."""
+        attempt = 0
+        while True:
+            attempt += 1
+            slot = self.limiter.slot() if self.limiter is not None else nullcontext()
+            try:
+                with slot as s:
+                    try:
+                        return fn(*args, **kwargs)
+                    except Exception as e:
+                        if s is not None:
+                            s.throttled = is_throttle(e)
+                        raise
+            except Exception as e:
+                wait = self.delay(attempt, e)
+                _record_retry(e, wait)
+                if wait is None:
+                    raise
+            time.sleep(wait)
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """
+        Async version of `call`. Waits with `asyncio.sleep`; the limiter is not used,
+        as async callers bound their own concurrency.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                wait = self.delay(attempt, e)
+                _record_retry(e, wait)
+                if wait is None:
+                    raise
+            await asyncio.sleep(wait)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from .api import normalize_row
+from .defaults import INDEX_FILENAME  # noqa: F401 - re-exported
+from .snapshot import find_raw_dump, iter_raw_rows
+from .storage import find_table, read_table
+
+KINDS = ("feedback", "attachment")
+FACETS = ("userType", "country", "kind")
+RESULT_COLUMNS = ["kind", "feedback_id", "document_id", "userType", "country", "score", "snippet"]
+
+
+@dataclass
+class IndexStats:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+class SearchIndex:
+    """
+    Full-text index (SQLite FTS5) over feedback comments and attachment text.
+
+    Every indexed document is a row in `docs` carrying its `feedback_id`,
+    `document_id`, `userType` and `country` for facet filtering; the text itself
+    lives in the `fts` table under the same rowid. Queries use FTS5 syntax:
+    `"exact phrase"`, `AND`/`OR`/`NOT`, `prefix*` and `NEAR(a b)`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                rowid INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                feedback_id INTEGER,
+                document_id TEXT,
+                userType TEXT,
+                country TEXT,
+                digest TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS docs_user_type ON docs (userType);
+            CREATE INDEX IF NOT EXISTS docs_country ON docs (country);
+            CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(text, tokenize = 'unicode61 remove_diacritics 2');
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT count(*) FROM docs").fetchone()[0])
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> IndexStats:
+        """
+        Add or update documents (dicts with `kind`, `feedback_id`, `document_id`,
+        `userType`, `country`, `text`) in one transaction.
+
+        A document is keyed by its `document_id` for attachments and its
+        `feedback_id` for feedback. Text is only re-indexed when its digest
+        changed; metadata changes are applied without touching the text index.
+        """
+        stats = IndexStats()
+        with self._lock:
+            existing = {
+                key: (rowid, digest, user_type, country)
+                for key, rowid, digest, user_type, country in self._conn.execute(
+                    "SELECT key, rowid, digest, userType, country FROM docs"
+                )
+            }
+            with self._conn:
+                for rec in records:
+                    text = rec.get("text") or ""
+                    if not text.strip():
+                        continue
+                    kind = rec["kind"]
+                    key = f"{kind}:{rec['document_id'] if kind == 'attachment' else rec['feedback_id']}"
+                    meta = (rec.get("feedback_id"), rec.get("document_id"), rec.get("userType"), rec.get("country"))
+                    digest = _digest(text)
+                    old = existing.get(key)
+                    if old is None:
+                        cur = self._conn.execute(
+                            "INSERT INTO docs (key, kind, feedback_id, document_id, userType, country, digest) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, kind, *meta, digest),
+                        )
+                        self._conn.execute("INSERT INTO fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, text))
+                        existing[key] = (cur.lastrowid, digest, meta[2], meta[3])
+                        stats.added += 1
+                        continue
+                    rowid, old_digest, user_type, country = old
+                    if old_digest == digest and (user_type, country) == meta[2:]:
+                        stats.unchanged += 1
+                        continue
+                    self._conn.execute(
+                        "UPDATE docs SET feedback_id = ?, document_id = ?, userType = ?, country = ?, digest = ? "
+                        "WHERE rowid = ?",
+                        (*meta, digest, rowid),
+                    )
+                    if old_digest != digest:
+                        self._conn.execute("DELETE FROM fts WHERE rowid = ?", (rowid,))
+                        self._conn.execute("INSERT INTO fts (rowid, text) VALUES (?, ?)", (rowid, text))
+                    existing[key] = (rowid, digest, meta[2], meta[3])
+                    stats.updated += 1
+        return stats
+
+    def _where(
+        self,
+        query: str,
+        user_types: Optional[Sequence[str]],
+        countries: Optional[Sequence[str]],
+        kinds: Optional[Sequence[str]],
+    ) -> tuple:
+        if kinds and not set(kinds) <= set(KINDS):
+            raise ValueError(f"Unknown kind(s): {sorted(set(kinds) - set(KINDS))}; expected {KINDS}")
+        clauses = ["fts MATCH ?"]
+        params: List[Any] = [query]
+        for column, values in (("userType", user_types), ("country", countries), ("kind", kinds)):
+            if values:
+                clauses.append(f"d.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        return " AND ".join(clauses), params
+
+    def _execute(self, sql: str, params: List[Any]) -> List[tuple]:
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}") from e
+
+    def search(
+        self,
+        query: str,
+        user_types: Optional[Sequence[str]] = None,
+        countries: Optional[Sequence[str]] = None,
+        kinds: Optional[Sequence[str]] = None,
+        limit: Optional[int] = 20,
+    ) -> pd.DataFrame:
+        """Best matches first (BM25), with a highlighted snippet of each."""
+        where, params = self._where(query, user_types, countries, kinds)
+        sql = (
+            "SELECT d.kind, d.feedback_id, d.document_id, d.userType, d.country, bm25(fts) AS score, "
+            "snippet(fts, 0, '[', ']', '...', 12) FROM fts JOIN docs d ON d.rowid = fts.rowid "
+            f"WHERE {where} ORDER BY score"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        df: pd.DataFrame = pd.DataFrame(self._execute(sql, params), columns=RESULT_COLUMNS)
+        df["feedback_id"] = df["feedback_id"].astype("Int64")
+        return df
+
+    def facets(
+        self,
+        query: str,
+        user_types: Optional[Sequence[str]] = None,
+        countries: Optional[Sequence[str]] = None,
+        kinds: Optional[Sequence[str]] = None,
+    ) -> Dict[str, pd.Series]:
+        """Match counts per `userType`, `country` and `kind` for the same filters."""
+        where, params = self._where(query, user_types, countries, kinds)
+        out = {}
+        for column in FACETS:
+            rows = self._execute(
+                f"SELECT d.{column}, count(*) AS n FROM fts JOIN docs d ON d.rowid = fts.rowid "
+                f"WHERE {where} GROUP BY d.{column} ORDER BY n DESC",
+                params,
+            )
+            out[column] = pd.Series(dict(rows), name=column, dtype="int64")
+        return out
+
+
+def _feedback_meta(snapshot_dir: Path) -> pd.DataFrame:
+    path = find_table(snapshot_dir, "feedback")
+    if path is None:
+        empty: pd.DataFrame = pd.DataFrame(columns=["userType", "country"], index=pd.Index([], name="feedback_id"))
+        return empty
+    fb = read_table(path, columns=["feedback_id", "userType", "country"]).dropna(subset=["feedback_id"])
+    meta: pd.DataFrame = fb.drop_duplicates("feedback_id").set_index("feedback_id")
+    return meta
+
+
+def iter_feedback_documents(snapshot_dir: Path) -> Iterator[Dict[str, Any]]:
+    """Feedback comments (the `feedback` field of the raw dump) as index records."""
+    raw = find_raw_dump(snapshot_dir)
+    if raw is None:
+        return
+    for row in iter_raw_rows(raw):
+        fb, _ = normalize_row(row)
+        if fb["feedback_id"] is None:
+            continue
+        yield {
+            "kind": "feedback",
+            "feedback_id": int(fb["feedback_id"]),
+            "document_id": None,
+            "userType": _clean(fb["userType"]),
+            "country": _clean(fb["country"]),
+            "text": row.get("feedback") or "",
+        }
+
+
+def iter_attachment_documents(snapshot_dir: Path, text_store: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Attachments in the text store joined to `feedback_id`, `userType` and `country`
+    of the snapshot, with their extracted `text` (None if extraction failed) and
+    file `sha256`.
+    """
+    from .extract import TextStore
+
+    path = find_table(snapshot_dir, "attachments")
+    if path is None:
+        return
+    at = read_table(path, columns=["feedback_id", "document_id"]).dropna(subset=["document_id"])
+    meta = at.drop_duplicates("document_id").join(_feedback_meta(snapshot_dir), on="feedback_id")
+    columns = (meta[c] for c in ("document_id", "feedback_id", "userType", "country"))
+    lookup = {
+        str(doc): (None if pd.isna(fid) else int(fid), _clean(user_type), _clean(country))
+        for doc, fid, user_type, country in zip(*columns)
+    }
+
+    with TextStore(text_store) as store:
+        for entry in store.records():
+            document_id = entry["document_id"]
+            if document_id not in lookup:
+                continue
+            fid, user_type, country = lookup[document_id]
+            yield {
+                "kind": "attachment",
+                "feedback_id": fid,
+                "document_id": document_id,
+                "userType": user_type,
+                "country": country,
+                "text": entry["text"],
+                "sha256": entry["sha256"],
+            }
+
+
+def index_snapshot(index: SearchIndex, snapshot_dir: Path, text_store: Optional[Path] = None) -> IndexStats:
+    """
+    Add a snapshot's feedback comments, and attachment text from `text_store` if
+    given, to `index`. Re-indexing the same or a newer snapshot only touches
+    documents that are new or changed.
+    """
+    stats = index.upsert(iter_feedback_documents(snapshot_dir))
+    if text_store is not None:
+        more = index.upsert(iter_attachment_documents(snapshot_dir, text_store))
+        stats = IndexStats(stats.added + more.added, stats.updated + more.updated, stats.unchanged + more.unchanged)
+    return stats
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from . import metrics
+from .api import NEWEST_FIRST, iter_feedback_pages, normalize_row
+from .storage import (
+    ATTACHMENT_COLUMNS,
+    CREATED_FORMAT,
+    FEEDBACK_COLUMNS,
+    TableSink,
+    find_table,
+    read_table,
+    remove_other_formats,
+    table_format,
+    table_path,
+)
+
+RAW_FILENAME = "feedback_raw.ndjson"
+FEEDBACK_FILENAME = "feedback.csv"
+ATTACHMENTS_FILENAME = "attachments.csv"
+
+
+class SnapshotWriter:
+    """
+    Incrementally write a fetch snapshot: raw NDJSON plus the feedback and attachments
+    tables in format `fmt` (`csv`, `parquet` or `arrow`, see `storage`). Once written,
+    copies of the tables in other formats are removed so they cannot shadow the new ones.
+
+    Rows are normalized and written one at a time, so memory use does not grow with
+    the size of the consultation. Feedback is de-duplicated by `feedback_id` and
+    attachments by `(feedback_id, document_id)` using seen-id sets.
+
+    Use as a context manager::
+
+        with SnapshotWriter(out) as w:
+            for items in iter_feedback_pages(pid):
+                w.write_rows(items)
+    """
+
+    def __init__(self, out_dir: Path, write_raw: bool = True, fmt: str = "csv") -> None:
+        self.out_dir = out_dir
+        self.write_raw = write_raw
+        self.fmt = fmt
+        self.feedback_count = 0
+        self.attachment_count = 0
+        self.raw_count = 0
+        self._seen_feedback: Set[str] = set()
+        self._seen_attachments: Set[Tuple[str, str]] = set()
+        self._closers: List[Any] = []
+
+    def __enter__(self) -> "SnapshotWriter":
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._raw = None
+        if self.write_raw:
+            self._raw = open(self.out_dir / RAW_FILENAME, "w", encoding="utf-8", newline="")
+            self._closers.append(self._raw)
+        self._fb = TableSink(table_path(self.out_dir, "feedback", self.fmt), FEEDBACK_COLUMNS)
+        self._closers.append(self._fb)
+        self._at = TableSink(table_path(self.out_dir, "attachments", self.fmt), ATTACHMENT_COLUMNS)
+        self._closers.append(self._at)
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        for f in self._closers:
+            f.close()
+        self._closers = []
+        if exc_type is None:
+            remove_other_formats(self._fb.path)
+            remove_other_formats(self._at.path)
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        if self._raw is not None:
+            self._raw.write(json.dumps(row, ensure_ascii=False))
+            self._raw.write("\n")
+        self.raw_count += 1
+
+        self.write_normalized(*normalize_row(row))
+
+    def write_normalized(self, feedback: Dict[str, Any], attachments: Iterable[Dict[str, Any]]) -> None:
+        """Write an already-normalized feedback record and its attachments (no raw line)."""
+        fid = str(feedback["feedback_id"])
+        if fid in self._seen_feedback:
+            return
+        self._seen_feedback.add(fid)
+        self._fb.write(feedback)
+        self.feedback_count += 1
+
+        for a in attachments:
+            key = (fid, str(a["document_id"]))
+            if key in self._seen_attachments:
+                continue
+            self._seen_attachments.add(key)
+            self._at.write(a)
+            self.attachment_count += 1
+
+
+def write_snapshot(
+    pages: Iterable[List[Dict[str, Any]]],
+    out_dir: Path,
+    write_raw: bool = True,
+    fmt: str = "csv",
+) -> SnapshotWriter:
+    """Stream pages of raw feedback into a snapshot directory; returns the closed writer (for counts)."""
+    with SnapshotWriter(out_dir, write_raw=write_raw, fmt=fmt) as writer:
+        for items in pages:
+            with metrics.stage("snapshot.write"):
+                writer.write_rows(items)
+    return writer
+
+
+def iter_raw_rows(path: Path) -> Iterable[Dict[str, Any]]:
+    """
+    Iterate raw feedback rows from a dump written by `fetch`.
+    Reads NDJSON line by line; a legacy `feedback_raw.json` array is loaded whole.
+    """
+    if path.suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_raw_dump(snapshot_dir: Path) -> Optional[Path]:
+    """Return the raw dump of a snapshot directory (NDJSON preferred), if any."""
+    for name in (RAW_FILENAME, "feedback_raw.json"):
+        if (snapshot_dir / name).exists():
+            return snapshot_dir / name
+    return None
+
+
+@dataclass
+class Watermark:
+    """What a previous snapshot already contains: its feedback ids and newest `created` value."""
+
+    seen_ids: Set[str] = field(default_factory=set)
+    latest_created: Optional[str] = None
+
+
+def load_watermark(snapshot_dir: Path) -> Watermark:
+    """Read the watermark of an existing snapshot from its feedback table (empty if there is none)."""
+    wm = Watermark()
+    path = find_table(snapshot_dir, "feedback")
+    if path is None:
+        return wm
+    df = read_table(path, columns=["feedback_id", "created"])
+    wm.seen_ids = set(df["feedback_id"].dropna().astype(str))
+    latest = df["created"].max()
+    if pd.notna(latest):
+        # same layout as API timestamps ("2024/01/31 10:00:00"), which sort lexicographically
+        wm.latest_created = latest.strftime(CREATED_FORMAT)
+    return wm
+
+
+def iter_new_rows(
+    pages: Iterable[List[Dict[str, Any]]],
+    watermark: Watermark,
+) -> Iterable[Dict[str, Any]]:
+    """
+    Yield rows not yet in `watermark` from newest-first `pages`, stopping after the
+    first page that reaches known data: a page holding a known `feedback_id`, or one
+    whose items are all older than `watermark.latest_created`.
+    """
+    for items in pages:
+        reached_known = False
+        all_older = watermark.latest_created is not None
+        for row in items:
+            feedback, _ = normalize_row(row)
+            if str(feedback["feedback_id"]) in watermark.seen_ids:
+                reached_known = True
+                continue
+            if not feedback["created"] or str(feedback["created"]) >= str(watermark.latest_created):
+                all_older = False
+            yield row
+        if reached_known or all_older:
+            return
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    if "created" in df.columns:
+        df["created"] = df["created"].dt.strftime(CREATED_FORMAT)
+    records: List[Dict[str, Any]] = df.astype(object).where(df.notna(), None).to_dict("records")
+    return records
+
+
+def _iter_existing(snapshot_dir: Path, writer: SnapshotWriter) -> None:
+    """Copy an existing snapshot into `writer`, from the raw dump if there is one, else its tables."""
+    raw = find_raw_dump(snapshot_dir)
+    if raw is not None:
+        writer.write_rows(iter_raw_rows(raw))
+        return
+    attachments: Dict[str, List[Dict[str, Any]]] = {}
+    at_path = find_table(snapshot_dir, "attachments")
+    if at_path is not None:
+        for rec in _records(read_table(at_path)):
+            attachments.setdefault(str(rec["feedback_id"]), []).append(rec)
+    fb_path = find_table(snapshot_dir, "feedback")
+    if fb_path is not None:
+        for rec in _records(read_table(fb_path)):
+            writer.write_normalized(rec, attachments.get(str(rec["feedback_id"]), []))
+
+
+def _observed(
+    pages: Iterable[List[Dict[str, Any]]], on_page: Optional[Callable[[List[Dict[str, Any]]], None]]
+) -> Iterator[List[Dict[str, Any]]]:
+    for items in pages:
+        if on_page is not None:
+            on_page(items)
+        yield items
+
+
+def fetch_incremental(
+    publication_id: int,
+    snapshot_dir: Path,
+    page_size: int = 100,
+    language: str = "EN",
+    fmt: Optional[str] = None,
+    on_page: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> Tuple[int, SnapshotWriter]:
+    """
+    Fetch only feedback newer than the snapshot in `snapshot_dir` and merge it in.
+
+    Pages are requested newest first and paging stops once known items are reached.
+    The existing snapshot is rewritten with the new rows appended; files are swapped
+    in only after the merge succeeds. Without an existing snapshot this is a full fetch.
+    `fmt` defaults to the format of the existing snapshot (CSV for a new one).
+    `on_page` is called with each fetched page, e.g. to drive a progress bar.
+    Returns `(new_row_count, writer)`.
+    """
+    existing = find_table(snapshot_dir, "feedback")
+    fmt = fmt or (table_format(existing) if existing is not None else "csv")
+    watermark = load_watermark(snapshot_dir)
+    if not watermark.seen_ids:
+        pages = iter_feedback_pages(publication_id, page_size=page_size, language=language)
+        writer = write_snapshot(_observed(pages, on_page), snapshot_dir, fmt=fmt)
+        return writer.raw_count, writer
+
+    pages = iter_feedback_pages(publication_id, page_size=page_size, language=language, sort=NEWEST_FIRST)
+    # new rows are few by construction, so they are held until the merge
+    new_rows = list(iter_new_rows(_observed(pages, on_page), watermark))
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=snapshot_dir, prefix=".merge-"))
+    try:
+        with SnapshotWriter(tmp_dir, write_raw=find_raw_dump(snapshot_dir) is not None, fmt=fmt) as writer:
+            _iter_existing(snapshot_dir, writer)
+            # oldest first, so the merged snapshot stays in arrival order
+            writer.write_rows(reversed(new_rows))
+        for name in os.listdir(tmp_dir):
+            os.replace(tmp_dir / name, snapshot_dir / name)
+        for table in ("feedback", "attachments"):
+            remove_other_formats(table_path(snapshot_dir, table, fmt))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return len(new_rows), writer
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+FEEDBACK_COLUMNS = ["feedback_id", "userType", "author", "country", "created"]
+ATTACHMENT_COLUMNS = ["feedback_id", "document_id", "file_name", "userType"]
+
+# Supported table formats and their file suffixes
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+_SUFFIX_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+# Dtypes of the columns feedback and attachments tables may have; see `normalize` for the full field set
+CATEGORY_COLUMNS = ("userType", "country", "companySize", "language", "status", "governanceLevel")
+STRING_COLUMNS = ("author", "document_id", "file_name", "organization", "firstName", "surname", "trNumber", "feedback")
+INTEGER_COLUMNS = ("publication_id", "size", "pages")
+CREATED_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+
+def _require_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:  # pragma: no cover - depends on environment
+        raise ImportError(
+            "Parquet/Arrow storage requires pyarrow: pip install 'haveyoursay-analysis[parquet]'"
+        ) from e
+    return pyarrow
+
+
+def table_format(path: Path) -> str:
+    """Storage format of `path` from its suffix (`csv`, `parquet` or `arrow`)."""
+    try:
+        return _SUFFIX_FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported table format: {path} (use .csv, .parquet or .arrow)") from None
+
+
+def table_path(directory: Path, name: str, fmt: str = "csv") -> Path:
+    """Path of table `name` (e.g. `feedback`) in `directory` for format `fmt`."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {sorted(FORMATS)}")
+    return directory / f"{name}{FORMATS[fmt]}"
+
+
+def find_table(directory: Path, name: str) -> Optional[Path]:
+    """Existing table `name` in `directory`, preferring columnar formats over CSV."""
+    for fmt in ("parquet", "arrow", "csv"):
+        path = table_path(directory, name, fmt)
+        if path.exists():
+            return path
+    return None
+
+
+def remove_other_formats(path: Path) -> None:
+    """Delete copies of the table at `path` stored in other formats, so `find_table` returns `path`."""
+    fmt = table_format(path)
+    for other in FORMATS:
+        if other != fmt:
+            table_path(path.parent, path.stem, other).unlink(missing_ok=True)
+
+
+def table_columns(path: Path) -> List[str]:
+    """Column names of a table without loading its data."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = _require_pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(str(path)).names)
+    with pa.memory_map(str(path)) as source:
+        return list(pa.ipc.open_file(source).schema.names)
+
+
+def _coerce_ids(s: pd.Series) -> pd.Series:
+    """Integer ids as nullable Int64; anything non-numeric stays a string column."""
+    try:
+        return pd.to_numeric(s, errors="raise").astype("Int64")
+    except (ValueError, TypeError):
+        return s.astype("string")
+
+
+def apply_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Give a feedback or attachments table its canonical dtypes."""
+    if "feedback_id" in df.columns and str(df["feedback_id"].dtype) != "Int64":
+        df["feedback_id"] = _coerce_ids(df["feedback_id"])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    if "created" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["created"]):
+        df["created"] = parse_created(df["created"])
+    for col in INTEGER_COLUMNS:
+        if col in df.columns and str(df[col].dtype) != "Int64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def parse_created(raw: pd.Series) -> pd.Series:
+    """Parse API timestamps (`CREATED_FORMAT`), falling back to any other layout; unparseable values are NaT."""
+    created = pd.to_datetime(raw, format=CREATED_FORMAT, errors="coerce")
+    unparsed = created.isna() & raw.notna()
+    if unparsed.any():
+        # e.g. ISO timestamps from a table written by pandas
+        created[unparsed] = pd.to_datetime(raw[unparsed], format="mixed", errors="coerce")
+    return created
+
+
+def read_table(path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a feedback/attachments table in any supported format with canonical dtypes."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        # keep ids such as "0012" intact
+        df = pd.read_csv(path, usecols=columns, dtype={c: "string" for c in STRING_COLUMNS})
+    elif fmt == "parquet":
+        _require_pyarrow()
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        _require_pyarrow()
+        df = pd.read_feather(path, columns=columns)
+    return apply_dtypes(df)
+
+
+def write_table(df: pd.DataFrame, path: Path) -> None:
+    """Write a table in the format given by the suffix of `path`."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+    _require_pyarrow()
+    df = apply_dtypes(df.copy())
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+
+
+def string_ids(df: pd.DataFrame) -> bool:
+    """True if `df` has a `feedback_id` column that `apply_dtypes` left as strings (non-numeric ids)."""
+    return "feedback_id" in df.columns and str(df["feedback_id"].dtype) != "Int64"
+
+
+def arrow_schema(columns: List[str], text_ids: bool = False) -> Any:
+    """
+    Arrow schema matching `apply_dtypes` for the given table columns. `feedback_id`
+    is int64, or a string with `text_ids` (see `string_ids`).
+    """
+    pa = _require_pyarrow()
+    types = {"feedback_id": pa.string() if text_ids else pa.int64(), "created": pa.timestamp("ns")}
+    types.update((c, pa.dictionary(pa.int32(), pa.string())) for c in CATEGORY_COLUMNS)
+    types.update((c, pa.string()) for c in STRING_COLUMNS)
+    types.update((c, pa.int64()) for c in INTEGER_COLUMNS)
+    return pa.schema([(c, types[c]) for c in columns])
+
+
+class TableSink:
+    """
+    Append-only writer for one table; rows are buffered into batches for columnar formats.
+
+    Columnar files start with int64 `feedback_id`s. The first batch with a non-numeric
+    id switches the file to string ids by rewriting what was written so far, so any
+    input that can be written as CSV can be written as Parquet or Arrow.
+    """
+
+    def __init__(self, path: Path, columns: List[str], batch_rows: int = 10_000) -> None:
+        self.path = path
+        self.columns = columns
+        self.fmt = table_format(path)
+        self.batch_rows = batch_rows
+        self._buffer: List[Dict[str, Any]] = []
+        if self.fmt == "csv":
+            self._file = open(path, "w", encoding="utf-8", newline="")
+            self._csv = csv.DictWriter(self._file, fieldnames=columns)
+            self._csv.writeheader()
+        else:
+            self._text_ids = False
+            self._open_writer()
+
+    def _open_writer(self) -> None:
+        pa = _require_pyarrow()
+        self._schema = arrow_schema(self.columns, text_ids=self._text_ids)
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(str(self.path), self._schema)
+        else:
+            self._writer = pa.ipc.new_file(str(self.path), self._schema)
+
+    def _switch_to_text_ids(self) -> None:
+        """Rewrite the batches written so far with string `feedback_id`s (rare: non-numeric ids)."""
+        pa = _require_pyarrow()
+        self._writer.close()
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            written = pq.read_table(str(self.path))
+        else:
+            # copied into memory, not mapped: the file is truncated next
+            with pa.OSFile(str(self.path)) as source:
+                written = pa.ipc.open_file(source).read_all()
+        self._text_ids = True
+        self._open_writer()
+        self._writer.write_table(written.cast(self._schema))
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        pa = _require_pyarrow()
+        df = apply_dtypes(pd.DataFrame(self._buffer, columns=self.columns))
+        if string_ids(df) and not self._text_ids:
+            self._switch_to_text_ids()
+        if self._text_ids and "feedback_id" in df.columns:
+            df["feedback_id"] = df["feedback_id"].astype("string")
+        batch = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._writer.write_table(batch)
+        self._buffer = []
+
+    def close(self) -> None:
+        if self.fmt == "csv":
+            self._file.close()
+            return
+        self._flush()
+        self._writer.close()
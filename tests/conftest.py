@@ -0,0 +1,115 @@
+"""
+Shared fixtures: a local stub HTTP server standing in for the EC API.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# A route receives the parsed query (single values) and the request headers,
+# and returns (status, headers, body)
+Route = Callable[[Dict[str, str], Dict[str, str]], Tuple[int, Dict[str, str], bytes]]
+
+
+class StubServer:
+    def __init__(self) -> None:
+        self.routes: Dict[str, Route] = {}
+        self.requests: list[Tuple[str, Dict[str, str]]] = []
+        self.request_headers: list[Dict[str, str]] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self) -> None:  # noqa: N802
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                request_headers = dict(self.headers.items())
+                with stub._lock:
+                    stub.requests.append((parsed.path, query))
+                    stub.request_headers.append(request_headers)
+                route = stub.routes.get(parsed.path)
+                if route is None:
+                    status, headers, body = 404, {}, b"not found"
+                else:
+                    status, headers, body = route(query, request_headers)
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def json_route(self, path: str, fn: Callable[[Dict[str, str]], Any]) -> None:
+        def route(query: Dict[str, str], headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+            return 200, {"Content-Type": "application/json"}, json.dumps(fn(query)).encode("utf-8")
+
+        self.routes[path] = route
+
+
+def feedback_pages(n_items: int, page_size: int, legacy: bool = False) -> Callable[[Dict[str, str]], Any]:
+    """
+    Build a paged `allFeedback` responder serving `n_items` synthetic rows with ids
+    1..n_items in submission order (newest first when a `sort` is requested).
+    """
+    total_pages = -(-n_items // page_size)
+
+    def item(i: int) -> Dict[str, Any]:
+        return {
+            "id": i + 1,
+            "userType": "NGO" if i % 2 else "COMPANY",
+            "country": "BEL",
+            "createdDate": f"2024/01/{1 + i // 10:02d} 10:{i % 60:02d}:00",
+            "attachments": [{"documentId": f"d{i}", "fileName": f"f{i}.pdf"}] if i % 3 == 0 else [],
+        }
+
+    def respond(query: Dict[str, str]) -> Any:
+        page = int(query.get("page", 0))
+        order = range(n_items - 1, -1, -1) if query.get("sort") else range(n_items)
+        items = [item(i) for i in list(order)[page * page_size:(page + 1) * page_size]]
+        if legacy:
+            page_meta = {"size": page_size, "totalPages": total_pages, "number": page}
+            return {"_embedded": {"feedback": items}, "page": page_meta}
+        return {"content": items, "totalPages": total_pages, "totalElements": n_items, "number": page}
+
+    return respond
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server._thread.start()
+    try:
+        yield server
+    finally:
+        server.httpd.shutdown()
+        server.httpd.server_close()
+
+
+@pytest.fixture
+def feedback_endpoint(stub_server, monkeypatch):
+    """Stub server with `api.FEEDBACK_ENDPOINT` pointed at its `/api/allFeedback` route."""
+    from haveyoursay_analysis import api
+
+    monkeypatch.setattr(api, "FEEDBACK_ENDPOINT", f"{stub_server.url}/api/allFeedback")
+    return stub_server
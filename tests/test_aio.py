@@ -0,0 +1,135 @@
+"""
+Offline tests for the async API against a local stub server.
+"""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from haveyoursay_analysis import aio, api, files  # noqa: E402
+
+from .conftest import feedback_pages  # noqa: E402
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_afetch_feedback_matches_sync_normalization(feedback_endpoint, concurrency):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(95, 10))
+
+    rows = asyncio.run(aio.afetch_feedback(1, page_size=10, concurrency=concurrency))
+
+    assert [r["id"] for r in rows] == list(range(1, 96))
+    assert api.extract_feedback_and_attachments(rows) == api.extract_feedback_and_attachments(
+        api.fetch_feedback(1, page_size=10)
+    )
+
+
+def test_many_publications_share_one_client(feedback_endpoint):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(30, 10))
+
+    async def main():
+        async with aio.async_client(pool_size=4) as client:
+            return await asyncio.gather(*(aio.afetch_feedback(pid, page_size=10, client=client) for pid in range(8)))
+
+    results = asyncio.run(main())
+
+    assert [len(rows) for rows in results] == [30] * 8
+    assert sorted({q["publicationId"] for _, q in feedback_endpoint.requests}) == [str(i) for i in range(8)]
+
+
+def test_leaving_page_iterator_early_cancels_pending_pages(feedback_endpoint):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(200, 10))
+
+    async def main():
+        pages = aio.aiter_feedback_pages(1, page_size=10, concurrency=2)
+        async for items in pages:
+            break
+        await pages.aclose()
+        return items
+
+    assert [r["id"] for r in asyncio.run(main())] == list(range(1, 11))
+    # page 0 plus at most the 2 * concurrency window
+    assert len(feedback_endpoint.requests) <= 5
+
+
+def test_adownload_attachments_and_cancellation(stub_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(files, "DOCUMENT_URL_TEMPLATE", f"{stub_server.url}/api/document/{{document_id}}")
+    release = threading.Event()
+
+    def fast(query, headers):
+        return 200, {"Content-Type": "application/pdf"}, b"%PDF fast"
+
+    def slow(query, headers):
+        release.wait(5)
+        return 200, {"Content-Type": "application/pdf"}, b"%PDF slow"
+
+    stub_server.routes["/api/document/a"] = fast
+    stub_server.routes["/api/document/b"] = fast
+    stub_server.routes["/api/document/slow"] = slow
+    rows = [{"document_id": "a", "file_name": "x.pdf"}, {"document_id": "b", "file_name": "x.pdf"}]
+
+    result = asyncio.run(aio.adownload_attachments(rows, tmp_path, workers=2))
+
+    assert (result.downloaded, result.failed) == (2, 0)
+    assert sorted(p.name for p in tmp_path.glob("*.pdf")) == ["x.pdf", "x_b.pdf"]
+
+    async def cancelled():
+        task = asyncio.ensure_future(aio.adownload_attachments([{"document_id": "slow"}], tmp_path / "c"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled())
+    release.set()
+    assert not (tmp_path / "c" / "slow").exists()
+
+
+def test_cancelled_download_is_recorded_partial_and_resumed(tmp_path):
+    import httpx
+
+    from haveyoursay_analysis.manifest import PARTIAL, DownloadManifest
+
+    body = b"%PDF" + bytes(range(256)) * 1024
+    half = len(body) // 2
+    sent = asyncio.Event()
+    ranges = []
+
+    async def stalled():
+        yield body[:half]
+        sent.set()
+        await asyncio.Event().wait()
+
+    def handler(request):
+        rng = request.headers.get("Range")
+        ranges.append(rng)
+        if rng and request.headers.get("If-Range") == '"v1"':
+            start = int(rng.split("=")[1].rstrip("-"))
+            return httpx.Response(206, headers={"ETag": '"v1"'}, content=body[start:])
+        if len(ranges) == 1:
+            return httpx.Response(200, headers={"ETag": '"v1"'}, content=stalled())
+        return httpx.Response(200, headers={"ETag": '"v1"'}, content=body)
+
+    rows = [{"document_id": "d", "file_name": "d.pdf"}]
+    manifest = DownloadManifest(tmp_path / "m.sqlite")
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            task = asyncio.ensure_future(aio.adownload_attachments(rows, tmp_path, manifest=manifest, client=client))
+            await sent.wait()
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            entry = manifest.get("d")
+            assert (entry["status"], entry["etag"]) == (PARTIAL, '"v1"')
+            return await aio.adownload_attachments(rows, tmp_path, manifest=manifest, client=client)
+
+    result = asyncio.run(main())
+    manifest.close()
+
+    assert result.downloaded == 1
+    # resumed after the whole chunks written before the cancel
+    assert ranges == [None, f"bytes={half // files.CHUNK_SIZE * files.CHUNK_SIZE}-"]
+    assert (tmp_path / "d.pdf").read_bytes() == body
@@ -0,0 +1,43 @@
+"""
+Offline tests for the API client against a local stub server.
+"""
+import pytest
+
+from haveyoursay_analysis import api
+
+from .conftest import feedback_pages
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+@pytest.mark.parametrize("legacy", [False, True])
+def test_fetch_feedback_returns_items_in_page_order(feedback_endpoint, concurrency, legacy):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(95, 10, legacy=legacy))
+
+    rows = api.fetch_feedback(1, page_size=10, concurrency=concurrency)
+
+    assert [r["id"] for r in rows] == list(range(1, 96))
+
+
+def test_fetch_feedback_parallel_respects_max_pages(feedback_endpoint):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(95, 10))
+
+    rows = api.fetch_feedback(1, page_size=10, max_pages=3, concurrency=4)
+
+    assert [r["id"] for r in rows] == list(range(1, 31))
+    assert sorted(int(q["page"]) for _, q in feedback_endpoint.requests) == [0, 1, 2]
+
+
+def test_fetch_feedback_reuses_pooled_connections(feedback_endpoint):
+    from haveyoursay_analysis import client
+
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(50, 10))
+    client.configure_session(pool_maxsize=2)
+    try:
+        session = client.get_session()
+        api.fetch_feedback(1, page_size=10, concurrency=2)
+        assert client.get_session() is session
+        # five pages over keep-alive connections, at most one per pool slot
+        assert len(feedback_endpoint.requests) == 5
+        assert feedback_endpoint.connections <= 2
+    finally:
+        client.close_session()
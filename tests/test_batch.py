@@ -0,0 +1,49 @@
+"""
+Tests for the multi-publication batch fetch and the shared rate limiter.
+"""
+import json
+import time
+
+import pandas as pd
+
+from haveyoursay_analysis import client
+from haveyoursay_analysis.batch import fetch_batch, read_publication_ids
+from haveyoursay_analysis.ratelimit import TokenBucket
+
+from .conftest import feedback_pages
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_fetch_batch_writes_each_publication(feedback_endpoint, tmp_path):
+    sizes = {1: 25, 2: 7}
+    respond = {pid: feedback_pages(n, 10) for pid, n in sizes.items()}
+
+    def route(query, headers):
+        pid = int(query["publicationId"])
+        if pid not in respond:
+            return 404, {}, b"unknown publication"
+        return 200, {"Content-Type": "application/json"}, json.dumps(respond[pid](query)).encode()
+
+    feedback_endpoint.routes["/api/allFeedback"] = route
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("1  # first\n2\n3\n")
+
+    client.configure_rate_limit(1000)
+    try:
+        results = fetch_batch(read_publication_ids(ids_file), tmp_path / "out", page_size=10)
+    finally:
+        client.configure_rate_limit(None)
+
+    assert [(r["publication_id"], r["status"]) for r in results] == [(1, "ok"), (2, "ok"), (3, "failed")]
+    # a 404 is fatal: the unknown publication is asked for once, not retried
+    assert sum(q["publicationId"] == "3" for _, q in feedback_endpoint.requests) == 1
+    for pid, n in sizes.items():
+        assert len(pd.read_csv(tmp_path / "out" / str(pid) / "feedback.csv")) == n
+    assert len(pd.read_csv(tmp_path / "out" / "batch_summary.csv")) == 3
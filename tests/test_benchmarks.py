@@ -0,0 +1,37 @@
+"""
+Keep the benchmark harness runnable: tiny sizes against the mock server.
+"""
+import json
+
+from benchmarks.mock_server import MockConfig, MockServer
+from benchmarks.run import BENCHMARKS, main
+from haveyoursay_analysis import api, client
+
+
+def test_mock_server_legacy_pages_and_injected_errors(monkeypatch):
+    config = MockConfig(n_items=250, legacy=True, error_rate=0.2, seed=1)
+    with MockServer(config) as server:
+        monkeypatch.setattr(api, "FEEDBACK_ENDPOINT", f"{server.url}/api/allFeedback")
+        try:
+            items = api.fetch_feedback(1, page_size=100, concurrency=2)
+        finally:
+            client.configure_retry(None)
+    assert [i["id"] for i in items] == list(range(1, 251))
+    assert server.stats["errors"] > 0
+    assert server.stats["requests"] == 3 + server.stats["errors"]
+
+
+def test_benchmark_run_writes_results_and_flags_regressions(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    assert main(["--sizes", "30", "--repeat", "1", "--out", str(out), "--document-size", "64"]) == 0
+    report = json.loads(out.read_text())
+    assert [r["benchmark"] for r in report["results"]] == list(BENCHMARKS)
+    assert all(r["rows"] == 30 and r["median_s"] > 0 for r in report["results"])
+
+    for r in report["results"]:
+        r["median_s"] /= 100
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+    argv = ["--sizes", "30", "--repeat", "1", "--only", "compare_phases", "--out", str(tmp_path / "again.json")]
+    assert main(argv + ["--baseline", str(baseline)]) == 1
+    assert "regression" in capsys.readouterr().err
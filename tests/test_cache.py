@@ -0,0 +1,108 @@
+"""
+Tests for the on-disk HTTP response cache.
+"""
+import pytest
+
+from haveyoursay_analysis import api, client, files
+from haveyoursay_analysis.cache import OfflineCacheMiss, ResponseCache, cache_key
+
+from .conftest import feedback_pages
+
+
+@pytest.fixture
+def cache_factory(tmp_path):
+    def make(**kwargs):
+        cache = ResponseCache(tmp_path / "cache", **kwargs)
+        client.configure_cache(cache)
+        return cache
+
+    yield make
+    client.configure_cache(None)
+
+
+def test_offline_rerun_hits_network_zero_times(feedback_endpoint, cache_factory):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(25, 10))
+    cache_factory()
+    online = api.fetch_feedback(1, page_size=10)
+
+    feedback_endpoint.requests.clear()
+    cache_factory(offline=True)
+    offline = api.fetch_feedback(1, page_size=10)
+
+    assert offline == online
+    assert feedback_endpoint.requests == []
+    with pytest.raises(OfflineCacheMiss):
+        api.fetch_feedback(2, page_size=10)
+
+
+def test_stale_entries_are_revalidated_with_etag(stub_server, cache_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(files, "DOCUMENT_URL_TEMPLATE", f"{stub_server.url}/api/document/{{document_id}}")
+    body = b"%PDF" * 50000
+
+    def route(query, headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"', "Content-Type": "application/pdf"}, body
+
+    stub_server.routes["/api/document/d1"] = route
+    cache_factory(ttl=0)
+    rows = [{"document_id": "d1", "file_name": "a.pdf"}]
+
+    files.download_attachments(rows, tmp_path / "run1")
+    files.download_attachments(rows, tmp_path / "run2")
+
+    assert (tmp_path / "run2" / "a.pdf").read_bytes() == body
+    assert [h.get("If-None-Match") for h in stub_server.request_headers] == [None, '"v1"']
+
+
+def test_lru_eviction_keeps_cache_under_max_bytes(stub_server, cache_factory):
+    for i in range(3):
+        stub_server.routes[f"/doc/{i}"] = lambda q, h, i=i: (200, {}, bytes([i]) * 1000)
+    cache = cache_factory(max_bytes=2500)
+
+    for i in range(3):
+        client.http_get(f"{stub_server.url}/doc/{i}").content
+
+    assert cache.total_bytes() <= 2500
+    assert cache.lookup(cache_key(f"{stub_server.url}/doc/0")) is None
+    assert cache.lookup(cache_key(f"{stub_server.url}/doc/2")) is not None
+
+
+def test_body_larger_than_max_bytes_is_served_but_not_kept(stub_server, cache_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(files, "DOCUMENT_URL_TEMPLATE", f"{stub_server.url}/api/document/{{document_id}}")
+    body = b"%PDF" * 1250
+    stub_server.routes["/api/document/big"] = lambda q, h: (200, {}, body)
+    stub_server.routes["/small"] = lambda q, h: (200, {}, b"x" * 500)
+    cache = cache_factory(max_bytes=1000)
+    client.http_get(f"{stub_server.url}/small").content
+
+    result = files.download_attachments([{"document_id": "big", "file_name": "big.pdf"}], tmp_path / "out")
+
+    assert (result.downloaded, result.failures) == (1, [])
+    assert (tmp_path / "out" / "big.pdf").read_bytes() == body
+    assert cache.lookup(cache_key(f"{stub_server.url}/api/document/big")) is None
+    # the oversized body evicted nothing, and left no blob behind
+    assert cache.lookup(cache_key(f"{stub_server.url}/small")) is not None
+    assert sum(1 for p in (tmp_path / "cache" / "blobs").rglob("*") if p.is_file()) == 1
+
+
+
+@pytest.mark.filterwarnings("error::ResourceWarning")
+def test_streamed_hits_close_their_blob(stub_server, cache_factory):
+    import gc
+
+    stub_server.routes["/doc"] = lambda q, h: (200, {}, b"%PDF" * 1000)
+    cache_factory(ttl=3600)
+    url = f"{stub_server.url}/doc"
+    client.http_get(url).content
+
+    with client.http_get(url, stream=True) as resp:
+        assert b"".join(resp.iter_content(1024)) == b"%PDF" * 1000
+    assert resp.raw.closed
+
+    # closed without reading the body
+    with client.http_get(url, stream=True) as resp:
+        pass
+    assert resp.raw.closed
+    del resp
+    gc.collect()
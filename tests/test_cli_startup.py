@@ -0,0 +1,34 @@
+"""
+Keep CLI startup cheap: building the command line and printing help must not
+import pandas, requests or the command modules.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ["pandas", "numpy", "requests", "tqdm", "httpx", "haveyoursay_analysis.api", "haveyoursay_analysis.files"]
+
+PROBE = """
+import json, sys
+from haveyoursay_analysis.cli import app
+args = sys.argv[1:]
+if args:
+    try:
+        app(args)
+    except SystemExit:
+        pass
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)), file=sys.__stderr__)
+"""
+
+
+def _loaded(*args):
+    code = PROBE.format(heavy=HEAVY)
+    proc = subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True, check=True)
+    return json.loads(proc.stderr.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("args", [(), ("--help",), ("fetch", "--help"), ("search", "--help")])
+def test_cli_import_and_help_skip_heavy_modules(args):
+    assert _loaded(*args) == []
@@ -0,0 +1,73 @@
+"""
+Tests for phase comparison.
+"""
+import pandas as pd
+
+from haveyoursay_analysis.compare import compare_attachments, compare_phases, generate_report
+
+
+def _write(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def test_compare_and_report(tmp_path):
+    fb1 = _write(tmp_path / "fb1.csv", [
+        {"feedback_id": i, "userType": "NGO" if i % 2 else "COMPANY"} for i in range(1, 6)
+    ])
+    fb2 = _write(tmp_path / "fb2.csv", [
+        {"feedback_id": i, "userType": "NGO"} for i in range(3, 9)
+    ])  # 4 changed COMPANY -> NGO
+    at1 = _write(tmp_path / "at1.csv", [
+        {"feedback_id": 1, "document_id": "a"},
+        {"feedback_id": 3, "document_id": "b"},
+        {"feedback_id": 4, "document_id": "c"},
+    ])
+    at2 = _write(tmp_path / "at2.csv", [
+        {"feedback_id": 3, "document_id": "b"},
+        {"feedback_id": 3, "document_id": "b2"},
+        {"feedback_id": 4, "document_id": "c"},
+        {"feedback_id": 7, "document_id": "d"},
+    ])
+
+    f_comp = compare_phases(fb1, fb2, label_1="P1", label_2="P2")
+    a_comp = compare_attachments(at1, at2, label_1="P1", label_2="P2")
+
+    assert f_comp["only_in_1"]["ids"].tolist() == [1, 2]
+    assert f_comp["only_in_2"]["ids"].tolist() == [6, 7, 8]
+    assert f_comp["common"]["count"] == 3
+    assert f_comp["user_types_2"] == {"NGO": 6}
+    assert f_comp["common"]["changed"] == 1
+    assert f_comp["field_changes"].to_dict("records") == [
+        {"feedback_id": 4, "field": "userType", "before": "COMPANY", "after": "NGO"}
+    ]
+    assert a_comp["only_in_1"]["attachment_count"] == 1
+    assert a_comp["only_in_2"]["ids"].tolist() == [7]
+    changes = a_comp["attachment_changes"]["details"]
+    assert changes.to_dict("index") == {3: {"before": 1, "after": 2}}
+
+    report = generate_report(f_comp, a_comp, output_csv=tmp_path / "report.csv")
+    assert "  3: 1 → 2" in report
+    assert "  4 userType: COMPANY → NGO" in report
+    assert len(pd.read_csv(tmp_path / "report.csv")) == 5
+
+
+def test_diff_fields_across_formats_and_missing_values():
+    from haveyoursay_analysis.compare import diff_fields
+    from haveyoursay_analysis.storage import apply_dtypes
+
+    base = pd.DataFrame({
+        "feedback_id": [1, 2, 3],
+        "author": ["A", None, "C"],
+        "country": ["BEL", "DEU", "FRA"],
+        "created": ["2024/01/01 10:00:00"] * 3,
+    })
+    df1 = apply_dtypes(base.copy()).set_index("feedback_id")
+    changed = base.copy()
+    changed.loc[2, "country"] = "ITA"
+    df2 = apply_dtypes(changed).set_index("feedback_id")
+    df2["country"] = df2["country"].astype("string")  # a different dtype must not count as a change
+
+    out = diff_fields(df1, df2)
+
+    assert out[["feedback_id", "field", "before", "after"]].values.tolist() == [[3, "country", "FRA", "ITA"]]
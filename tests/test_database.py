@@ -0,0 +1,87 @@
+"""
+Tests for the analytical SQLite database, `fetch --db`, `ingest` and `query`.
+"""
+import pytest
+from typer.testing import CliRunner
+
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.database import FeedbackDatabase
+from haveyoursay_analysis.snapshot import write_snapshot
+from haveyoursay_analysis.storage import read_table
+
+from .conftest import feedback_pages
+
+ROWS = [
+    {"id": 1, "userType": "NGO", "country": "BEL", "createdDate": "2024/01/02 10:00:00", "companySize": "SMALL",
+     "attachments": [{"documentId": "a", "fileName": "a.pdf", "pages": 4}]},
+    {"id": 2, "userType": "COMPANY", "country": "DEU", "createdDate": "2024/01/02 11:30:00"},
+    {"id": 3, "userType": "NGO", "country": "DEU", "createdDate": "2024/02/10 09:00:00"},
+]
+
+
+def test_snapshots_are_upserted_and_counted(tmp_path):
+    write_snapshot([ROWS[:2]], tmp_path / "s1")
+    changed = {**ROWS[1], "userType": "NGO"}
+    write_snapshot([[ROWS[0], changed, ROWS[2]]], tmp_path / "s2")
+
+    with FeedbackDatabase(tmp_path / "hys.sqlite") as db:
+        first = db.load_snapshot(tmp_path / "s1", 7)
+        second = db.load_snapshot(tmp_path / "s2", 7)
+        db.load_snapshot(tmp_path / "s1", 8)
+
+        assert (first["new"], second["new"]) == (2, 1)
+        assert db.counts(["publication_id"]).values.tolist() == [[7, 3], [8, 2]]
+        by_type = db.counts(["userType"], publication_ids=[7])
+        assert dict(by_type.values.tolist()) == {"NGO": 3}
+        assert db.counts(["month"], until="2024-01").values.tolist() == [["2024-01", 4]]
+        assert db.counts(["day"], since="2024-02-01").values.tolist() == [["2024-02-10", 1]]
+
+        rows = db.query(
+            "SELECT feedback_id, companySize, first_snapshot, last_snapshot FROM feedback "
+            "WHERE publication_id = 7 ORDER BY feedback_id"
+        )
+        assert rows["companySize"].tolist()[:1] == ["SMALL"]
+        assert rows["companySize"].isna().tolist() == [False, True, True]
+        assert rows[["first_snapshot", "last_snapshot"]].values.tolist() == [[1, 2], [1, 2], [2, 2]]
+        assert db.query("SELECT pages FROM attachments WHERE document_id = 'a'").values.tolist() == [[4]] * 2
+        assert db.publications()["snapshots"].tolist() == [2, 1]
+
+
+def test_query_is_read_only_and_checks_dimensions(tmp_path):
+    with FeedbackDatabase(tmp_path / "hys.sqlite") as db:
+        with pytest.raises(ValueError, match="Query failed"):
+            db.query("DELETE FROM feedback")
+        with pytest.raises(ValueError, match="Unknown dimension"):
+            db.counts(["colour"])
+
+        write_snapshot([ROWS], tmp_path)
+        loaded = db.load_tables(1, read_table(tmp_path / "feedback.csv"), read_table(tmp_path / "attachments.csv"))
+        assert (loaded["feedback"], loaded["attachments"]) == (3, 1)
+        assert db.counts([]).values.tolist() == [[3]]
+
+
+def test_fetch_db_ingest_and_query_commands(feedback_endpoint, tmp_path):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(25, 10))
+    db = tmp_path / "hys.sqlite"
+    runner = CliRunner()
+
+    fetch = ["fetch", "--publication-id", "5", "--out", str(tmp_path / "5"), "--page-size", "10", "--db", str(db)]
+    result = runner.invoke(app, fetch)
+    assert result.exit_code == 0, result.output
+    assert "25 feedback (25 new)" in result.output
+
+    result = runner.invoke(app, ["ingest", "--db", str(db), "--snapshot", str(tmp_path / "5")])
+    assert result.exit_code == 0, result.output
+    assert "(0 new)" in result.output
+
+    out = tmp_path / "counts.csv"
+    result = runner.invoke(app, ["query", "--db", str(db), "--by", "userType", "--out", str(out)])
+    assert result.exit_code == 0, result.output
+    assert out.read_text().splitlines() == ["userType,count", "COMPANY,13", "NGO,12"]
+
+    result = runner.invoke(app, ["query", "--db", str(db), "--sql", "SELECT count(*) AS n FROM attachments"])
+    assert result.exit_code == 0, result.output
+    assert result.output.split() == ["n", "9"]
+
+    result = runner.invoke(app, ["query", "--db", str(tmp_path / "missing.sqlite")])
+    assert result.exit_code != 0
@@ -0,0 +1,80 @@
+"""
+Tests for near-duplicate and campaign detection.
+"""
+from typer.testing import CliRunner
+
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.dedup import MinHasher, SignatureStore, add_snapshot, detect_duplicates, group_sizes
+from haveyoursay_analysis.extract import TextStore
+from haveyoursay_analysis.manifest import DONE, FAILED
+from haveyoursay_analysis.snapshot import write_snapshot
+
+CAMPAIGN = (
+    "As a concerned citizen I urge the Commission to withdraw this proposal because it puts "
+    "small family farms at risk and ignores the evidence gathered by independent researchers"
+)
+
+
+def _rows(ids):
+    rows = []
+    for fid in ids:
+        if fid <= 4:
+            text = CAMPAIGN.replace("citizen", "citizen " + "really " * (fid % 2))
+            user_type = "EU_CITIZEN"
+        else:
+            text = f"Submission {fid} has its own reasoning about topic number {fid} and nothing else in common"
+            user_type = "COMPANY"
+        attachments = [{"documentId": f"doc{fid}", "fileName": f"doc{fid}.pdf"}] if fid in (5, 6) else []
+        rows.append({"id": fid, "userType": user_type, "feedback": text, "attachments": attachments})
+    return rows
+
+
+def test_signatures_are_batch_independent():
+    texts = [CAMPAIGN, "too short", "one two three four five six seven"]
+    batched = MinHasher(chunk=16).signatures(texts)
+    assert batched[1] is None
+    assert (batched[0] == MinHasher().signature(CAMPAIGN)).all()
+    assert (batched[2] == MinHasher().signature(texts[2])).all()
+
+
+def test_clusters_near_duplicates_and_identical_files(tmp_path):
+    write_snapshot([_rows(range(1, 8))], tmp_path / "snap1")
+    with TextStore(tmp_path / "text.sqlite") as store:
+        # the same scanned PDF under two feedback: no text, identical bytes
+        store.record("doc5", FAILED, sha256="ab" * 32, error="no text")
+        store.record("doc6", DONE, sha256="ab" * 32, text="x")
+
+    with SignatureStore(tmp_path / "sigs.sqlite") as sigs:
+        add_snapshot(sigs, tmp_path / "snap1", text_store=tmp_path / "text.sqlite")
+        clusters = detect_duplicates(sigs).set_index("feedback_id")
+
+        assert set(clusters.loc[[1, 2, 3, 4], "cluster_id"]) == {1}
+        assert clusters.loc[[5, 6], "cluster_id"].tolist() == [5, 5]
+        assert clusters.loc[7, "cluster_size"] == 1
+
+        groups = group_sizes(clusters.reset_index())
+        assert groups.loc[1].to_dict() == {"size": 4, "COMPANY": 0, "EU_CITIZEN": 4}
+
+        # a later snapshot joins the existing campaign without re-signing the rest
+        late = {"id": 8, "userType": "NGO", "feedback": CAMPAIGN.replace("urge", "strongly urge"), "attachments": []}
+        write_snapshot([[late]], tmp_path / "snap2")
+        stats = add_snapshot(sigs, tmp_path / "snap2")
+        assert stats.added == 1
+        joined = detect_duplicates(sigs).set_index("feedback_id")
+        assert joined.loc[8, "cluster_id"] == 1
+        assert set(joined.loc[[1, 2, 3, 4, 8], "cluster_size"]) == {5}
+
+        write_snapshot([_rows(range(1, 8))], tmp_path / "snap3")
+        assert add_snapshot(sigs, tmp_path / "snap3").unchanged == 7
+
+
+def test_duplicates_command(tmp_path):
+    write_snapshot([_rows(range(1, 8))], tmp_path / "snap")
+    out = tmp_path / "clusters.csv"
+
+    args = ["duplicates", "--snapshot", str(tmp_path / "snap"), "--store", str(tmp_path / "sigs.sqlite")]
+    result = CliRunner().invoke(app, args + ["--out", str(out)])
+
+    assert result.exit_code == 0, result.output
+    assert "1 clusters of >= 2 covering 4 of 7 feedback" in result.output
+    assert out.exists()
@@ -0,0 +1,133 @@
+"""
+Tests for attachment text extraction.
+"""
+import os
+
+from typer.testing import CliRunner
+
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.extract import TextStore, extract_attachments, find_documents
+from haveyoursay_analysis.manifest import DONE, FAILED
+
+
+def _pdf(text: str) -> bytes:
+    """A minimal single-page PDF showing `text`."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _files(tmp_path):
+    import docx
+
+    files = tmp_path / "files"
+    (files / "NGO").mkdir(parents=True)
+    (files / "NGO" / "d1.pdf").write_bytes(_pdf("Hello from a PDF"))
+    document = docx.Document()
+    document.add_paragraph("Hello from a DOCX")
+    document.save(str(files / "d2.docx"))
+    (files / "d3.pdf").write_bytes(b"not really a pdf")
+    (files / "notes.txt").write_text("ignored")
+    return files
+
+
+def test_extract_is_incremental(tmp_path):
+    files = _files(tmp_path)
+    docs = find_documents(files)
+    assert sorted(doc_id for doc_id, _ in docs) == ["d1", "d2", "d3"]
+
+    with TextStore(tmp_path / "text.sqlite") as store:
+        result = extract_attachments(docs, store, workers=2)
+        assert (result.extracted, result.failed) == (2, 1)
+        assert "Hello from a PDF" in store.get_text("d1")
+        assert store.get_text("d2").strip() == "Hello from a DOCX"
+        assert store.get("d3")["status"] == FAILED
+
+        # nothing changed: no file is re-read
+        again = extract_attachments(docs, store, workers=2)
+        assert (again.extracted, again.skipped, again.failed) == (0, 3, 0)
+
+        # touched but identical: hashed, not re-extracted
+        os.utime(files / "d2.docx", ns=(0, 0))
+        touched = extract_attachments(docs, store, workers=2)
+        assert (touched.extracted, touched.skipped) == (0, 3)
+
+        # new content and a fixed document are extracted again
+        (files / "NGO" / "d1.pdf").write_bytes(_pdf("Second version"))
+        (files / "d3.pdf").write_bytes(_pdf("Repaired"))
+        changed = extract_attachments(docs, store, workers=2, retry_failed=True)
+        assert changed.extracted == 2
+        assert "Second version" in store.get_text("d1")
+        assert store.get("d3")["status"] == DONE
+
+
+def test_extract_command_maps_file_names(tmp_path):
+    files = _files(tmp_path)
+    table = tmp_path / "attachments.csv"
+    table.write_text("feedback_id,document_id,file_name\n1,090001,d1.pdf\n2,090002,d2.docx\n")
+
+    result = CliRunner().invoke(
+        app, ["extract", "--files-dir", str(files), "--attachments-csv", str(table), "--workers", "1"]
+    )
+
+    assert result.exit_code == 0, result.output
+    with TextStore(files / "attachment_text.sqlite") as store:
+        assert sorted(doc_id for doc_id, _ in store.texts()) == ["090001", "090002"]
+
+
+def test_alarm_firing_as_the_job_finishes_is_a_failed_record(tmp_path, monkeypatch):
+    import signal
+
+    from haveyoursay_analysis import extract
+
+    path = tmp_path / "d1.pdf"
+    path.write_bytes(_pdf("Hello"))
+    setitimer = signal.setitimer
+
+    def late_alarm(which, seconds):
+        setitimer(which, seconds)
+        if seconds == 0:
+            # the alarm fires just before it is cancelled
+            extract._on_alarm(signal.SIGALRM, None)
+
+    monkeypatch.setattr(signal, "setitimer", late_alarm)
+    handler = signal.getsignal(signal.SIGALRM)
+
+    out = extract._extract_job(str(path), None, 5)
+
+    assert out["error"].startswith("ExtractionTimeout")
+    assert out["text"] is None
+    assert signal.getsignal(signal.SIGALRM) is handler
+
+
+def _failing_job(path, previous_sha256, timeout):
+    raise RuntimeError(f"cannot send result for {os.path.basename(path)}")
+
+
+def test_job_error_fails_only_its_document(tmp_path, monkeypatch):
+    from haveyoursay_analysis import extract
+
+    files = _files(tmp_path)
+    monkeypatch.setattr(extract, "_extract_job", _failing_job)
+
+    with TextStore(tmp_path / "text.sqlite") as store:
+        result = extract_attachments(find_documents(files), store, workers=1)
+
+    assert result.failed == 3
+    assert result.failures[0]["error"].startswith("RuntimeError: cannot send result")
@@ -0,0 +1,187 @@
+"""
+Offline tests for attachment downloads against a local stub server.
+"""
+import pandas as pd
+import pytest
+
+from haveyoursay_analysis import files
+
+
+@pytest.fixture
+def document_endpoint(stub_server, monkeypatch):
+    monkeypatch.setattr(files, "DOCUMENT_URL_TEMPLATE", f"{stub_server.url}/api/document/{{document_id}}")
+    return stub_server
+
+
+def _document_route(server, doc_id, body, status=200, etag=None):
+    def route(query, headers):
+        out_headers = {"Content-Type": "application/pdf"}
+        if etag:
+            out_headers["ETag"] = etag
+        rng = headers.get("Range")
+        if rng and headers.get("If-Range") == etag:
+            start = int(rng.split("=")[1].rstrip("-"))
+            out_headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return 206, out_headers, body[start:]
+        return status, out_headers, body
+
+    server.routes[f"/api/document/{doc_id}"] = route
+
+
+def test_download_attachments_streams_files_in_parallel(document_endpoint, tmp_path):
+    rows = []
+    for i in range(6):
+        _document_route(document_endpoint, f"d{i}", bytes([i]) * (files.CHUNK_SIZE * 2 + i))
+        rows.append({"feedback_id": "1", "document_id": f"d{i}", "file_name": f"f{i}.pdf", "userType": "NGO"})
+    csv_path = tmp_path / "attachments.csv"
+    pd.DataFrame(rows).to_csv(csv_path, index=False)
+    out = tmp_path / "files"
+
+    downloaded, failed = files.download_attachments_from_csv(csv_path, out, workers=3)
+
+    assert (downloaded, failed) == (6, 0)
+    assert (out / "f5.pdf").read_bytes() == bytes([5]) * (files.CHUNK_SIZE * 2 + 5)
+    assert sorted(p.name for p in out.glob("*.pdf")) == [f"f{i}.pdf" for i in range(6)]
+
+
+def test_download_attachments_records_failure_cause(document_endpoint, tmp_path):
+    _document_route(document_endpoint, "ok", b"ok")
+    rows = [
+        {"document_id": "ok", "file_name": "ok.pdf"},
+        {"document_id": "", "file_name": "nothing.pdf"},
+    ]
+
+    result = files.download_attachments(rows, tmp_path, workers=2)
+
+    assert result.downloaded == 1
+    assert [f["error"] for f in result.failures] == ["missing document_id"]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_download_manifest_skips_verified_and_resumes_partial(document_endpoint, tmp_path):
+    import hashlib
+
+    from haveyoursay_analysis.manifest import DONE, PARTIAL, DownloadManifest
+
+    body = b"%PDF" + bytes(range(256)) * 100
+    _document_route(document_endpoint, "big", body, etag='"v1"')
+    _document_route(document_endpoint, "small", b"small", etag='"s1"')
+    rows = [{"document_id": "big", "file_name": "big.pdf"}, {"document_id": "small", "file_name": "small.pdf"}]
+
+    # a previous run finished `small` and was killed halfway through `big`
+    with DownloadManifest(tmp_path / "m.sqlite") as manifest:
+        files.download_attachments(rows[1:], tmp_path, manifest=manifest)
+        (tmp_path / ".big.pdf.part").write_bytes(body[:1000])
+        manifest.record("big", PARTIAL, file_name="big.pdf", etag='"v1"')
+        document_endpoint.request_headers.clear()
+
+        result = files.download_attachments(rows, tmp_path, manifest=manifest)
+
+        assert (result.downloaded, result.skipped) == (1, 1)
+        assert [h.get("Range") for h in document_endpoint.request_headers] == ["bytes=1000-"]
+        assert (tmp_path / "big.pdf").read_bytes() == body
+        entry = manifest.get("big")
+        assert entry["status"] == DONE
+        assert entry["sha256"] == hashlib.sha256(body).hexdigest()
+        assert entry["size"] == len(body)
+
+
+def test_download_manifest_redownloads_truncated_file(document_endpoint, tmp_path):
+    from haveyoursay_analysis.manifest import DownloadManifest
+
+    _document_route(document_endpoint, "d", b"complete body")
+    rows = [{"document_id": "d", "file_name": "d.pdf"}]
+
+    with DownloadManifest(tmp_path / "m.sqlite") as manifest:
+        files.download_attachments(rows, tmp_path, manifest=manifest)
+        (tmp_path / "d.pdf").write_bytes(b"compl")
+
+        result = files.download_attachments(rows, tmp_path, manifest=manifest)
+
+    assert result.downloaded == 1
+    assert (tmp_path / "d.pdf").read_bytes() == b"complete body"
+
+
+def test_blob_store_dedupes_and_keeps_colliding_names(document_endpoint, tmp_path):
+    from haveyoursay_analysis.blobstore import BlobStore
+    from haveyoursay_analysis.manifest import DownloadManifest
+
+    _document_route(document_endpoint, "a", b"same bytes")
+    _document_route(document_endpoint, "b", b"same bytes")
+    _document_route(document_endpoint, "c", b"other bytes")
+    rows = [
+        {"feedback_id": 1, "document_id": "a", "file_name": "letter.pdf"},
+        {"feedback_id": 2, "document_id": "b", "file_name": "letter.pdf"},
+        {"feedback_id": 3, "document_id": "c", "file_name": "c.pdf"},
+    ]
+    out = tmp_path / "files"
+    blobs = BlobStore(tmp_path / "blobs")
+
+    with DownloadManifest(tmp_path / "m.sqlite") as manifest:
+        result = files.download_attachments(rows, out, manifest=manifest, blobs=blobs)
+        assert manifest.get("b")["file_name"] == "letter_b.pdf"
+
+    assert result.downloaded == 3
+    assert sorted(p.name for p in out.glob("*.pdf")) == ["c.pdf", "letter.pdf", "letter_b.pdf"]
+    assert (out / "letter.pdf").samefile(out / "letter_b.pdf")
+    assert len([p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]) == 2
+
+
+@pytest.mark.parametrize("with_manifest", [True, False])
+def test_dedupe_directory_leaves_manifest_and_reports_alone(tmp_path, with_manifest):
+    from haveyoursay_analysis.manifest import DONE, FAILED, MANIFEST_FILENAME, DownloadManifest
+
+    out = tmp_path / "files"
+    out.mkdir()
+    (out / "a.pdf").write_bytes(b"same bytes")
+    (out / "b.pdf").write_bytes(b"same bytes")
+    (out / files.FAILURES_FILENAME).write_text("document_id,error\nc,HTTP 500\n")
+    if with_manifest:
+        manifest = DownloadManifest(out / MANIFEST_FILENAME)
+        manifest.record("a", DONE, file_name="a.pdf")
+        manifest.record("b", DONE, file_name="b.pdf")
+        manifest.record("c", FAILED, file_name="c.pdf", error="HTTP 500")
+    else:
+        (out / f"{MANIFEST_FILENAME}-wal").write_bytes(b"live wal")
+        (out / f"{MANIFEST_FILENAME}-shm").write_bytes(b"live shm")
+    others = {p.name: p.stat().st_ino for p in out.iterdir() if not p.name.endswith(".pdf")}
+
+    n, saved = files.dedupe_directory(out, tmp_path / "blobs")
+
+    assert (n, saved) == (2, len(b"same bytes"))
+    assert (out / "a.pdf").samefile(out / "b.pdf")
+    assert {p.name: p.stat().st_ino for p in out.iterdir() if not p.name.endswith(".pdf")} == others
+    assert all(p.stat().st_nlink == 1 for p in out.iterdir() if not p.name.endswith(".pdf"))
+    if with_manifest:
+        manifest.close()
+
+
+def test_organize_links_instead_of_copying(tmp_path):
+    src = tmp_path / "files"
+    src.mkdir()
+    (src / "a.pdf").write_bytes(b"a")
+    (src / "b.pdf").write_bytes(b"b")
+    pd.DataFrame(
+        {"feedback_id": [1, 2], "document_id": ["da", "db"], "file_name": ["a.pdf", "b.pdf"]}
+    ).to_csv(tmp_path / "attachments.csv", index=False)
+    pd.DataFrame({"feedback_id": [1, 2], "userType": ["NGO", "COMPANY"], "country": ["BEL", "DEU"]}).to_csv(
+        tmp_path / "feedback.csv", index=False
+    )
+
+    n = files.organize_by_user_type(src, tmp_path / "attachments.csv", tmp_path / "feedback.csv", tmp_path / "by_type")
+    assert n == 2
+    assert (tmp_path / "by_type" / "NGO" / "a.pdf").samefile(src / "a.pdf")
+
+    # only the targeted rows are visited; a missing file is skipped, not fatal
+    (src / "a.pdf").unlink()
+    n = files.organize_by_user_type(
+        src, tmp_path / "attachments.csv", tmp_path / "feedback.csv", tmp_path / "ngo", only_user_types=["NGO"]
+    )
+    assert n == 0
+    assert list((tmp_path / "ngo").iterdir()) == [tmp_path / "ngo" / "NGO"]
+
+    files.organize_by_user_type(
+        src, tmp_path / "attachments.csv", tmp_path / "feedback.csv", tmp_path / "by_country",
+        by="country", link="symlink",
+    )
+    assert (tmp_path / "by_country" / "DEU" / "b.pdf").is_symlink()
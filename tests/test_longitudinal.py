@@ -0,0 +1,51 @@
+"""
+Tests for N-way snapshot comparison.
+"""
+from typer.testing import CliRunner
+
+from haveyoursay_analysis import longitudinal as lt
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.snapshot import write_snapshot
+
+
+def _rows(ids):
+    return [
+        {
+            "id": i,
+            "userType": "NGO" if i % 2 else "COMPANY",
+            "createdDate": f"2024/01/{i:02d} 10:00:00",
+            "attachments": [{"documentId": f"d{i}-{k}"} for k in range(i % 3)],
+        }
+        for i in ids
+    ]
+
+
+def _snapshots(tmp_path):
+    for name, ids in (("day1", range(1, 5)), ("day2", range(2, 7)), ("day3", range(2, 9))):
+        write_snapshot([_rows(ids)], tmp_path / name)
+    return [tmp_path / "day1", tmp_path / "day2", tmp_path / "day3"]
+
+
+def test_matrices_and_metrics(tmp_path):
+    snaps = lt.load_snapshots(_snapshots(tmp_path))
+
+    presence = lt.presence_matrix(snaps)
+    assert presence.loc[1].tolist() == [True, False, False]
+    assert presence.loc[8].tolist() == [False, False, True]
+    assert lt.attachment_matrix(snaps).loc[5].tolist() == [0, 2, 2]
+    assert lt.churn(snaps).to_dict("index")["day2"] == {"total": 5, "added": 2, "removed": 1, "retained": 3}
+    assert lt.arrivals_per_day(snaps)["cumulative"].iloc[-1] == 8
+    assert lt.user_type_drift(snaps).loc["day3"].to_dict() == {"COMPANY": 4, "NGO": 3}
+
+
+def test_timeline_command(tmp_path):
+    paths = _snapshots(tmp_path)
+    args = ["timeline", "--out", str(tmp_path / "report")]
+    for p in paths:
+        args += ["--snapshot", str(p)]
+
+    result = CliRunner().invoke(app, args)
+
+    assert result.exit_code == 0, result.output
+    assert "CHURN" in result.output
+    assert (tmp_path / "report" / "presence_matrix.csv").exists()
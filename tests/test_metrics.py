@@ -0,0 +1,73 @@
+"""
+Tests for run metrics, their exports and the CLI instrumentation options.
+"""
+import json
+import pstats
+
+from typer.testing import CliRunner
+
+from haveyoursay_analysis import client, metrics
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.retry import RetryPolicy
+
+from .conftest import feedback_pages
+
+
+def test_metrics_record_counters_histograms_and_stages(tmp_path):
+    m = metrics.Metrics()
+    m.count("http_requests", kind="api", status=200)
+    m.count("http_requests", 2, kind="api", status=200)
+    for seconds in (0.003, 0.2, 0.2, 99):
+        m.observe("http_request_seconds", seconds, kind="api")
+    with m.stage("work"):
+        sum(range(10000))
+
+    data = m.to_dict()
+    assert data["counters"] == [{"name": "http_requests", "labels": {"kind": "api", "status": "200"}, "value": 3}]
+    hist = data["histograms"][0]
+    assert (hist["count"], hist["buckets"]["0.005"], hist["buckets"]["0.25"], hist["buckets"]["+Inf"]) == (4, 1, 3, 4)
+    assert data["stages"]["work"]["calls"] == 1
+
+    text = m.to_prometheus()
+    assert 'haveyoursay_http_requests_total{kind="api",status="200"} 3' in text
+    assert 'haveyoursay_http_request_seconds_bucket{kind="api",le="+Inf"} 4' in text
+    assert "# TYPE haveyoursay_http_request_seconds histogram" in text
+    assert 'haveyoursay_stage_calls_total{stage="work"} 1' in text
+
+
+def test_fetch_command_writes_metrics_and_profile(feedback_endpoint, tmp_path):
+    pages = feedback_pages(45, 10)
+    calls = []
+
+    def route(query, headers):
+        calls.append(query)
+        if len(calls) == 2:
+            return 503, {"Retry-After": "0"}, b"busy"
+        return 200, {"Content-Type": "application/json"}, json.dumps(pages(query)).encode()
+
+    feedback_endpoint.routes["/api/allFeedback"] = route
+    metrics_out = tmp_path / "metrics.json"
+    fetch = ["fetch", "--publication-id", "1", "--out", str(tmp_path / "data"), "--page-size", "10"]
+
+    client.configure_retry(RetryPolicy(base=0.01))
+    try:
+        result = CliRunner().invoke(app, ["--metrics-out", str(metrics_out), "--profile", str(tmp_path / "p"), *fetch])
+    finally:
+        client.configure_retry(None)
+
+    assert result.exit_code == 0, result.output
+    data = json.loads(metrics_out.read_text())
+    counters = {(c["name"], tuple(sorted(c["labels"].items()))): c["value"] for c in data["counters"]}
+    assert counters[("http_requests", (("kind", "api"), ("status", "200")))] == 5
+    assert counters[("http_requests", (("kind", "api"), ("status", "503")))] == 1
+    assert counters[("http_retries", (("reason", "503"),))] == 1
+    assert counters[("http_bytes", (("kind", "api"),))] > 0
+    assert data["stages"]["api.parse_json"]["calls"] == 5
+    assert data["stages"]["snapshot.write"]["calls"] == 5
+    assert data["stages"]["command.fetch"]["wall_seconds"] > 0
+    assert pstats.Stats(str(tmp_path / "p")).total_calls > 0
+
+    prom = tmp_path / "metrics.prom"
+    result = CliRunner().invoke(app, ["--metrics-out", str(prom), *fetch])
+    assert result.exit_code == 0, result.output
+    assert 'haveyoursay_stage_calls_total{stage="command.fetch"} 1' in prom.read_text()
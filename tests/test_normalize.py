@@ -0,0 +1,112 @@
+"""
+Tests for the columnar raw-dump normalizer and the `normalize` command.
+"""
+import json
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from haveyoursay_analysis import normalize
+from haveyoursay_analysis.api import extract_feedback_and_attachments
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.snapshot import write_snapshot
+from haveyoursay_analysis.storage import ATTACHMENT_COLUMNS, FEEDBACK_COLUMNS, apply_dtypes, read_table
+
+ROWS = [
+    {"id": 1, "userType": "NGO", "country": "BEL", "createdDate": "2024/01/02 10:00:00", "publicationId": 7,
+     "organization": "Friends", "companySize": "SMALL", "language": "EN", "feedback": "Please reconsider.",
+     "attachments": [{"id": 10, "documentId": "0012", "fileName": "a.pdf", "size": 2048, "pages": 3}]},
+    {"feedbackId": 2, "userType": "COMPANY", "country": "", "created": "2024-01-03T11:30:00",
+     "documents": [{"id": 11, "name": "b.pdf"}]},
+    # repeated item: skipped along with its attachments
+    {"id": 1, "userType": "NGO", "attachments": [{"documentId": "0099"}]},
+    {"id": 3, "attachments": [{"documentId": "c"}, {"documentId": "c"}]},
+]
+
+
+def _write_dump(path, rows):
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows) + "\n", encoding="utf-8")
+    return path
+
+
+def test_normalize_rows_projects_every_field_with_canonical_dtypes():
+    out = normalize.normalize_rows(ROWS)
+    fb, at = out["feedback"], out["attachments"]
+
+    assert list(fb.columns) == normalize.FEEDBACK_FIELD_NAMES
+    assert list(at.columns) == normalize.ATTACHMENT_FIELD_NAMES
+    assert fb["feedback_id"].tolist() == [1, 2, 3]
+    assert str(fb["feedback_id"].dtype) == "Int64"
+    assert isinstance(fb["companySize"].dtype, pd.CategoricalDtype)
+    assert fb["country"].isna().tolist() == [False, True, True]
+    assert fb["created"].tolist()[:2] == [pd.Timestamp("2024-01-02 10:00:00"), pd.Timestamp("2024-01-03 11:30:00")]
+    assert fb.loc[0, "feedback"] == "Please reconsider."
+    assert at["document_id"].tolist() == ["0012", "11", "c"]
+    assert at["size"].tolist()[:1] == [2048]
+    assert at["userType"].tolist()[:2] == ["NGO", "COMPANY"]
+
+
+def test_core_columns_match_row_normalization():
+    old = extract_feedback_and_attachments(ROWS[:2])
+    out = normalize.normalize_rows(ROWS[:2], fields=FEEDBACK_COLUMNS)
+
+    expected_fb = apply_dtypes(pd.DataFrame(old["feedback"], columns=FEEDBACK_COLUMNS).replace("", None))
+    expected_at = apply_dtypes(pd.DataFrame(old["attachments"], columns=ATTACHMENT_COLUMNS))
+    pd.testing.assert_frame_equal(out["feedback"], expected_fb)
+    pd.testing.assert_frame_equal(out["attachments"][ATTACHMENT_COLUMNS], expected_at)
+
+
+def test_raw_dump_paths_agree(tmp_path):
+    path = _write_dump(tmp_path / "feedback_raw.ndjson", ROWS)
+    expected = normalize.normalize_rows(ROWS)
+
+    # pyarrow's JSON reader when available, else the pure-Python path
+    out = normalize.normalize_raw_dump(path)
+    for name in ("feedback", "attachments"):
+        pd.testing.assert_frame_equal(out[name], expected[name])
+
+    # string ids do not fit the Arrow schema and fall back; the column becomes text
+    odd = _write_dump(tmp_path / "odd.ndjson", [*ROWS, {"id": "x9"}])
+    assert normalize.normalize_raw_dump(odd)["feedback"]["feedback_id"].tolist() == ["1", "2", "3", "x9"]
+
+    legacy = tmp_path / "feedback_raw.json"
+    legacy.write_text(json.dumps(ROWS), encoding="utf-8")
+    pd.testing.assert_frame_equal(normalize.normalize_raw_dump(legacy)["feedback"], expected["feedback"])
+
+
+def test_arrow_output_matches_storage_schema(tmp_path):
+    pytest.importorskip("pyarrow")
+    from haveyoursay_analysis.storage import arrow_schema
+
+    path = _write_dump(tmp_path / "feedback_raw.ndjson", ROWS)
+    out = normalize.normalize_raw_dump(path, fields=["userType", "language"], arrow=True)
+
+    assert out["feedback"].schema.remove_metadata() == arrow_schema(["feedback_id", "userType", "language"])
+    assert out["attachments"].num_rows == 3
+
+    # string ids, as in the fallback of test_raw_dump_paths_agree
+    odd = normalize.normalize_rows([*ROWS, {"id": "x9"}], arrow=True)
+    assert odd["feedback"].column("feedback_id").to_pylist() == ["1", "2", "3", "x9"]
+    assert odd["attachments"].column("feedback_id").to_pylist() == [1, 2, 3]
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError, match="Unknown feedback fields"):
+        normalize.Normalizer(["nope"])
+
+
+def test_normalize_command_writes_full_tables_next_to_fetch_tables(tmp_path):
+    write_snapshot([ROWS], tmp_path)
+
+    result = CliRunner().invoke(app, ["normalize", "--snapshot", str(tmp_path)])
+
+    assert result.exit_code == 0, result.output
+    fb = read_table(tmp_path / "feedback_full.csv")
+    assert fb["organization"].tolist()[:1] == ["Friends"]
+    assert fb["publication_id"].tolist()[:1] == [7]
+    assert read_table(tmp_path / "attachments_full.csv")["pages"].tolist()[:1] == [3]
+    # the tables fetch maintains keep their own columns, so a later fetch drops nothing
+    assert list(read_table(tmp_path / "feedback.csv").columns) == FEEDBACK_COLUMNS
+    write_snapshot([ROWS[:2]], tmp_path)
+    assert "organization" in read_table(tmp_path / "feedback_full.csv").columns
@@ -0,0 +1,96 @@
+"""
+Tests for the shared retry policy and the adaptive concurrency limiter.
+"""
+import time
+
+import pytest
+import requests
+
+from haveyoursay_analysis import api, client
+from haveyoursay_analysis.ratelimit import AIMDLimiter
+from haveyoursay_analysis.retry import RetryPolicy, is_retryable, retry_after
+
+
+def _http_error(status, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    return requests.HTTPError(f"{status}", response=resp)
+
+
+@pytest.fixture
+def fast_retry():
+    policy = client.configure_retry(RetryPolicy(base=0.01, limiter=AIMDLimiter(max_limit=4)))
+    yield policy
+    client.configure_retry(None)
+
+
+def test_errors_are_classified():
+    assert not is_retryable(_http_error(404))
+    assert not is_retryable(_http_error(403))
+    assert not is_retryable(requests.exceptions.MissingSchema("no scheme"))
+    assert not is_retryable(ValueError("bad json"))
+    assert is_retryable(_http_error(429))
+    assert is_retryable(_http_error(503))
+    assert is_retryable(requests.ConnectionError("reset"))
+    assert is_retryable(requests.Timeout("slow"))
+
+
+def test_retry_after_header_is_honored():
+    assert retry_after(_http_error(429, {"Retry-After": "7"})) == 7
+    date = "Wed, 21 Oct 2015 07:28:10 GMT"
+    assert retry_after(_http_error(503, {"Retry-After": date}), now=1445412480) == 10
+    assert retry_after(_http_error(429)) is None
+
+    policy = RetryPolicy(base=0.01, max_retry_after=60)
+    assert policy.delay(1, _http_error(429, {"Retry-After": "7"})) == 7
+    assert policy.delay(1, _http_error(429, {"Retry-After": "600"})) is None
+    assert policy.delay(1, _http_error(404)) is None
+    assert policy.delay(policy.max_tries, _http_error(500)) is None
+    assert all(0 <= policy.delay(3, _http_error(500)) <= 0.04 for _ in range(50))
+
+
+def test_not_found_is_not_retried(feedback_endpoint, fast_retry):
+    with pytest.raises(requests.HTTPError):
+        api._get(f"{feedback_endpoint.url}/missing")
+    assert len(feedback_endpoint.requests) == 1
+
+
+def test_throttled_request_waits_and_shrinks_limit(feedback_endpoint, fast_retry):
+    calls = []
+
+    def route(query, headers):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return 429, {"Retry-After": "1"}, b"slow down"
+        return 200, {"Content-Type": "application/json"}, b"{}"
+
+    feedback_endpoint.routes["/api/allFeedback"] = route
+
+    assert api._get(api.FEEDBACK_ENDPOINT).json() == {}
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.95
+    assert fast_retry.limiter.throttles == 1
+    assert fast_retry.limiter.limit < 4
+
+
+def test_aimd_limiter_backs_off_and_recovers():
+    limiter = AIMDLimiter(max_limit=8, cooldown=0)
+    started = [limiter.acquire() for _ in range(6)]
+    limiter.release(throttled=True, started=started[0])
+    assert limiter.limit == 3  # half of the six in flight
+    # requests already under way when the server pushed back do not count as successes
+    for t in started[1:]:
+        limiter.release(started=t)
+    assert limiter.limit == 3
+    assert limiter.active == 0
+
+    # successes only raise the limit while it is saturated
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 3
+    for _ in range(30):
+        for _ in range(int(limiter.limit)):
+            limiter.acquire()
+        for _ in range(int(limiter.limit)):
+            limiter.release()
+    assert limiter.limit == 8
@@ -0,0 +1,73 @@
+"""
+Tests for the full-text search index.
+"""
+from typer.testing import CliRunner
+
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.extract import TextStore
+from haveyoursay_analysis.manifest import DONE
+from haveyoursay_analysis.search import SearchIndex, index_snapshot
+from haveyoursay_analysis.snapshot import write_snapshot
+
+COMMENTS = {
+    1: ("NGO", "BEL", "We support the sugar tax for public health."),
+    2: ("COMPANY", "DEU", "A sugar levy would hurt small producers."),
+    3: ("NGO", "FRA", "Public health must come before industry interests."),
+}
+
+
+def _snapshot(path, comments):
+    rows = [
+        {
+            "id": fid,
+            "userType": user_type,
+            "country": country,
+            "feedback": text,
+            "attachments": [{"documentId": f"doc{fid}", "fileName": f"doc{fid}.pdf"}] if fid == 2 else [],
+        }
+        for fid, (user_type, country, text) in comments.items()
+    ]
+    write_snapshot([rows], path)
+    return path
+
+
+def test_search_with_facets_and_incremental_update(tmp_path):
+    snap = _snapshot(tmp_path / "snap1", COMMENTS)
+    with TextStore(tmp_path / "text.sqlite") as store:
+        store.record("doc2", DONE, text="Position paper: the levy threatens jobs in confectionery.")
+
+    with SearchIndex(tmp_path / "index.sqlite") as idx:
+        stats = index_snapshot(idx, snap, text_store=tmp_path / "text.sqlite")
+        assert (stats.added, stats.updated, stats.unchanged) == (4, 0, 0)
+
+        assert set(idx.search('"public health"')["feedback_id"]) == {1, 3}
+        assert list(idx.search('"public health"', user_types=["NGO"], countries=["FRA"])["feedback_id"]) == [3]
+        assert list(idx.search("sugar NOT health")["feedback_id"]) == [2]
+
+        hit = idx.search("confectionery")
+        assert hit.loc[0, ["kind", "document_id", "feedback_id", "userType"]].tolist() == [
+            "attachment", "doc2", 2, "COMPANY"
+        ]
+        assert idx.facets("levy")["kind"].to_dict() == {"feedback": 1, "attachment": 1}
+
+        # a newer snapshot: one comment edited, one added, the rest (and the attachment) untouched
+        comments = {**COMMENTS, 3: ("NGO", "FRA", "Industry interests prevail."), 4: ("OTHER", "ITA", "No opinion.")}
+        stats = index_snapshot(idx, _snapshot(tmp_path / "snap2", comments), text_store=tmp_path / "text.sqlite")
+        assert (stats.added, stats.updated, stats.unchanged) == (1, 1, 3)
+        assert set(idx.search('"public health"')["feedback_id"]) == {1}
+        assert len(idx) == 5
+
+
+def test_search_command(tmp_path):
+    snap = _snapshot(tmp_path / "snap", COMMENTS)
+    index_path = tmp_path / "index.sqlite"
+    runner = CliRunner()
+
+    assert runner.invoke(app, ["index", "--snapshot", str(snap), "--index", str(index_path)]).exit_code == 0
+    result = runner.invoke(app, ["search", "sugar", "--index", str(index_path), "--user-type", "NGO", "--facets"])
+
+    assert result.exit_code == 0, result.output
+    assert "[sugar] tax" in result.output
+    assert "userType: NGO=1" in result.output
+    bad = runner.invoke(app, ["search", '"unbalanced', "--index", str(index_path)])
+    assert bad.exit_code != 0
@@ -0,0 +1,80 @@
+"""
+Tests for the streaming fetch -> NDJSON/CSV snapshot writer.
+"""
+import json
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.snapshot import iter_raw_rows, write_snapshot
+
+from .conftest import feedback_pages
+
+
+def test_write_snapshot_dedupes_by_id(tmp_path):
+    row = {"id": 1, "userType": "NGO", "attachments": [{"documentId": "a", "fileName": "a.pdf"}]}
+    pages = [[row, {"id": 2, "userType": "COMPANY"}], [row]]
+
+    writer = write_snapshot(pages, tmp_path)
+
+    assert (writer.raw_count, writer.feedback_count, writer.attachment_count) == (3, 2, 1)
+    assert list(pd.read_csv(tmp_path / "feedback.csv")["feedback_id"]) == [1, 2]
+    assert len(list(iter_raw_rows(tmp_path / "feedback_raw.ndjson"))) == 3
+
+
+def test_fetch_command_streams_snapshot(feedback_endpoint, tmp_path):
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(45, 10))
+
+    result = CliRunner().invoke(app, ["fetch", "--publication-id", "1", "--out", str(tmp_path), "--page-size", "10"])
+
+    assert result.exit_code == 0, result.output
+    fb = pd.read_csv(tmp_path / "feedback.csv")
+    at = pd.read_csv(tmp_path / "attachments.csv")
+    assert list(fb["feedback_id"]) == list(range(1, 46))
+    assert len(at) == 15
+    with open(tmp_path / "feedback_raw.ndjson", encoding="utf-8") as f:
+        assert json.loads(f.readline())["id"] == 1
+
+
+def test_fetch_incremental_stops_at_known_items_and_merges(feedback_endpoint, tmp_path):
+    from haveyoursay_analysis.snapshot import fetch_incremental, load_watermark
+
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(25, 10))
+    fetch_incremental(1, tmp_path, page_size=10)
+    assert len(load_watermark(tmp_path).seen_ids) == 25
+
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(32, 10))
+    feedback_endpoint.requests.clear()
+    pages = []
+    new, writer = fetch_incremental(1, tmp_path, page_size=10, on_page=pages.append)
+
+    assert new == 7
+    assert [q["page"] for _, q in feedback_endpoint.requests] == ["0"]
+    assert [len(items) for items in pages] == [10]
+    fb = pd.read_csv(tmp_path / "feedback.csv")
+    assert list(fb["feedback_id"]) == list(range(1, 33))
+    assert writer.raw_count == 32
+    assert not list(tmp_path.glob(".merge-*"))
+
+
+def test_fetch_incremental_keeps_format_of_parquet_snapshot(feedback_endpoint, tmp_path):
+    pytest.importorskip("pyarrow")
+    from haveyoursay_analysis.storage import read_table
+
+    fetch = ["fetch", "--publication-id", "1", "--out", str(tmp_path), "--page-size", "10"]
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(25, 10))
+    assert CliRunner().invoke(app, [*fetch, "--format", "parquet"]).exit_code == 0
+    (tmp_path / "feedback.csv").write_text("feedback_id\n99\n")  # stale copy in another format
+
+    feedback_endpoint.json_route("/api/allFeedback", feedback_pages(32, 10))
+    result = CliRunner().invoke(app, [*fetch, "--incremental"])
+    assert result.exit_code == 0, result.output
+    assert "Fetched 7 new" in result.output
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == ["attachments.parquet", "feedback.parquet", "feedback_raw.ndjson"]
+    assert read_table(tmp_path / "feedback.parquet")["feedback_id"].tolist() == list(range(1, 33))
+
+    result = CliRunner().invoke(app, [*fetch, "--incremental"])
+    assert "Fetched 0 new" in result.output
@@ -0,0 +1,70 @@
+"""
+Tests for the CSV/Parquet/Arrow storage layer.
+"""
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from haveyoursay_analysis.cli import app
+from haveyoursay_analysis.compare import compare_attachments, compare_phases
+from haveyoursay_analysis.snapshot import write_snapshot
+from haveyoursay_analysis.storage import read_table
+
+pytest.importorskip("pyarrow")
+
+ROWS = [
+    {"id": 1, "userType": "NGO", "country": "BEL", "createdDate": "2024/01/02 10:00:00",
+     "attachments": [{"documentId": "0012", "fileName": "a.pdf"}]},
+    {"id": 2, "userType": "COMPANY", "country": "DEU", "createdDate": "2024/01/03 11:30:00"},
+]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_tables_load_with_canonical_dtypes(tmp_path, fmt):
+    write_snapshot([ROWS], tmp_path, fmt=fmt)
+
+    fb = read_table(tmp_path / f"feedback.{fmt}")
+    at = read_table(tmp_path / f"attachments.{fmt}")
+
+    assert str(fb["feedback_id"].dtype) == "Int64"
+    assert isinstance(fb["userType"].dtype, pd.CategoricalDtype)
+    assert isinstance(fb["country"].dtype, pd.CategoricalDtype)
+    assert fb["created"].iloc[1] == pd.Timestamp("2024-01-03 11:30:00")
+    assert at["document_id"].tolist() == ["0012"]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_non_numeric_ids_fall_back_to_strings_as_in_csv(tmp_path, fmt):
+    from haveyoursay_analysis.storage import FEEDBACK_COLUMNS, TableSink
+
+    write_snapshot([[{"id": 1}, {"id": "x9"}]], tmp_path, fmt=fmt)
+    assert read_table(tmp_path / f"feedback.{fmt}")["feedback_id"].tolist() == ["1", "x9"]
+
+    # a non-numeric id after numeric batches were written
+    sink = TableSink(tmp_path / f"late.{fmt}", FEEDBACK_COLUMNS, batch_rows=2)
+    for fid in [1, 2, "x9", 4]:
+        sink.write({"feedback_id": fid, "userType": "NGO"})
+    sink.close()
+    late = read_table(tmp_path / f"late.{fmt}")
+    assert late["feedback_id"].tolist() == ["1", "2", "x9", "4"]
+    assert late["userType"].tolist() == ["NGO"] * 4
+
+def test_compare_accepts_mixed_formats(tmp_path):
+    write_snapshot([ROWS[:1]], tmp_path / "p1", fmt="csv")
+    write_snapshot([ROWS], tmp_path / "p2", fmt="parquet")
+
+    f_comp = compare_phases(tmp_path / "p1" / "feedback.csv", tmp_path / "p2" / "feedback.parquet")
+    a_comp = compare_attachments(tmp_path / "p1" / "attachments.csv", tmp_path / "p2" / "attachments.parquet")
+
+    assert f_comp["common"]["count"] == 1
+    assert f_comp["only_in_2"]["ids"].tolist() == [2]
+    assert a_comp["attachment_changes"]["count"] == 0
+
+
+def test_convert_command(tmp_path):
+    write_snapshot([ROWS], tmp_path, fmt="csv")
+
+    result = CliRunner().invoke(app, ["convert", "--snapshot", str(tmp_path), "--format", "parquet"])
+
+    assert result.exit_code == 0, result.output
+    assert len(read_table(tmp_path / "feedback.parquet")) == 2